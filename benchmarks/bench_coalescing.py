@@ -0,0 +1,52 @@
+"""Counts the requests received by the API when many concurrent games each request one question at a time, with and
+without the RequestCoalescer
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_coalescing [--n-games 100] [--n-rounds 10]
+"""
+
+import argparse
+
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from benchmarks.stub_server import StubTriviaServer
+from pytrivia.base import RequestBuilder, request_random_question
+from pytrivia.coalesce import RequestCoalescer
+from pytrivia.session import HttpSession
+
+
+def _play(get_question, n_games, n_rounds):
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=n_games) as executor:
+        for _ in range(n_rounds):
+            list(executor.map(lambda _: get_question(), range(n_games)))
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-games', type=int, default=100)
+    parser.add_argument('--n-rounds', type=int, default=10)
+    parser.add_argument('--response-delay', type=float, default=0.01)
+    args = parser.parse_args()
+
+    session = HttpSession(pool_maxsize=args.n_games)
+    with StubTriviaServer(response_delay=args.response_delay) as server:
+        elapsed = _play(lambda: request_random_question(session=session, base_url=server.url),
+                        args.n_games, args.n_rounds)
+        n_requests = server.n_requests
+        print(f"Without coalescing: {n_requests} API requests in {elapsed:.2f} s")
+
+        coalescer = RequestCoalescer(request_builder_factory=lambda: RequestBuilder(session=session,
+                                                                                    base_url=server.url))
+        elapsed = _play(coalescer.request_random_question, args.n_games, args.n_rounds)
+        print(f"With coalescing:    {server.n_requests - n_requests} API requests in {elapsed:.2f} s "
+              f"(stats: {coalescer.stats})")
+        coalescer.close()
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Compares drawing random questions of a category from the question database (indexed read of a random slot) with
+ORDER BY RANDOM(), as the database grows
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_database [--n-questions 200000]
+"""
+
+import argparse
+import os
+import tempfile
+
+from time import perf_counter
+
+from benchmarks.bench_memory import make_raw_questions
+from pytrivia.base import Category
+from pytrivia.database import QuestionDatabase
+
+
+def _time_draws(draw, n: int = 200):
+    start = perf_counter()
+    for _ in range(n):
+        draw()
+    return 1e6 * (perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-questions', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        with QuestionDatabase(os.path.join(folder, 'questions.db')) as database:
+            start = perf_counter()
+            database.upsert(make_raw_questions(args.n_questions))
+            elapsed = perf_counter() - start
+            print(f"upsert: {elapsed:.2f} s, {1e6 * elapsed / args.n_questions:.1f} us/question")
+
+            category = Category.History
+            print(f"{database.n_questions(category)} questions in {category.formatted_str}")
+            print(f"sample (slot): {_time_draws(lambda: database.sample([category], 1)):.1f} us")
+            print(f"sample of 3 (slots): {_time_draws(lambda: database.sample([category], 3)):.1f} us")
+            connection = database._connection
+            query = "SELECT question FROM questions WHERE category = ? ORDER BY RANDOM() LIMIT 1"
+            print(f"ORDER BY RANDOM(): {_time_draws(lambda: connection.execute(query, (category.name,)).fetchone()):.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compares the cost of converting large batches of raw API questions to Question objects eagerly and to LazyQuestion
+views
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_lazy [--n-questions 100000]
+
+Two patterns are measured for both conversions, counting the time and the memory allocated after the raw dicts exist:
+- convert: the batch is converted and nothing else is accessed (e.g. questions prefetched into a pool and left there)
+- bonus: the batch is converted by groups of 3, the texts of the 3 are read and only 1 is asked (as in a bonus round)
+"""
+
+import argparse
+import tracemalloc
+
+from time import perf_counter
+
+from benchmarks.bench_memory import make_raw_questions
+from pytrivia.base import LazyQuestion, RequestBuilder
+
+
+def _convert_eagerly(raw_questions):
+    return RequestBuilder._convert_raw_response(raw_questions)
+
+
+def _convert_lazily(raw_questions):
+    return [LazyQuestion(raw_question) for raw_question in raw_questions]
+
+
+def _bonus(convert, raw_questions):
+    questions = convert(raw_questions)
+    for i in range(0, len(questions) - 2, 3):
+        _ = [question.text for question in questions[i:i + 3]]
+        questions[i].get_lettered_answers(n_max=4)
+    return questions
+
+
+def _measure(pattern):
+    # timed without tracemalloc, which slows down allocations a lot
+    start = perf_counter()
+    result = pattern()
+    elapsed = perf_counter() - start
+    del result
+    tracemalloc.start()
+    result = pattern()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-questions', type=int, default=100000)
+    args = parser.parse_args()
+
+    raw_questions = make_raw_questions(args.n_questions)
+    for name, convert in [('eager', _convert_eagerly), ('lazy', _convert_lazily)]:
+        for pattern_name, pattern in [('convert', lambda: convert(raw_questions)),
+                                      ('bonus', lambda: _bonus(convert, raw_questions))]:
+            elapsed, size = _measure(pattern)
+            print(f"{name} {pattern_name}: {1e6 * elapsed / args.n_questions:.2f} us/question, "
+                  f"{size / args.n_questions:.0f} bytes/question allocated")
+
+
+if __name__ == '__main__':
+    main()
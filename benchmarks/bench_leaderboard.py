@@ -0,0 +1,63 @@
+"""Measures the cost of recording games in the leaderboard and of querying it once it holds millions of games
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_leaderboard [--n-games 1000000] [--batch-size 1000]
+
+The games are recorded in batch mode (as the game server does) and written every batch-size games. Then the time to
+reopen the leaderboard (which rebuilds the score index) and the latency of top-K, rank and percentile queries are
+reported.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from time import perf_counter
+
+from pytrivia.events import GameOver
+from pytrivia.leaderboard import Leaderboard
+
+
+def _time_query(query, n: int = 1000):
+    start = perf_counter()
+    for _ in range(n):
+        query()
+    return 1e6 * (perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-games', type=int, default=1000000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    summaries = [GameOver(high_score=int(rng.expovariate(0.3)) + 1, n_rounds=rng.randrange(1, 50),
+                          longest_success_streak=rng.randrange(10)) for _ in range(args.n_games)]
+    players = [f"player{i}" for i in range(1000)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'leaderboard.db')
+        with Leaderboard(path, autoflush=False) as leaderboard:
+            start = perf_counter()
+            for i, summary in enumerate(summaries):
+                leaderboard.record(summary, players[i % len(players)])
+                if (i + 1) % args.batch_size == 0:
+                    leaderboard.flush()
+            elapsed = perf_counter() - start
+        print(f"record: {elapsed:.2f} s, {1e6 * elapsed / args.n_games:.2f} us/game")
+
+        start = perf_counter()
+        leaderboard = Leaderboard(path)
+        print(f"open: {1000 * (perf_counter() - start):.1f} ms for {len(leaderboard)} games")
+        print(f"top 10: {_time_query(lambda: leaderboard.top(10)):.1f} us")
+        print(f"top 10 of a player: {_time_query(lambda: leaderboard.top(10, rng.choice(players))):.1f} us")
+        print(f"rank: {_time_query(lambda: leaderboard.rank(rng.randrange(40))):.1f} us")
+        print(f"percentile: {_time_query(lambda: leaderboard.percentile(rng.randrange(40))):.1f} us")
+        leaderboard.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Measures the memory footprint of the Question objects built from raw API questions
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_memory [--n-questions 100000]
+
+The raw questions of the fixture file are replicated with distinct question texts, as a large question cache would
+hold them, and converted with RequestBuilder._convert_raw_response. Only the memory allocated for the Question objects
+is counted (the raw dicts are allocated beforehand).
+"""
+
+import argparse
+import tracemalloc
+
+from benchmarks.stub_server import load_fixture_questions
+from pytrivia.base import RequestBuilder
+
+
+def make_raw_questions(n_questions: int):
+    """Returns n_questions raw questions with distinct texts, built from the fixture questions"""
+    fixture = load_fixture_questions()
+    return [dict(fixture[i % len(fixture)], question=f"{fixture[i % len(fixture)]['question']} ({i})")
+            for i in range(n_questions)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-questions', type=int, default=100000)
+    args = parser.parse_args()
+
+    raw_questions = make_raw_questions(args.n_questions)
+    tracemalloc.start()
+    questions = RequestBuilder._convert_raw_response(raw_questions)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(questions)} questions: {size / 2 ** 20:.1f} MiB, {size / len(questions):.0f} bytes/question")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Compares the cost of sending each request over a new connection (bare requests.get) with the pooled HttpSession
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_session [--n-requests 200] [--handshake-delay 0.02]
+
+The stub server sleeps handshake_delay seconds whenever a connection is opened, to emulate the TCP+TLS handshake
+with the real API (a local plain HTTP connection is much cheaper than that).
+"""
+
+import argparse
+import requests
+
+from time import perf_counter
+
+from benchmarks.stub_server import StubTriviaServer
+from pytrivia.base import RequestBuilder
+from pytrivia.session import HttpSession
+
+
+class _PerCallConnectionRequestBuilder(RequestBuilder):
+    """Sends each request over a new connection, as RequestBuilder used to"""
+
+    def _send_single_request(self, query_url: str, timeout: float = None, stream: bool = False):
+        response = requests.get(query_url, stream=stream, **({} if timeout is None else {'timeout': timeout}))
+        if not response or response.status_code != 200:
+            return None
+        if stream:
+            return response
+        return response.json()
+
+
+def _time_requests(builder_factory, n_requests):
+    start = perf_counter()
+    for _ in range(n_requests):
+        builder_factory().limit(1).get_questions()
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-requests', type=int, default=200)
+    parser.add_argument('--handshake-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    with StubTriviaServer(handshake_delay=args.handshake_delay) as server:
+        elapsed = _time_requests(lambda: _PerCallConnectionRequestBuilder(base_url=server.url), args.n_requests)
+        n_connections = server.n_connections
+        print(f"requests.get: {1000 * elapsed / args.n_requests:.2f} ms/request, {n_connections} connections")
+
+        session = HttpSession()
+        elapsed = _time_requests(lambda: RequestBuilder(session=session, base_url=server.url), args.n_requests)
+        n_connections = server.n_connections - n_connections
+        print(f"HttpSession:  {1000 * elapsed / args.n_requests:.2f} ms/request, {n_connections} connections, "
+              f"stats: {session.stats}")
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Measures the cost of shuffling the answers of many questions, as a server generating quizzes in bulk would
+
+Run from the root of the repository:
+
+    python -m benchmarks.bench_shuffle [--n-questions 1000000]
+
+Two paths are timed: get_randomly_ordered_answers followed by a search for the key of the correct answer (as the
+rounds used to do), and get_lettered_answers, which returns the key of the correct answer directly.
+"""
+
+import argparse
+
+from time import perf_counter
+
+from benchmarks.bench_memory import make_raw_questions
+from pytrivia.base import RequestBuilder
+from pytrivia.utils import alphabetic_range
+
+
+def _search_correct_key(question):
+    answers = question.get_randomly_ordered_answers(n_max=4)
+    dict_answers = {k: v for k, v in zip(alphabetic_range(len(answers)), answers)}
+    right_answer = question.correct_answer
+    return [k for k in dict_answers.keys() if dict_answers[k] == right_answer][0]
+
+
+def _lettered_answers(question):
+    return question.get_lettered_answers(n_max=4)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-questions', type=int, default=1000000)
+    args = parser.parse_args()
+
+    questions = RequestBuilder._convert_raw_response(make_raw_questions(args.n_questions))
+    for name, shuffle in [('search', _search_correct_key), ('lettered', _lettered_answers)]:
+        start = perf_counter()
+        for question in questions:
+            shuffle(question)
+        elapsed = perf_counter() - start
+        print(f"{name}: {elapsed:.2f} s, {1e6 * elapsed / len(questions):.2f} us/question")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Load test of the game server: many simulated players play games over HTTP against a server whose questions come from
+a local stub of the Trivia API
+
+Run from the root of the repository:
+
+    python -m benchmarks.load_test [--n-players 50] [--duration 10]
+
+Each player starts a game, answers every prompt with a random option until the game is over, and starts again. The
+sustained number of games per second and the answer latencies seen by the players are reported.
+"""
+
+import argparse
+import json
+import random
+import os
+import requests
+import tempfile
+import threading
+
+from time import perf_counter
+
+from benchmarks.stub_server import StubTriviaServer
+from pytrivia.base import RequestBuilder
+from pytrivia.leaderboard import Leaderboard
+from pytrivia.pool import QuestionPool
+from pytrivia.scores import HighScoreStore
+from pytrivia.server import GameHTTPServer, GameServer
+from pytrivia.session import HttpSession
+
+
+def _player(url: str, deadline: float, latencies: list, n_games: list):
+    session = requests.Session()  # each player keeps its own connection to the server
+    while perf_counter() < deadline:
+        state = session.post(url + '/sessions').json()
+        session_id = state['session_id']
+        while 'prompt' in state:
+            key = random.choice(list(state['prompt']['options']))
+            start = perf_counter()
+            state = session.post(f"{url}/sessions/{session_id}/answer", json={'key': key}).json()
+            latencies.append(perf_counter() - start)
+        n_games.append(1)
+        session.delete(f"{url}/sessions/{session_id}")
+    session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--n-players', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--response-delay', type=float, default=0.05, help="latency of the stub Trivia API")
+    args = parser.parse_args()
+
+    with StubTriviaServer(response_delay=args.response_delay) as trivia_api, tempfile.TemporaryDirectory() as folder:
+        api_session = HttpSession()
+        question_pool = QuestionPool(low_watermark=20, high_watermark=60, request_builder_factory=lambda: RequestBuilder(
+            session=api_session, base_url=trivia_api.url))
+        high_score_store = HighScoreStore(os.path.join(folder, 'cache.json'), autoflush=False)
+        leaderboard = Leaderboard(os.path.join(folder, 'leaderboard.db'), autoflush=False)
+        game_server = GameServer(question_pool=question_pool, high_score_store=high_score_store,
+                                 leaderboard=leaderboard)
+        game_server.start()
+        http_server = GameHTTPServer(game_server, port=0)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+        latencies, n_games = [], []
+        start = perf_counter()
+        players = [threading.Thread(target=_player, args=(http_server.url, start + args.duration, latencies, n_games))
+                   for _ in range(args.n_players)]
+        for player in players:
+            player.start()
+        for player in players:
+            player.join()
+        elapsed = perf_counter() - start
+
+        http_server.shutdown()
+        http_server.server_close()
+        game_server.stop()
+        leaderboard.close()
+        api_session.close()
+
+    latencies.sort()
+    results = {'n_players': args.n_players,
+               'n_games': len(n_games),
+               'games_per_second': len(n_games) / elapsed,
+               'n_answers': len(latencies),
+               'answers_per_second': len(latencies) / elapsed,
+               'p50_answer_latency_ms': 1000 * latencies[len(latencies) // 2],
+               'p99_answer_latency_ms': 1000 * latencies[int(0.99 * len(latencies))],
+               'n_api_requests': trivia_api.n_requests,
+               'n_games_in_leaderboard': len(leaderboard)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
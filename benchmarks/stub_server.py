@@ -0,0 +1,145 @@
+"""Contains a local stand-in for the Trivia API, used by the benchmarks
+
+It serves the questions of a fixture file on the same /questions endpoint (with the categories and limit parameters)
+over plain HTTP/1.1 with keep-alive, and can simulate the cost of opening a connection and of answering a request.
+"""
+
+import gzip
+import json
+import os
+import random
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep
+from urllib.parse import parse_qs, urlparse
+
+from pytrivia.base import Category
+
+FIXTURES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+QUESTIONS_FIXTURE = os.path.join(FIXTURES_FOLDER, 'questions.json')
+
+
+def load_fixture_questions(path_to_file=QUESTIONS_FIXTURE):
+    """Returns the raw questions (in the format returned by the API) stored in a fixture file"""
+    with open(path_to_file, 'r') as f:
+        return json.load(f)
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections alive between requests
+    disable_nagle_algorithm = True  # headers and body are written separately: avoid delayed ACKs on kept-alive sockets
+
+    def setup(self):
+        # called once per connection: emulates the cost of a TCP+TLS handshake with the real API
+        super().setup()
+        self.server.stub.register_connection()
+        if self.server.stub.handshake_delay:
+            sleep(self.server.stub.handshake_delay)
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        if url.path != '/questions':
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        categories = params.get('categories', [''])[0].split(',') if 'categories' in params else []
+        limit = int(params.get('limit', ['1'])[0])
+        body = json.dumps(stub.sample(categories, limit)).encode('utf-8')
+        if stub.response_delay:
+            sleep(stub.response_delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        stub.register_request()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTriviaServer:
+    """Local HTTP server that mimics the questions endpoint of the Trivia API"""
+
+    def __init__(self, questions: list = None, host: str = '127.0.0.1', port: int = 0, handshake_delay: float = 0.0,
+                 response_delay: float = 0.0):
+        """Initializes a StubTriviaServer object
+
+        Parameters
+        ----------
+        questions: list of dict
+            Raw questions that are served. Defaults to the questions of the fixture file
+        host: str
+            Host the server listens on
+        port: int
+            Port the server listens on (0 picks a free port)
+        handshake_delay: float
+            Seconds spent when a new connection is opened
+        response_delay: float
+            Seconds spent answering each request
+        """
+        self._questions = load_fixture_questions() if questions is None else questions
+        self._questions_by_category = {}
+        for raw_question in self._questions:
+            query_str = Category.map_from_formatted_str(raw_question['category']).query_str
+            self._questions_by_category.setdefault(query_str, []).append(raw_question)
+        self.handshake_delay = handshake_delay
+        self.response_delay = response_delay
+        self._server = ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._n_connections = 0
+        self._n_requests = 0
+
+    @property
+    def url(self):
+        """URL of the questions endpoint (to be passed as base_url to RequestBuilder)"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/questions"
+
+    @property
+    def n_connections(self):
+        """Number of connections opened by clients so far"""
+        return self._n_connections
+
+    @property
+    def n_requests(self):
+        """Number of requests answered so far"""
+        return self._n_requests
+
+    def register_connection(self):
+        with self._lock:
+            self._n_connections += 1
+
+    def register_request(self):
+        with self._lock:
+            self._n_requests += 1
+
+    def sample(self, categories: list, limit: int):
+        """Returns limit random raw questions (with replacement) in the given categories (query strings)"""
+        candidates = [q for cat in categories for q in self._questions_by_category.get(cat, [])] \
+            if categories else self._questions
+        return random.choices(candidates, k=limit) if candidates else []
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
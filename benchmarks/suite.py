@@ -0,0 +1,228 @@
+"""Runs the benchmark suite and writes machine-readable results that can be compared across commits
+
+Run from the root of the repository:
+
+    python -m benchmarks.suite [--output results.json] [--compare baseline.json] [--threshold 10] [--quick]
+
+Benchmarks (all of them run locally: requests go to a stub of the Trivia API serving the recorded fixture questions):
+- fetch: end-to-end latency of RequestBuilder.get_questions through a pooled session
+- convert: throughput of the conversion of raw questions to Question objects (eager and lazy)
+- shuffle: cost of Question.get_randomly_ordered_answers and Question.get_lettered_answers
+- category: cost of mapping category strings to Category (formatted, query and free-form strings)
+- game: full Game playthroughs by a scripted bot, on a static question pool
+
+Every metric is a time (lower is better) measured as the best of several repeats, to filter out the noise of the
+machine. With --compare, the metrics that got slower than the baseline by more than the threshold (in %) are reported
+and the exit status is 1, so that regressions can fail a CI job.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+
+from datetime import datetime, timezone
+from time import perf_counter
+
+from benchmarks.bench_memory import make_raw_questions
+from benchmarks.stub_server import StubTriviaServer, load_fixture_questions
+from pytrivia.base import Category, LazyQuestion, RequestBuilder
+from pytrivia.game import Game
+from pytrivia.pool import StaticQuestionPool
+from pytrivia.session import HttpSession
+from pytrivia.simulation import ScriptedPlayer, play_game
+
+
+THRESHOLD = 10  # % of slowdown reported as a regression
+
+
+def _best_time_per_op(function, n_ops: int, n_repeats: int):
+    """Returns the best time (in us) per operation of a function doing n_ops operations"""
+    best = float('inf')
+    for _ in range(n_repeats):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return 1e6 * best / n_ops
+
+
+def bench_fetch(scale: float, n_repeats: int):
+    n_requests = max(10, int(200 * scale))
+    with StubTriviaServer() as server:
+        session = HttpSession()
+        latencies = []
+        for _ in range(n_repeats):
+            for _ in range(n_requests):
+                start = perf_counter()
+                RequestBuilder(session=session, base_url=server.url).limit(RequestBuilder.MAX_LIMIT).get_questions()
+                latencies.append(perf_counter() - start)
+        session.close()
+    latencies.sort()
+    return {'fetch.latency_p50': 1e6 * latencies[len(latencies) // 2],
+            'fetch.latency_p95': 1e6 * latencies[int(0.95 * len(latencies))]}
+
+
+def bench_convert(scale: float, n_repeats: int):
+    raw_questions = make_raw_questions(max(1000, int(100000 * scale)))
+    n = len(raw_questions)
+    return {'convert.eager': _best_time_per_op(lambda: RequestBuilder._convert_raw_response(raw_questions), n,
+                                               n_repeats),
+            'convert.lazy': _best_time_per_op(lambda: [LazyQuestion(raw) for raw in raw_questions], n, n_repeats)}
+
+
+def bench_shuffle(scale: float, n_repeats: int):
+    questions = RequestBuilder._convert_raw_response(make_raw_questions(max(1000, int(100000 * scale))))
+    n = len(questions)
+
+    def randomly_ordered():
+        for question in questions:
+            question.get_randomly_ordered_answers(n_max=4)
+
+    def lettered():
+        for question in questions:
+            question.get_lettered_answers(n_max=4)
+
+    return {'shuffle.randomly_ordered_answers': _best_time_per_op(randomly_ordered, n, n_repeats),
+            'shuffle.lettered_answers': _best_time_per_op(lettered, n, n_repeats)}
+
+
+def bench_category(scale: float, n_repeats: int):
+    n = max(1000, int(100000 * scale))
+    formatted_strs = [Category.list_formatted_str()[i % 10] for i in range(n)]
+    query_strs = [Category.list_query_str()[i % 10] for i in range(n)]
+    free_strs = [f"  {Category.list_formatted_str()[i % 10].upper().replace(' and ', ' & ')} " for i in range(n)]
+
+    def map_all(mapping, strs):
+        return lambda: [mapping(s) for s in strs]
+
+    return {'category.map_from_formatted_str': _best_time_per_op(map_all(Category.map_from_formatted_str,
+                                                                         formatted_strs), n, n_repeats),
+            'category.map_from_query_str': _best_time_per_op(map_all(Category.map_from_query_str, query_strs), n,
+                                                             n_repeats),
+            'category.map_from_str': _best_time_per_op(map_all(Category.map_from_str, free_strs), n, n_repeats)}
+
+
+def bench_game(scale: float, n_repeats: int):
+    n_games = max(10, int(1000 * scale))
+    pool = StaticQuestionPool(RequestBuilder._convert_raw_response(load_fixture_questions()))
+    # 2 right answers for 1 wrong one: a bonus round every few rounds, the game ends after 23 rounds
+    script = [True, True, False] * 10 + [False] * 20
+    n_rounds = []
+
+    def play_games():
+        random.seed(0)
+        n_rounds.clear()
+        for _ in range(n_games):
+            game = Game(question_pool=pool)
+            play_game(game, ScriptedPlayer(script), max_rounds=1000)
+            n_rounds.append(game.n_rounds + game.n_bonus_rounds)
+
+    per_game = _best_time_per_op(play_games, n_games, n_repeats)
+    return {'game.playthrough': per_game,
+            'game.round': per_game * n_games / sum(n_rounds)}
+
+
+BENCHMARKS = {
+    'fetch': bench_fetch,
+    'convert': bench_convert,
+    'shuffle': bench_shuffle,
+    'category': bench_category,
+    'game': bench_game,
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names: list = None, scale: float = 1.0, n_repeats: int = 5):
+    """Runs benchmarks
+
+    Parameters
+    ----------
+    names: list of str
+        Names of the benchmarks to run (see BENCHMARKS). If None, all of them are run
+    scale: float
+        Factor applied to the number of operations of every benchmark
+    n_repeats: int
+        Number of repeats of each measurement (the best one is kept)
+
+    Returns
+    -------
+    dict
+        Metadata of the run and metrics (name -> microseconds)
+    """
+    metrics = {}
+    for name in names or BENCHMARKS:
+        metrics.update(BENCHMARKS[name](scale, n_repeats))
+    return {'metadata': {'commit': _git_commit(),
+                         'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                         'python': platform.python_version(),
+                         'platform': platform.platform(),
+                         'scale': scale,
+                         'n_repeats': n_repeats,
+                         'unit': 'us'},
+            'metrics': metrics}
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD):
+    """Compares the metrics of two runs
+
+    Returns
+    -------
+    dict
+        Metric -> (baseline value, value, change in %), for the metrics of both runs
+    list of str
+        Metrics that got slower by more than threshold %
+    """
+    changes = {}
+    regressions = []
+    for name, value in results['metrics'].items():
+        if name not in baseline['metrics']:
+            continue
+        baseline_value = baseline['metrics'][name]
+        change = 100 * (value - baseline_value) / baseline_value
+        changes[name] = (baseline_value, value, change)
+        if change > threshold:
+            regressions.append(name)
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help="JSON file the results are written to")
+    parser.add_argument('--compare', metavar='BASELINE', help="JSON file of results to compare with")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="%% of slowdown reported as a regression")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--quick', action='store_true', help="fewer operations and repeats (noisier)")
+    args = parser.parse_args()
+
+    results = run(args.only, scale=0.1 if args.quick else 1.0, n_repeats=3 if args.quick else 5)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if not args.compare:
+        for name, value in results['metrics'].items():
+            print(f"{name:40s} {value:12.2f} us")
+        return
+
+    with open(args.compare, 'r') as f:
+        baseline = json.load(f)
+    changes, regressions = compare(results, baseline, args.threshold)
+    baseline_name = baseline['metadata']['commit'] or 'baseline'
+    print(f"{'':40s} {baseline_name:>12s} {results['metadata']['commit'] or 'current':>12s}")
+    for name, (baseline_value, value, change) in changes.items():
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:40s} {baseline_value:12.2f} {value:12.2f} {change:+8.1f}%{flag}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
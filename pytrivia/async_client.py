@@ -0,0 +1,221 @@
+"""Contains an asyncio version of RequestBuilder
+
+The blocking request path of RequestBuilder (HTTP session, cache, validation and conversion) is run in a thread
+executor, so that an event loop serving many players is never blocked while a request is in flight. A
+ConcurrencyLimiter bounds the number of requests in flight at any time.
+"""
+
+import asyncio
+import threading
+import weakref
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.dedup import CorpusIndex
+from pytrivia.session import HttpSession
+
+
+class ConcurrencyLimiter:
+    """Bounds the number of requests that are in flight at the same time (in each event loop)"""
+
+    MAX_CONCURRENCY = HttpSession.POOL_MAXSIZE  # one keep-alive connection per request in flight
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        """Initializes a ConcurrencyLimiter object
+
+        Parameters
+        ----------
+        max_concurrency: int
+            Maximum number of requests in flight at the same time
+        """
+        self._max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+        self._in_flight = 0
+
+    @property
+    def max_concurrency(self):
+        """
+
+        Returns
+        -------
+        int
+            Maximum number of requests in flight at the same time
+        """
+        return self._max_concurrency
+
+    @property
+    def in_flight(self):
+        """
+
+        Returns
+        -------
+        int
+            Number of requests currently in flight
+        """
+        return self._in_flight
+
+    def _get_semaphore(self):
+        # asyncio primitives must not be shared between event loops: one semaphore is created per loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_concurrency)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    async def __aenter__(self):
+        await self._get_semaphore().acquire()
+        self._in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._in_flight -= 1
+        self._get_semaphore().release()
+
+
+_default_limiter = None
+_default_executor = None
+_defaults_lock = threading.Lock()
+
+
+def _get_defaults():
+    global _default_limiter, _default_executor
+    with _defaults_lock:
+        if _default_limiter is None:
+            _default_limiter = ConcurrencyLimiter()
+            _default_executor = ThreadPoolExecutor(max_workers=_default_limiter.max_concurrency,
+                                                   thread_name_prefix='AsyncRequestBuilder')
+        return _default_limiter, _default_executor
+
+
+class AsyncRequestBuilder:
+    """Asynchronous counterpart of RequestBuilder, with the same fluent syntax: it wraps a RequestBuilder and only
+    exposes awaitable requests."""
+
+    def __init__(self, *args, limiter: ConcurrencyLimiter = None, executor: ThreadPoolExecutor = None, **kwargs):
+        """Initializes an AsyncRequestBuilder object
+
+        Parameters
+        ----------
+        *args
+            Variable length argument list passed on to RequestBuilder.
+        limiter: ConcurrencyLimiter
+            Limiter bounding the number of requests in flight. If None, the limiter shared by all the builders is used
+        executor: ThreadPoolExecutor
+            Executor the requests are sent from. If None, the executor shared by all the builders is used (it should
+            have at least as many workers as the limiter allows requests in flight)
+        **kwargs
+            Arbitrary keyword arguments passed on to RequestBuilder.
+        """
+        self._args = args
+        self._kwargs = kwargs
+        self._builder = RequestBuilder(*args, **kwargs)
+        self._categories = []  # kept to split the request by category
+        self._limit = RequestBuilder.DEFAULT_LIMIT
+        self._corpus_index = None
+        self._limiter = limiter
+        self._executor = executor
+
+    def categories(self, values: list):
+        """Allows to add a Category (or multiple categories) to the request parameters.
+
+        Parameters
+        ----------
+        values: list of Category
+            Categories to be included in the request
+
+        Returns
+        -------
+        self
+        """
+        if not isinstance(values, list):
+            values = [values]
+        self._builder.categories(values)
+        self._categories.extend(val for val in values if val not in self._categories)
+        return self
+
+    def limit(self, value: int):
+        """Allows to limit the number of questions to be returned through the limit request parameter.
+
+        Parameters
+        ----------
+        value: int
+            Number of questions to be included in the request.
+
+        Returns
+        -------
+        self
+        """
+        self._builder.limit(value)
+        self._limit = value
+        return self
+
+    def deduplicate(self, corpus_index: CorpusIndex):
+        """Allows to drop the questions already known to a corpus index (and the repeats within the response) before
+        they are converted to Question instances. Fewer questions than the limit may then be returned.
+
+        Parameters
+        ----------
+        corpus_index: CorpusIndex
+            Index of the questions fetched so far
+
+        Returns
+        -------
+        self
+        """
+        self._builder.deduplicate(corpus_index)
+        self._corpus_index = corpus_index
+        return self
+
+    def _builder_for_category(self, category: Category):
+        return RequestBuilder(*self._args, **self._kwargs).categories([category]).limit(self._limit) \
+            .deduplicate(self._corpus_index)
+
+    async def _run(self, request):
+        default_limiter, default_executor = _get_defaults()
+        limiter = self._limiter or default_limiter
+        executor = self._executor or default_executor
+        async with limiter:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, request)
+
+    async def get_questions(self):
+        """Builds the request URL, sends the request, validates the results and converts the raw response to Question
+        instances, without blocking the event loop
+
+        Returns
+        -------
+        list of Question instances
+        """
+        return await self._run(self._builder.get_questions)
+
+    async def get_raw_questions(self):
+        """Sends the request to the API, or to the question source (the cache is not used), and returns the validated
+        questions as they were received, without blocking the event loop
+
+        Returns
+        -------
+        list of dict
+            Questions in the format returned by the API
+        """
+        return await self._run(self._builder.get_raw_questions)
+
+    async def get_questions_by_category(self):
+        """Sends one request per category (all the categories if none were added), concurrently. Each request is
+        limited to the number of questions set through limit.
+
+        Returns
+        -------
+        dict
+            Category -> list of Question instances
+        """
+        categories = self._categories or [c for c in Category if c != Category.Unknown]
+        results = await asyncio.gather(*[self._run(self._builder_for_category(cat).get_questions)
+                                         for cat in categories])
+        return dict(zip(categories, results))
+
+
+def async_request_from_trivia_api(**kwargs):
+    """Entry-level method for asynchronous requests. The keyword arguments are passed on to AsyncRequestBuilder."""
+    return AsyncRequestBuilder(**kwargs)
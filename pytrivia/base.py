@@ -1,10 +1,22 @@
 """Contains base classes"""
 
 import random
+import re
+import sys
 import requests
 
 from enum import Enum
-from time import sleep
+from itertools import chain, islice
+from types import MappingProxyType
+from time import monotonic, perf_counter, sleep
+
+from pytrivia.dedup import CorpusIndex, question_key
+from pytrivia.metrics import API_FAILURES, API_REQUEST_DURATION, API_RETRIES, CACHE_REQUESTS, QUESTIONS_FETCHED, \
+    REGISTRY
+from pytrivia.retry import CircuitBreaker, RetryPolicy, DEFAULT_RETRY_POLICY, get_default_circuit_breaker
+from pytrivia.session import HttpSession, get_default_session
+from pytrivia.stream import iter_json_array
+from pytrivia.utils import alphabetic_range
 
 
 class Category(Enum):
@@ -54,7 +66,7 @@ class Category(Enum):
         list of str
             List of all the category names formatted for printing (with the exception of the Unknown category).
         """
-        return [c.formatted_str for c in cls if c != Category.Unknown]  # exlude catch-all category
+        return list(_FORMATTED_STRS)
 
     @classmethod
     def list_query_str(cls):
@@ -65,7 +77,25 @@ class Category(Enum):
         list of str
             List of all the category names formatted for querying (with the exception of the Unknown category).
         """
-        return [c.query_str for c in cls if c != Category.Unknown]  # exlude catch-all category
+        return list(_QUERY_STRS)
+
+    @classmethod
+    def map_from_str(cls, category_str):
+        """Maps category names in any form (query string, formatted for printing or one of the names used by the API
+        for existing categories), regardless of case and punctuation, to the corresponding Category (if it's found).
+        Otherwise, it's mapped to the Category.Unknown.
+
+        Parameters
+        ----------
+        category_str: str
+            Category name
+
+        Returns
+        -------
+        Category
+            Corresponding Category
+        """
+        return _NORMALIZED_STR_TO_CATEGORY.get(_normalize_category_str(category_str), Category.Unknown)
 
     @classmethod
     def map_from_query_str(cls, query_str):
@@ -82,10 +112,8 @@ class Category(Enum):
         Category
             Corresponding Category class
         """
-        query_str_to_names_dict = {c.query_str: c.name for c in cls}
-        if query_str in query_str_to_names_dict:
-            return Category[query_str_to_names_dict[query_str]]
-        return Category.Unknown
+        category = _QUERY_STR_TO_CATEGORY.get(query_str)
+        return category if category is not None else cls.map_from_str(query_str)
 
     @classmethod
     def map_from_formatted_str(cls, formatted_str):
@@ -102,15 +130,40 @@ class Category(Enum):
         Category
             Corresponding Category
         """
-        formatted_str_to_names_dict = {c.formatted_str: c.name for c in cls}
-        if formatted_str in formatted_str_to_names_dict:
-            return Category[formatted_str_to_names_dict[formatted_str]]
-        return Category.Unknown
+        category = _FORMATTED_STR_TO_CATEGORY.get(formatted_str)
+        return category if category is not None else cls.map_from_str(formatted_str)
+
+
+def _normalize_category_str(category_str):
+    """Lower-cases a category name and replaces '&' by 'and' and any run of other characters by '_'"""
+    return re.sub(r'[^a-z0-9]+', '_', category_str.lower().replace('&', 'and')).strip('_')
+
+
+# Lookup tables built once (Category is immutable)
+_FORMATTED_STRS = tuple(c.formatted_str for c in Category if c != Category.Unknown)
+_QUERY_STRS = tuple(c.query_str for c in Category if c != Category.Unknown)
+_FORMATTED_STR_TO_CATEGORY = MappingProxyType({c.formatted_str: c for c in Category})
+_QUERY_STR_TO_CATEGORY = MappingProxyType({c.query_str: c for c in Category})
+_CATEGORY_ALIASES = {  # other names used by the API for existing categories
+    'Arts & Literature': Category.ArtAndLiterature,
+    'arts_and_literature': Category.ArtAndLiterature,
+    'Film & TV': Category.Movies,
+    'film_and_tv': Category.Movies,
+}
+_NORMALIZED_STR_TO_CATEGORY = MappingProxyType({
+    **{_normalize_category_str(name): c for c in Category if c != Category.Unknown for name in c.value},
+    **{_normalize_category_str(alias): c for alias, c in _CATEGORY_ALIASES.items()},
+})
+
+
+_ANSWER_KEYS = alphabetic_range(26)  # letters identifying the answers of a question
 
 
 class Answer:
     """Answer base class"""
 
+    __slots__ = ('_text', '_tf')
+
     def __init__(self, text: str, tf: bool):
         """Initializes an Answer object
 
@@ -121,7 +174,7 @@ class Answer:
         tf: bool
             Boolean indicating whether the answer is the correct (True) or wrong (False) to its corresponding question
         """
-        self._text = text
+        self._text = sys.intern(text)  # the same answers come up in many questions: share a single string
         self._tf = tf
 
     @property
@@ -150,8 +203,11 @@ class Answer:
 class Question:
     """Question base class"""
 
+    __slots__ = ('_text', '_category', '_correct_answer', '_wrong_answers', '_key')
+
     def __init__(self, text: str, category: Category, answers: list):
-        """Initializes a Question object
+        """Initializes a Question object. The answers are split into the correct one and the wrong ones once and for
+        all.
 
         Parameters
         ----------
@@ -160,12 +216,16 @@ class Question:
         category: Category
             The category of the question
         answers: list of Answer
-            All the possible answers to the question.
+            All the possible answers to the question. Exactly one of them must be correct.
         """
+        correct_answers = [ans for ans in answers if ans.is_correct]
+        if len(correct_answers) != 1:
+            raise ValueError(f"A question must have exactly one correct answer ({len(correct_answers)} given)")
         self._text = text
         self._category = category
-        self._answers = answers
-        self._random_ordering_indices = random.sample(range(len(answers)), k=len(answers))
+        self._correct_answer = correct_answers[0]
+        self._wrong_answers = tuple(ans for ans in answers if not ans.is_correct)
+        self._key = None  # computed on first access
 
     @property
     def text(self):
@@ -189,6 +249,20 @@ class Question:
         """
         return self._category
 
+    @property
+    def key(self):
+        """
+
+        Returns
+        -------
+        int
+            Key identifying the question (see pytrivia.dedup), equal for questions whose texts only differ by case,
+            accents, punctuation or spacing
+        """
+        if self._key is None:
+            self._key = question_key(self._text)
+        return self._key
+
     @property
     def correct_answer(self):
         """
@@ -198,9 +272,7 @@ class Question:
         Answer
             The correct answer to the question
         """
-        correct_answers = [ans for ans in self._answers if ans.is_correct is True]
-        assert len(correct_answers) == 1
-        return correct_answers[0]
+        return self._correct_answer
 
     @property
     def wrong_answers(self):
@@ -211,9 +283,16 @@ class Question:
         list of Answer
             A list of the wrong answers to the question
         """
-        wrong_answers = [ans for ans in self._answers if ans.is_correct is False]
-        assert len(wrong_answers) == len(self._answers) - 1
-        return wrong_answers
+        return list(self._wrong_answers)
+
+    def _shuffle_answers(self, n_max):
+        n_answers = len(self._wrong_answers) + 1
+        n_max = n_answers if n_max is None else min(n_max, n_answers)
+        answers = random.sample(self._wrong_answers, k=n_max-1)
+        # inserting the correct answer at a random position of randomly-ordered wrong answers gives a random ordering
+        correct_index = random.randrange(n_max)
+        answers.insert(correct_index, self._correct_answer)
+        return answers, correct_index
 
     def get_randomly_ordered_answers(self, n_max=None):
         """Returns a list of randomly-ordered answers to the question (always includes the correct answer)
@@ -228,22 +307,129 @@ class Question:
         -------
         list of Answer
         """
-        n_max = len(self._answers) if n_max is None else min(n_max, len(self._answers))
-        answers_to_combine = random.sample(self.wrong_answers, k=n_max-1) + [self.correct_answer]
-        assert sum([ans.is_correct for ans in answers_to_combine]) == 1
-        return random.sample(answers_to_combine, k=n_max)
+        return self._shuffle_answers(n_max)[0]
+
+    def get_lettered_answers(self, n_max=None):
+        """Returns the randomly-ordered answers to the question keyed by letters ('a', 'b', ...), together with the key
+        of the correct answer
+
+        Parameters
+        ----------
+        n_max: int
+            A restriction on the number of possible answers to the question. If None: no restriction and all the answers
+            returned by the API will be used
+
+        Returns
+        -------
+        dict
+            Letter -> Answer
+        str
+            Letter of the correct answer
+        """
+        answers, correct_index = self._shuffle_answers(n_max)
+        return dict(zip(_ANSWER_KEYS, answers)), _ANSWER_KEYS[correct_index]
+
+
+class LazyQuestion(Question):
+    """Question that is a view over a raw question of the API: its category and its answers are only built when they
+    are first needed, so that the questions that are never asked (e.g. the ones not chosen in a bonus round, or the
+    ones left in a pool) cost little more than the raw dict they wrap."""
+
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw_question: dict):
+        """Initializes a LazyQuestion object
+
+        Parameters
+        ----------
+        raw_question: dict
+            Question in the format returned by the API
+        """
+        self._raw = raw_question
+        self._text = raw_question['question']
+        self._category = None
+        self._correct_answer = None
+        self._wrong_answers = None
+        self._key = None
+
+    def _build_answers(self):
+        self._correct_answer = Answer(self._raw['correctAnswer'], True)
+        self._wrong_answers = tuple(Answer(answer_text, False) for answer_text in self._raw['incorrectAnswers'])
+
+    @property
+    def category(self):
+        if self._category is None:
+            self._category = Category.map_from_formatted_str(self._raw['category'])
+        return self._category
+
+    @property
+    def correct_answer(self):
+        if self._correct_answer is None:
+            self._build_answers()
+        return self._correct_answer
+
+    @property
+    def wrong_answers(self):
+        if self._wrong_answers is None:
+            self._build_answers()
+        return list(self._wrong_answers)
+
+    def _shuffle_answers(self, n_max):
+        if self._correct_answer is None:
+            self._build_answers()
+        return super()._shuffle_answers(n_max)
 
 
 class RequestBuilder:
     """Class with a fluent syntax that can be used to send requests to the Trivia API."""
 
+    BASE_URL = 'https://api.trivia.willfry.co.uk/questions'
     QUESTION_TYPE = 'Multiple Choice'
     DEFAULT_LIMIT = 1
+    MAX_LIMIT = 20  # maximum number of questions the API returns per request
+    STREAM_CHUNK_SIZE = 16 * 1024  # bytes of a response read at once when it is parsed incrementally
 
-    def __init__(self):
-        """Initializes a RequestBuilder object"""
+    def __init__(self, cache=None, offline: bool = False, session: HttpSession = None, base_url: str = BASE_URL,
+                 retry_policy: RetryPolicy = None, circuit_breaker: CircuitBreaker = None, lazy: bool = False,
+                 source=None):
+        """Initializes a RequestBuilder object
+
+        Parameters
+        ----------
+        cache: QuestionCache
+            Cache that is filled with the questions returned by the API and that serves the requests whenever its
+            TTL/size policy allows it. If None, every request is sent to the API
+        offline: bool
+            If True, the requests are always served from the cache and the API is never contacted
+        session: HttpSession
+            Session the requests are sent through. If None, the session shared by all the requests is used
+        base_url: str
+            URL of the questions endpoint of the API
+        retry_policy: RetryPolicy
+            Policy used to retry failed requests. If None, the default policy is used
+        circuit_breaker: CircuitBreaker
+            Breaker that stops sending requests while the API is down (the cached questions are served instead, if
+            any). If None, the breaker shared by all the requests to the host of base_url is used
+        lazy: bool
+            If True, the questions are returned as LazyQuestion views over the raw questions, whose answers are only
+            built when they are needed
+        source: QuestionSource
+            Source the questions are taken from instead of the API (see pytrivia.sources), e.g. a local file. If None,
+            the requests are sent to base_url
+        """
+        if offline and cache is None:
+            raise ValueError("A cache is needed to send requests in offline mode")
         self._categories = []
         self._limit = self.DEFAULT_LIMIT
+        self._cache = cache
+        self._offline = offline
+        self._session = session
+        self._base_url = base_url
+        self._retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+        self._circuit_breaker = circuit_breaker or get_default_circuit_breaker(base_url)
+        self._corpus_index = None
+        self._lazy = lazy
+        self._source = source
 
     def categories(self, values: list):
         """Allows to add a Category (or multiple categories) to the request parameters.
@@ -279,8 +465,34 @@ class RequestBuilder:
         self._limit = value
         return self
 
+    def deduplicate(self, corpus_index: CorpusIndex):
+        """Allows to drop the questions already known to a corpus index (and the repeats within the response) before
+        they are converted to Question instances. Fewer questions than the limit may then be returned.
+
+        Parameters
+        ----------
+        corpus_index: CorpusIndex
+            Index of the questions fetched so far
+
+        Returns
+        -------
+        self
+        """
+        self._corpus_index = corpus_index
+        return self
+
+    def _to_question(self, raw_question):
+        return LazyQuestion(raw_question) if self._lazy else self._convert_raw_question(raw_question)
+
+    def _to_questions(self, raw_data):
+        if self._corpus_index is not None:
+            raw_data = self._corpus_index.filter_new(raw_data)
+        if self._lazy:
+            return [LazyQuestion(raw_question) for raw_question in raw_data]
+        return self._convert_raw_response(raw_data)
+
     def _build_request_url(self):
-        base_url = 'https://api.trivia.willfry.co.uk/questions'
+        base_url = self._base_url
         request_params = []
         if self._categories:
             cat_params = f"categories={','.join([cat.query_str for cat in self._categories])}"
@@ -290,69 +502,235 @@ class RequestBuilder:
         query_url = base_url if not request_params else base_url + f"?{'&'.join(request_params)}"
         return query_url
 
-    @staticmethod
-    def _send_single_request(query_url: str):
-        response = requests.get(query_url)
+    def _send_single_request(self, query_url: str, timeout: float = None, stream: bool = False):
+        session = self._session or get_default_session()
+        kwargs = {} if timeout is None else {'timeout': timeout}
+        try:
+            response = session.get(query_url, stream=stream, **kwargs)
+        except requests.RequestException:  # e.g. connection refused or timed out
+            return None
         if not response or response.status_code != 200:
             return None
-        response_data = response.json()
+        if stream:
+            return response  # the body is read (and parsed) by the caller
+        try:
+            response_data = response.json()
+        except ValueError:  # e.g. the body was truncated, or is an HTML error page
+            return None
         return response_data
 
+    def _is_valid(self, raw_question: dict):
+        return raw_question['type'] == self.QUESTION_TYPE
+
     def _validate(self, response_data: list):
-        return [quest for quest in response_data if quest['type'] == self.QUESTION_TYPE]
-
-    def _send(self, *args, **kwargs):
-        response_data = self._send_single_request(*args, **kwargs)
-        success = False if response_data is None else True
-        runs = 0
-        while success is False and runs < 5:  # if API is unresponsive
-            sleep(3)
-            response_data = self._send_single_request(*args, **kwargs)
-            runs += 1
-            success = False if response_data is None else True
-        if response_data is None:
-            raise ConnectionError("Haven't been able to connect to the API")
-        return response_data
+        return [quest for quest in response_data if self._is_valid(quest)]
+
+    def _fetch_raw_questions(self):
+        if self._source is not None:
+            return self._validate(self._source.get_raw_questions(self._categories, self._limit))
+        return self._validate(self._send(self._build_request_url()))
+
+    @staticmethod
+    def _open_stream(response, chunk_size: int):
+        """Returns the response and an iterator over the items of its JSON array whose first item has already been
+        parsed, so that a body that cannot be parsed fails the attempt (None is returned)"""
+        items = iter_json_array(response.iter_content(chunk_size=chunk_size))
+        try:
+            first_items = list(islice(items, 1))
+        except (ValueError, requests.RequestException):  # e.g. an HTML error page, or the connection was lost
+            response.close()
+            return None
+        return response, chain(first_items, items)
+
+    def _send(self, query_url: str, stream: bool = False, chunk_size: int = STREAM_CHUNK_SIZE):
+        policy = self._retry_policy
+        breaker = self._circuit_breaker
+        deadline = monotonic() + policy.deadline
+        timed = REGISTRY.enabled
+        failure_reason = 'deadline'
+        for attempt in range(policy.max_attempts):
+            time_left = deadline - monotonic()
+            if time_left <= 0:
+                break
+            # once allowed, a request records its outcome, so that a trial request can't leave the breaker half-open
+            if not breaker.allow_request():
+                if timed:
+                    API_FAILURES.inc(reason='circuit_open')
+                raise ConnectionError("The API is unresponsive: requests are suspended for a while")
+            # the connection and read timeouts of the session are capped by the time left before the deadline
+            session_timeout = (self._session or get_default_session()).timeout
+            timeout = tuple(min(t, time_left) for t in session_timeout)
+            if timed:
+                if attempt > 0:
+                    API_RETRIES.inc()
+                start = perf_counter()
+            try:
+                response_data = self._send_single_request(query_url, timeout=timeout, stream=stream)
+                if stream and response_data is not None:
+                    response_data = self._open_stream(response_data, chunk_size)
+            except BaseException:
+                breaker.record_failure()
+                raise
+            if timed:
+                API_REQUEST_DURATION.observe(perf_counter() - start,
+                                             outcome='failure' if response_data is None else 'success')
+            if response_data is not None:
+                breaker.record_success()
+                return response_data
+            breaker.record_failure()
+            delay = policy.backoff(attempt)
+            if attempt == policy.max_attempts - 1:
+                failure_reason = 'attempts'
+                break
+            if monotonic() + delay >= deadline:
+                break
+            sleep(delay)
+        if timed:
+            API_FAILURES.inc(reason=failure_reason)
+        raise ConnectionError("Haven't been able to connect to the API")
+
+    def _record_fetched(self, raw_questions: list):
+        for raw_question in raw_questions:
+            QUESTIONS_FETCHED.inc(category=raw_question['category'])
+
+    @staticmethod
+    def _convert_raw_question(raw_question):
+        wrong_answers = [Answer(answer_text, False) for answer_text in raw_question['incorrectAnswers']]
+        correct_answer = Answer(raw_question['correctAnswer'], True)
+        answers = wrong_answers + [correct_answer]
+        question_text = raw_question['question']
+        question_category_str = raw_question['category']
+        question_category = Category.map_from_formatted_str(question_category_str)
+        return Question(question_text, question_category, answers)
 
     @staticmethod
     def _convert_raw_response(response_data):
-        questions = []
-        for raw_question in response_data:
-            wrong_answers = [Answer(answer_text, False) for answer_text in raw_question['incorrectAnswers']]
-            correct_answer = Answer(raw_question['correctAnswer'], True)
-            answers = wrong_answers + [correct_answer]
-            question_text = raw_question['question']
-            question_category_str = raw_question['category']
-            question_category = Category.map_from_formatted_str(question_category_str)
-            questions.append(Question(question_text, question_category, answers))
-        return questions
+        return [RequestBuilder._convert_raw_question(raw_question) for raw_question in response_data]
+
+    def _get_cached_questions(self, fresh_only: bool):
+        raw_data = self._cache.sample(self._categories, self._limit, fresh_only=fresh_only)
+        if not raw_data:
+            raise ConnectionError("There are no cached questions to serve the request")
+        return self._to_questions(raw_data)
 
     def get_questions(self):
-        """Builds the request URL, sends the request, validates the results and converts the raw response to Question instances
+        """Builds the request URL, sends the request, validates the results and converts the raw response to Question instances.
+        If a cache is used, the request is served from it whenever possible and the questions returned by the API are
+        added to it. Failed requests are retried according to the retry policy; if the API stays unresponsive, the
+        cached questions are served (even if they are not fresh anymore).
 
         Returns
         -------
         list of Question instances
         """
-        request_url = self._build_request_url()
-        raw_data = self._send_single_request(request_url)
-        validated_raw_data = self._validate(raw_data)
-        questions = self._convert_raw_response(validated_raw_data)
+        if self._cache is not None and (self._offline or self._cache.can_serve(self._categories, self._limit)):
+            if REGISTRY.enabled:
+                CACHE_REQUESTS.inc(result='hit')
+            return self._get_cached_questions(fresh_only=not self._offline)
+        try:
+            validated_raw_data = self._fetch_raw_questions()
+        except ConnectionError:
+            if self._cache is None:
+                raise
+            if REGISTRY.enabled:
+                CACHE_REQUESTS.inc(result='stale')
+            return self._get_cached_questions(fresh_only=False)
+        if REGISTRY.enabled:
+            if self._cache is not None:
+                CACHE_REQUESTS.inc(result='miss')
+            self._record_fetched(validated_raw_data)
+        if self._cache is not None:
+            self._cache.add(validated_raw_data)
+        questions = self._to_questions(validated_raw_data)
         return questions
 
+    def get_raw_questions(self, record: bool = True):
+        """Sends the request to the API, or to the question source (the cache is not used), and returns the validated
+        questions as they were received, e.g. to store them
 
-def request_from_trivia_api():
-    """Entry-level method"""
-    return RequestBuilder()
-
-
-def request_random_question():
-    return request_from_trivia_api().limit(1).get_questions()[0]
+        Parameters
+        ----------
+        record: bool
+            If False, the questions are not counted in the metrics of the questions fetched, e.g. because the builder
+            the request is sent for counts them
 
+        Returns
+        -------
+        list of dict
+            Questions in the format returned by the API
+        """
+        raw_data = self._fetch_raw_questions()
+        if record and REGISTRY.enabled:
+            self._record_fetched(raw_data)
+        return raw_data
 
-def request_question_in_category(category: Category):
-    return request_from_trivia_api().categories([category]).limit(1).get_questions()[0]
+    def iter_questions(self, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Same as get_questions, but the response body is parsed incrementally and the validated questions are yielded
+        one at a time, so that large batches are processed in constant memory.
 
+        Parameters
+        ----------
+        chunk_size: int
+            Number of bytes of the response body read at once
 
-def request_3_questions():
-    return request_from_trivia_api().limit(3).get_questions()
\ No newline at end of file
+        Yields
+        ------
+        Question
+        """
+        if self._source is not None or self._cache is not None and \
+                (self._offline or self._cache.can_serve(self._categories, self._limit)):
+            yield from self.get_questions()  # questions of a source are not streamed
+            return
+        request_url = self._build_request_url()
+        try:
+            response, raw_questions = self._send(request_url, stream=True, chunk_size=chunk_size)
+        except ConnectionError:
+            if self._cache is None:
+                raise
+            if REGISTRY.enabled:
+                CACHE_REQUESTS.inc(result='stale')
+            yield from self._get_cached_questions(fresh_only=False)
+            return
+        if REGISTRY.enabled and self._cache is not None:
+            CACHE_REQUESTS.inc(result='miss')
+        known = []  # questions dropped by the corpus index, kept until a new question is found
+        try:
+            for raw_question in raw_questions:
+                if not self._is_valid(raw_question):
+                    continue
+                if REGISTRY.enabled:
+                    QUESTIONS_FETCHED.inc(category=raw_question['category'])
+                if self._cache is not None:
+                    self._cache.add([raw_question], flush=False)
+                if self._corpus_index is not None and not self._corpus_index.add(raw_question):
+                    if known is not None:
+                        known.append(raw_question)
+                    continue
+                known = None
+                yield self._to_question(raw_question)
+            if known:  # only known questions: the corpus index starts a new cycle (see CorpusIndex.filter_new)
+                for raw_question in self._corpus_index.filter_new(known):
+                    yield self._to_question(raw_question)
+        except requests.RequestException as e:  # e.g. the connection was lost while reading the body
+            raise ConnectionError("The connection to the API was lost") from e
+        finally:
+            response.close()
+            if self._cache is not None:
+                self._cache.flush()
+
+
+def request_from_trivia_api(**kwargs):
+    """Entry-level method. The keyword arguments are passed on to RequestBuilder."""
+    return RequestBuilder(**kwargs)
+
+
+def request_random_question(**kwargs):
+    return request_from_trivia_api(**kwargs).limit(1).get_questions()[0]
+
+
+def request_question_in_category(category: Category, **kwargs):
+    return request_from_trivia_api(**kwargs).categories([category]).limit(1).get_questions()[0]
+
+
+def request_3_questions(**kwargs):
+    return request_from_trivia_api(**kwargs).limit(3).get_questions()
@@ -0,0 +1,179 @@
+"""Contains the on-disk cache of questions returned by the Trivia API"""
+
+import os
+import random
+import threading
+
+from time import time
+
+from pytrivia.base import Category
+from pytrivia.dedup import question_key
+from pytrivia.utils import create_folder_if_missing, read_json_file_to_dict, write_dict_to_json_file
+
+
+class QuestionCache:
+    """Stores the raw questions returned by the Trivia API on disk (one JSON file per Category, keyed by the
+    pytrivia.dedup.question_key of the question text), so that they can be served again without connecting to the
+    API."""
+
+    TTL = 7 * 24 * 60 * 60  # seconds during which a cached question is considered fresh
+    MAX_SIZE = 1000  # maximum number of questions kept per category (the oldest ones are evicted first)
+    MIN_SIZE_TO_SERVE = 50  # requests are only served from the cache if it holds at least as many fresh questions
+    REFRESH_RATE = 0.2  # share of the requests the cache could serve that are sent to the API anyway, until it is full
+
+    def __init__(self, folder: str, ttl: float = TTL, max_size: int = MAX_SIZE,
+                 min_size_to_serve: int = MIN_SIZE_TO_SERVE, refresh_rate: float = REFRESH_RATE):
+        """Initializes a QuestionCache object
+
+        Parameters
+        ----------
+        folder: str
+            Folder the cache files are written to
+        ttl: float
+            Number of seconds during which a cached question is considered fresh
+        max_size: int
+            Maximum number of questions kept per category
+        min_size_to_serve: int
+            Minimum number of fresh questions (in the requested categories) needed to serve a request from the cache
+        refresh_rate: float
+            Share of the requests the cache could serve that are sent to the API anyway, so that the cache keeps growing
+            (and its questions stay fresh) until the requested categories hold max_size fresh questions
+        """
+        self._folder = folder
+        self._ttl = ttl
+        self._max_size = max_size
+        self._min_size_to_serve = min_size_to_serve
+        self._refresh_rate = refresh_rate
+        self._entries = {}  # Category -> {key: {'question': raw question, 'cached_at': timestamp}}, loaded lazily
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    @property
+    def folder(self):
+        """
+
+        Returns
+        -------
+        str
+            Folder the cache files are written to
+        """
+        return self._folder
+
+    def _path(self, category: Category):
+        return os.path.join(self._folder, f"{category.name}.json")
+
+    @staticmethod
+    def _key(raw_question: dict):
+        return str(question_key(raw_question['question']))  # JSON object keys are strings
+
+    def _load(self, category: Category):
+        if category not in self._entries:
+            # re-keyed, as files written by older versions are keyed by a SHA-1 hash of the exact question text
+            entries = {}
+            for entry in (read_json_file_to_dict(self._path(category)) or {}).values():
+                key = self._key(entry['question'])
+                if key not in entries or entries[key]['cached_at'] < entry['cached_at']:
+                    entries[key] = entry
+            self._entries[category] = entries
+        return self._entries[category]
+
+    def _is_fresh(self, entry: dict, now: float):
+        return now - entry['cached_at'] <= self._ttl
+
+    def _candidates(self, categories: list, fresh_only: bool):
+        categories = categories or [c for c in Category if c != Category.Unknown]
+        now = time()
+        return [entry['question'] for cat in categories for entry in self._load(cat).values()
+                if not fresh_only or self._is_fresh(entry, now)]
+
+    def add(self, raw_questions: list, flush: bool = True):
+        """Adds raw questions (as returned by the API) to the cache. Questions already in the cache are refreshed.
+
+        Parameters
+        ----------
+        raw_questions: list of dict
+            Raw questions as returned by the API
+        flush: bool
+            Whether to write the modified categories to disk straight away
+        """
+        now = time()
+        with self._lock:
+            for raw_question in raw_questions:
+                category = Category.map_from_formatted_str(raw_question['category'])
+                entries = self._load(category)
+                entries[self._key(raw_question)] = {'question': raw_question, 'cached_at': now}
+                if len(entries) > self._max_size:
+                    oldest_key = min(entries, key=lambda k: entries[k]['cached_at'])
+                    del entries[oldest_key]
+                self._dirty.add(category)
+            if flush:
+                self.flush()
+
+    def flush(self):
+        """Writes the categories modified since the last flush to disk"""
+        with self._lock:
+            if not self._dirty:
+                return
+            create_folder_if_missing(self._folder)
+            for category in self._dirty:
+                write_dict_to_json_file(self._entries[category], self._path(category))
+            self._dirty.clear()
+
+    def n_questions(self, categories: list = None, fresh_only: bool = False):
+        """Returns the number of cached questions
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories to count the questions of. If empty or None, all the categories are counted
+        fresh_only: bool
+            Whether to only count the questions that are still fresh
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            return len(self._candidates(categories, fresh_only))
+
+    def can_serve(self, categories: list, limit: int):
+        """Returns whether a request can be served from the cache according to its TTL/size policy. Until the requested
+        categories are full, a share of the requests (see refresh_rate) is sent to the API to keep the cache growing.
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories of the request. If empty or None, all the categories
+        limit: int
+            Number of questions requested
+
+        Returns
+        -------
+        bool
+        """
+        n_fresh = self.n_questions(categories, fresh_only=True)
+        if n_fresh < max(limit, self._min_size_to_serve):
+            return False
+        categories = categories or [c for c in Category if c != Category.Unknown]
+        return n_fresh >= self._max_size * len(categories) or random.random() >= self._refresh_rate
+
+    def sample(self, categories: list, limit: int, fresh_only: bool = True):
+        """Returns up to limit randomly chosen raw questions from the cache
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories the questions are chosen from. If empty or None, all the categories
+        limit: int
+            Maximum number of questions
+        fresh_only: bool
+            Whether to only choose amongst questions that are still fresh
+
+        Returns
+        -------
+        list of dict
+            Raw questions in the format returned by the API
+        """
+        with self._lock:
+            candidates = self._candidates(categories, fresh_only)
+        return random.sample(candidates, k=min(limit, len(candidates)))
@@ -0,0 +1,144 @@
+"""Contains the request coalescer used to merge concurrent requests for questions into fewer API requests"""
+
+import threading
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import sleep
+from typing import Callable
+
+from pytrivia.base import Category, RequestBuilder, request_from_trivia_api
+
+
+def split_limit(limit: int, max_limit: int = RequestBuilder.MAX_LIMIT):
+    """Splits a number of questions into chunks that can each be requested at once
+
+    Parameters
+    ----------
+    limit: int
+        Total number of questions
+    max_limit: int
+        Maximum number of questions per request
+
+    Returns
+    -------
+    list of int
+        Number of questions of each chunk
+    """
+    return [max_limit] * (limit // max_limit) + ([limit % max_limit] if limit % max_limit else [])
+
+
+class _Batch:
+    """Requests for the same categories collected during the coalescing window"""
+
+    def __init__(self):
+        self.waiters = []  # (limit, Future) pairs
+
+    @property
+    def limit(self):
+        return sum(limit for limit, _ in self.waiters)
+
+
+class RequestCoalescer:
+    """Merges the requests for the same set of categories that arrive within a short window into a single request (split
+    into parallel chunks if it exceeds the maximum limit of the API) and splits the returned questions back out to the
+    callers."""
+
+    WINDOW = 0.02  # seconds during which requests for the same categories are collected
+    MAX_WORKERS = 4  # number of chunks of a batch requested in parallel
+
+    def __init__(self, window: float = WINDOW, request_builder_factory: Callable[[], RequestBuilder] = None,
+                 max_workers: int = MAX_WORKERS):
+        """Initializes a RequestCoalescer object
+
+        Parameters
+        ----------
+        window: float
+            Seconds during which requests for the same categories are collected before being sent together
+        request_builder_factory: callable
+            Returns a new RequestBuilder for each request. Defaults to request_from_trivia_api
+        max_workers: int
+            Number of chunks of a batch requested in parallel
+        """
+        self._window = window
+        self._request_builder_factory = request_builder_factory or request_from_trivia_api
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='RequestCoalescer')
+        self._batches = {}  # frozenset of Category -> _Batch collecting requests
+        self._lock = threading.Lock()
+        self._n_requests = 0
+        self._n_upstream_requests = 0
+
+    @property
+    def stats(self):
+        """
+
+        Returns
+        -------
+        dict
+            Number of requests received ('n_requests') and of requests sent to the API ('n_upstream_requests')
+        """
+        return {'n_requests': self._n_requests, 'n_upstream_requests': self._n_upstream_requests}
+
+    def get_questions(self, categories: list = None, limit: int = RequestBuilder.DEFAULT_LIMIT):
+        """Returns questions, possibly requested together with those of concurrent callers
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories of the questions. If empty or None, questions of any category
+        limit: int
+            Number of questions
+
+        Returns
+        -------
+        list of Question
+        """
+        key = frozenset(categories or [])
+        future = Future()
+        with self._lock:
+            self._n_requests += 1
+            batch = self._batches.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batches[key] = _Batch()
+            batch.waiters.append((limit, future))
+        if is_leader:
+            sleep(self._window)
+            with self._lock:
+                del self._batches[key]  # requests arriving from now on start a new batch
+            self._send_batch(list(key), batch)
+        return future.result()
+
+    def _fetch_chunk(self, categories: list, limit: int):
+        with self._lock:
+            self._n_upstream_requests += 1
+        return self._request_builder_factory().categories(categories).limit(limit).get_questions()
+
+    def _send_batch(self, categories: list, batch: _Batch):
+        try:
+            chunks = [self._executor.submit(self._fetch_chunk, categories, chunk_limit)
+                      for chunk_limit in split_limit(batch.limit)]
+            questions = [question for chunk in chunks for question in chunk.result()]
+        except Exception as e:
+            for _, future in batch.waiters:
+                future.set_exception(e)
+            return
+        start = 0
+        for limit, future in batch.waiters:
+            if start + limit <= len(questions):
+                future.set_result(questions[start:start + limit])
+            else:
+                future.set_exception(ConnectionError("The API returned fewer questions than requested"))
+            start += limit
+
+    def request_random_question(self):
+        return self.get_questions(limit=1)[0]
+
+    def request_question_in_category(self, category: Category):
+        return self.get_questions([category], limit=1)[0]
+
+    def request_3_questions(self):
+        return self.get_questions(limit=3)
+
+    def close(self):
+        """Shuts down the threads requesting the chunks"""
+        self._executor.shutdown()
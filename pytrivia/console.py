@@ -0,0 +1,171 @@
+"""Contains the console front end of the game: it renders the events emitted by a game and reads the player's input"""
+
+from time import perf_counter
+
+from pytrivia.events import Feedback, GameOver, Prompt, PromptKind, RoundType
+from pytrivia.metrics import INPUT_WAIT, REGISTRY
+from pytrivia.utils import print_title, blank_separator
+
+_CHOICE_INTRODUCTIONS = {
+    PromptKind.ChooseQuestion: "In a BONUS ROUND you can choose the question that you want to answer",
+    PromptKind.ChooseCategory: "You can choose the category for the next question",
+}
+_INPUT_LABELS = {
+    PromptKind.ChooseQuestion: "Choose the question that you want to answer: ",
+    PromptKind.ChooseCategory: "Choose the category: ",
+    PromptKind.Answer: "Answer: ",
+}
+
+
+def read_key(text, possible_keys):
+    """Asks the user for input until one of the possible keys is entered
+
+    Parameters
+    ----------
+    text: str
+        Text shown before the input
+    possible_keys: iterable of str
+        Valid inputs
+
+    Returns
+    -------
+    str
+        The key entered by the user
+    """
+    inpt = input(text)
+    while inpt not in possible_keys:
+        print("Invalid input!")
+        inpt = input(text)
+    return inpt
+
+
+def show_home_screen():
+    # Logo generated via: https://www.fancytextpro.com/BigTextGenerator/
+    message = """
+
+                        Welcome to
+
+            ____       ______     _       _
+           / __ \\__  _/_  __/____(_)   __(_)___ _
+          / /_/ / / / // / / ___/ / | / / / __ `/
+         / ____/ /_/ // / / /  / /| |/ / / /_/ /
+        /_/    \\__, //_/ /_/  /_/ |___/_/\\__,_/
+              /____/
+
+                  Press Enter to continue
+            """
+    _ = input(message)
+    blank_separator()
+
+
+def show_prompt(prompt: Prompt):
+    """Prints a prompt emitted by a round"""
+    is_bonus = prompt.round_type == RoundType.Bonus
+    print_title("BONUS ROUND" if is_bonus else f"ROUND {prompt.round_number}")
+    blank_separator()
+    if prompt.kind == PromptKind.Answer:
+        print(f"Current score: {prompt.score}")
+        blank_separator()
+        print(f"Current success streak: {prompt.success_streak}")
+        blank_separator()
+        print(f"(Category: {prompt.category.formatted_str})")
+        blank_separator()
+        print(f"{prompt.text}")
+    else:
+        print(_CHOICE_INTRODUCTIONS[prompt.kind])
+    blank_separator()
+    for key, text in prompt.options.items():
+        print(f"{key}) {text}")
+    blank_separator()
+
+
+def read_response(prompt: Prompt):
+    """Reads the player's response to a prompt
+
+    Returns
+    -------
+    str
+        Key of the option chosen by the player
+    """
+    if REGISTRY.enabled:
+        start = perf_counter()
+        key = read_key(_INPUT_LABELS[prompt.kind], prompt.options)
+        INPUT_WAIT.observe(perf_counter() - start)
+    else:
+        key = read_key(_INPUT_LABELS[prompt.kind], prompt.options)
+    if prompt.kind != PromptKind.Answer:
+        blank_separator()
+    return key
+
+
+def show_feedback(feedback: Feedback):
+    """Prints the outcome of an answer"""
+    if feedback.is_correct:
+        print(f"GOOD! +{feedback.points} points")
+    else:
+        if feedback.points < 0:
+            print(f"WRONG! {feedback.points} points")
+        else:
+            print("WRONG! Don't worry, there was no point deduction")
+        print(f"The correct answer was: {feedback.correct_key}) {feedback.correct_answer}")
+    blank_separator()
+
+
+def show_game_over(summary: GameOver, records: dict):
+    """Prints information about the score whenever the game ends
+
+    Parameters
+    ----------
+    summary: GameOver
+        Summary of the game
+    records: dict
+        Historical records ('score', 'n_rounds' and 'success_streak'), None if there are none
+    """
+    print_title("GAME OVER")
+    blank_separator()
+    print("Game summary:")
+    print(f"- High score: {summary.high_score}")
+    print(f"- Number of rounds: {summary.n_rounds}")
+    print(f"- Longest success streak: {summary.longest_success_streak}")
+    blank_separator()
+    if records is None or summary.high_score > records['score']:
+        print("***Congratulations: you set a new high score!***")
+    if records is None or summary.n_rounds > records['n_rounds']:
+        print("***Congratulations: you set a new record for the number of rounds played!***")
+    if records is None or summary.longest_success_streak > records['success_streak']:
+        print("***Congratulations: you set a new record for longest success streak!***")
+    blank_separator()
+    if records is not None:
+        print("Historical high score summary:")
+        print(f"- High score: {records['score']}")
+        print(f"- Number of rounds: {records['n_rounds']}")
+        print(f"- Longest success streak: {records['success_streak']}")
+    else:
+        print("--No historical high score information--")
+    blank_separator()
+
+
+def play_round(rnd):
+    """Plays a Round in the console until it is finished
+
+    Returns
+    -------
+    Feedback
+    """
+    feedback = None
+    while feedback is None:
+        prompt = rnd.prompt()
+        show_prompt(prompt)
+        feedback = rnd.respond(read_response(prompt))
+    show_feedback(feedback)
+    return feedback
+
+
+def play_game(game):
+    """Plays a started Game in the console until it is over"""
+    while not game.is_over:
+        prompt = game.prompt()
+        show_prompt(prompt)
+        feedback = game.respond(read_response(prompt))
+        if feedback is not None:
+            show_feedback(feedback)
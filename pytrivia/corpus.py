@@ -0,0 +1,318 @@
+"""Contains the binary corpus format, which ships a large number of questions in one compact file that is memory-mapped
+instead of parsed, so that a cold start is instant whatever the size of the corpus
+
+Layout of a corpus file (all the integers are little-endian):
+- header: magic, version, number of categories, questions and answers, and offsets of the sections below
+- category index: for each category, its name (in the string table) and the range of its questions (the questions are
+  sorted by category)
+- question records (fixed width): text (in the string table), category and range of its answers
+- answer records (fixed width): text (in the string table). The first answer of a question is the correct one
+- string table: the UTF-8 texts of the categories, questions and answers, each distinct text being stored once
+
+Questions are only materialized (as Question objects) when they are accessed.
+
+Run from the root of the repository:
+
+    python -m pytrivia.corpus download <corpus file> [--n-questions 10000]
+    python -m pytrivia.corpus import <JSON or JSON Lines file> <corpus file>
+    python -m pytrivia.corpus export <corpus file> <JSON file>
+    python -m pytrivia.corpus info <corpus file>
+"""
+
+import argparse
+import json
+import mmap
+import struct
+
+from pytrivia.base import Answer, Category, Question, RequestBuilder
+from pytrivia.dedup import question_key
+from pytrivia.pool import StaticQuestionPool
+
+
+MAGIC = b'PYTRIVIA'
+VERSION = 1
+_HEADER = struct.Struct('<8sHHII4Q')  # magic, version, n categories, n questions, n answers, 4 section offsets
+_CATEGORY_RECORD = struct.Struct('<IIII')  # name offset, name length, first question, number of questions
+_QUESTION_RECORD = struct.Struct('<IIIHBx')  # text offset, text length, first answer, number of answers, category
+_ANSWER_RECORD = struct.Struct('<II')  # text offset, text length
+
+
+def _distinct(raw_questions: list, keys: set):
+    """Returns the raw questions whose keys are not in keys yet, and adds their keys to it"""
+    distinct_questions = []
+    for raw_question in raw_questions:
+        key = question_key(raw_question['question'])
+        if key not in keys:
+            keys.add(key)
+            distinct_questions.append(raw_question)
+    return distinct_questions
+
+
+class _StringTable:
+    """Accumulates the distinct strings written to a corpus"""
+
+    def __init__(self):
+        self._offsets = {}
+        self._chunks = []
+        self._size = 0
+
+    def add(self, text: str):
+        if text not in self._offsets:
+            encoded = text.encode('utf-8')
+            self._offsets[text] = (self._size, len(encoded))
+            self._chunks.append(encoded)
+            self._size += len(encoded)
+        return self._offsets[text]
+
+    def to_bytes(self):
+        return b''.join(self._chunks)
+
+
+def write_corpus(raw_questions: list, path: str):
+    """Writes raw questions to a corpus file. Invalid questions and repeated ones (see pytrivia.dedup) are skipped.
+
+    Parameters
+    ----------
+    raw_questions: list of dict
+        Questions in the format returned by the API
+    path: str
+        Corpus file
+
+    Returns
+    -------
+    int
+        Number of questions written
+    """
+    raw_questions = [raw_question for raw_question in raw_questions
+                     if raw_question.get('type') == RequestBuilder.QUESTION_TYPE]
+    raw_questions = _distinct(raw_questions, set())
+    categories = list(Category)
+    by_category = {category: [] for category in categories}
+    for raw_question in raw_questions:
+        by_category[Category.map_from_formatted_str(raw_question['category'])].append(raw_question)
+
+    strings = _StringTable()
+    category_records, question_records, answer_records = [], [], []
+    for category_id, category in enumerate(categories):
+        category_records.append(_CATEGORY_RECORD.pack(*strings.add(category.name), len(question_records),
+                                                      len(by_category[category])))
+        for raw_question in by_category[category]:
+            answers = [raw_question['correctAnswer']] + list(raw_question['incorrectAnswers'])
+            question_records.append(_QUESTION_RECORD.pack(*strings.add(raw_question['question']),
+                                                          len(answer_records), len(answers), category_id))
+            answer_records.extend(_ANSWER_RECORD.pack(*strings.add(answer)) for answer in answers)
+
+    categories_offset = _HEADER.size
+    questions_offset = categories_offset + _CATEGORY_RECORD.size * len(category_records)
+    answers_offset = questions_offset + _QUESTION_RECORD.size * len(question_records)
+    strings_offset = answers_offset + _ANSWER_RECORD.size * len(answer_records)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(category_records), len(question_records), len(answer_records),
+                             categories_offset, questions_offset, answers_offset, strings_offset))
+        for records in (category_records, question_records, answer_records):
+            f.write(b''.join(records))
+        f.write(strings.to_bytes())
+    return len(question_records)
+
+
+class CategoryView:
+    """Sequence of the questions of a category in a corpus, materialized on access"""
+
+    def __init__(self, corpus, first: int, length: int):
+        self._corpus = corpus
+        self._first = first
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i: int):
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("Question index out of range")
+        return self._corpus[self._first + i]
+
+
+class Corpus:
+    """Read-only view of a corpus file, which is memory-mapped: opening it does not depend on its size, and each
+    question is only read (and converted to a Question) when it is accessed. It is a sequence of Question."""
+
+    def __init__(self, path: str):
+        """Opens a corpus file
+
+        Parameters
+        ----------
+        path: str
+            Corpus file
+
+        Raises
+        ------
+        ValueError
+            If the file is not a corpus file (or was written by an incompatible version)
+        """
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._buffer) < _HEADER.size:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a corpus file")
+        magic, version, n_categories, self._n_questions, self._n_answers, categories_offset, self._questions_offset, \
+            self._answers_offset, self._strings_offset = _HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self._buffer.close()
+            raise ValueError(f"{path} is not a corpus file (version {VERSION})")
+        self._categories = []  # category id -> Category
+        self._ranges = {}  # Category -> (first question, number of questions)
+        for i in range(n_categories):
+            name_offset, name_length, first, length = \
+                _CATEGORY_RECORD.unpack_from(self._buffer, categories_offset + i * _CATEGORY_RECORD.size)
+            category = Category[self._string(name_offset, name_length)]
+            self._categories.append(category)
+            self._ranges[category] = (first, length)
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _string(self, offset: int, length: int):
+        start = self._strings_offset + offset
+        return self._buffer[start:start + length].decode('utf-8')
+
+    def __len__(self):
+        return self._n_questions
+
+    def _unpack(self, i: int):
+        if i < 0:
+            i += self._n_questions
+        if not 0 <= i < self._n_questions:
+            raise IndexError("Question index out of range")
+        text_offset, text_length, first_answer, n_answers, category_id = \
+            _QUESTION_RECORD.unpack_from(self._buffer, self._questions_offset + i * _QUESTION_RECORD.size)
+        answers = [self._string(*_ANSWER_RECORD.unpack_from(self._buffer,
+                                                            self._answers_offset + j * _ANSWER_RECORD.size))
+                   for j in range(first_answer, first_answer + n_answers)]
+        return self._string(text_offset, text_length), self._categories[category_id], answers
+
+    def __getitem__(self, i: int):
+        text, category, answers = self._unpack(i)
+        return Question(text, category, [Answer(answers[0], True)] + [Answer(answer, False) for answer in answers[1:]])
+
+    def n_questions(self, category: Category = None):
+        """Returns the number of questions of the corpus (of a certain category if given)"""
+        if category is not None:
+            return self._ranges.get(category, (0, 0))[1]
+        return self._n_questions
+
+    def questions_in_category(self, category: Category):
+        """
+
+        Returns
+        -------
+        CategoryView
+            The questions of a certain category, materialized on access
+        """
+        return CategoryView(self, *self._ranges.get(category, (0, 0)))
+
+    def iter_raw(self):
+        """Yields the questions of the corpus in the format returned by the API"""
+        for i in range(self._n_questions):
+            text, category, answers = self._unpack(i)
+            yield {'category': category.formatted_str,
+                   'correctAnswer': answers[0],
+                   'incorrectAnswers': answers[1:],
+                   'question': text,
+                   'type': RequestBuilder.QUESTION_TYPE}
+
+
+class CorpusQuestionPool(StaticQuestionPool):
+    """Serves questions drawn at random from a corpus file. Unlike StaticQuestionPool, the questions are only
+    materialized when they are drawn."""
+
+    def __init__(self, corpus: Corpus):
+        """Initializes a CorpusQuestionPool object
+
+        Parameters
+        ----------
+        corpus: Corpus
+            The corpus the questions are drawn from
+        """
+        if len(corpus) == 0:
+            raise ValueError("The corpus of a static question pool cannot be empty")
+        self._questions = corpus
+        self._questions_by_category = {category: corpus.questions_in_category(category) for category in Category
+                                       if corpus.n_questions(category) > 0}
+
+
+def read_raw_questions(path: str):
+    """Reads raw questions from a JSON file (a list of questions) or a JSON Lines file (one question per line)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def download_raw_questions(n_questions: int, request_builder_factory=RequestBuilder, max_idle_requests: int = 20):
+    """Requests questions from the Trivia API, in batches of every category in turn, until n_questions distinct
+    questions have been received (or the last max_idle_requests requests have not brought any new question)
+
+    Returns
+    -------
+    list of dict
+        The distinct questions received, in the format returned by the API
+    """
+    categories = [category for category in Category if category != Category.Unknown]
+    raw_questions = []
+    keys = set()
+    n_idle_requests = 0
+    i = 0
+    while len(raw_questions) < n_questions and n_idle_requests < max_idle_requests:
+        builder = request_builder_factory().categories([categories[i % len(categories)]]) \
+            .limit(RequestBuilder.MAX_LIMIT)
+        new_questions = _distinct(builder.get_raw_questions(), keys)
+        n_idle_requests = 0 if new_questions else n_idle_requests + 1
+        raw_questions.extend(new_questions)
+        i += 1
+    return raw_questions[:n_questions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds, converts and inspects corpus files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    download_parser = subparsers.add_parser('download', help="download questions from the Trivia API into a corpus")
+    download_parser.add_argument('corpus')
+    download_parser.add_argument('--n-questions', type=int, default=10000)
+    import_parser = subparsers.add_parser('import', help="convert a JSON (or JSON Lines) file into a corpus")
+    import_parser.add_argument('json')
+    import_parser.add_argument('corpus')
+    export_parser = subparsers.add_parser('export', help="convert a corpus into a JSON file")
+    export_parser.add_argument('corpus')
+    export_parser.add_argument('json')
+    info_parser = subparsers.add_parser('info', help="show the number of questions per category of a corpus")
+    info_parser.add_argument('corpus')
+    args = parser.parse_args()
+
+    if args.command == 'download':
+        n_written = write_corpus(download_raw_questions(args.n_questions), args.corpus)
+        print(f"{n_written} questions written to {args.corpus}")
+    elif args.command == 'import':
+        n_written = write_corpus(read_raw_questions(args.json), args.corpus)
+        print(f"{n_written} questions written to {args.corpus}")
+    elif args.command == 'export':
+        with Corpus(args.corpus) as corpus, open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(list(corpus.iter_raw()), f)
+            print(f"{len(corpus)} questions written to {args.json}")
+    else:
+        with Corpus(args.corpus) as corpus:
+            print(f"{len(corpus)} questions")
+            for category in Category:
+                if corpus.n_questions(category):
+                    print(f"- {category.formatted_str}: {corpus.n_questions(category)}")
+
+
+if __name__ == '__main__':
+    main()
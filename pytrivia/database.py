@@ -0,0 +1,331 @@
+"""Contains the question database, an SQLite corpus of questions built from the responses of the Trivia API, indexed so
+that questions are drawn at random with indexed reads instead of HTTP requests
+
+The questions of each category are numbered from 0 to n - 1 (their slot). Drawing a question uniformly at random is
+drawing a slot and reading it through the (category, slot) index, in O(log n) time whatever the size of the database
+(ORDER BY RANDOM() reads and sorts all the questions of the category). Removing a question moves the last question of
+its category to the freed slot, so that the slots stay dense.
+
+Run from the root of the repository:
+
+    python -m pytrivia.database download <database> [--n-questions 10000]
+    python -m pytrivia.database import <JSON, JSON Lines or corpus file> <database>
+    python -m pytrivia.database info <database>
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import threading
+
+from bisect import bisect_right
+from time import time
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.corpus import Corpus, download_raw_questions, read_raw_questions
+from pytrivia.dedup import question_key
+
+
+def _signed(key: int):
+    # SQLite integers are signed 64-bit integers
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+_COLUMNS = "category, question, correct_answer, incorrect_answers, difficulty, tags, api_id"
+
+
+def _to_raw_question(row: tuple):
+    category, question, correct_answer, incorrect_answers, difficulty, tags, api_id = row
+    raw_question = {'category': Category[category].formatted_str,
+                    'correctAnswer': correct_answer,
+                    'incorrectAnswers': json.loads(incorrect_answers),
+                    'question': question,
+                    'tags': json.loads(tags),
+                    'type': RequestBuilder.QUESTION_TYPE}
+    if difficulty is not None:
+        raw_question['difficulty'] = difficulty
+    if api_id is not None:
+        raw_question['id'] = api_id
+    return raw_question
+
+
+class QuestionDatabase:
+    """Stores questions (in the format returned by the API) in an SQLite database, indexed by category, difficulty and
+    number of times served, and draws them at random with indexed reads. It can be used as a question source (see
+    pytrivia.sources), e.g. request_random_question(source=SQLiteSource(path)).
+
+    Questions are identified by the key of their text (see pytrivia.dedup): adding a question that is already in the
+    database updates it."""
+
+    def __init__(self, path: str):
+        """Initializes a QuestionDatabase object (the database is created if it does not exist)
+
+        Parameters
+        ----------
+        path: str
+            SQLite database file (':memory:' for a database that is not persisted)
+        """
+        self._path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS questions (
+                                            key INTEGER PRIMARY KEY,
+                                            category TEXT NOT NULL,
+                                            slot INTEGER NOT NULL,
+                                            question TEXT NOT NULL,
+                                            correct_answer TEXT NOT NULL,
+                                            incorrect_answers TEXT NOT NULL,
+                                            difficulty TEXT,
+                                            tags TEXT NOT NULL,
+                                            api_id,
+                                            times_served INTEGER NOT NULL DEFAULT 0,
+                                            added_at REAL NOT NULL)""")
+            self._connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS questions_by_slot "
+                                     "ON questions (category, slot)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS questions_by_difficulty "
+                                     "ON questions (category, difficulty)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS questions_by_times_served "
+                                     "ON questions (category, times_served)")
+        self._counts = {}  # category name -> number of questions (i.e. next free slot)
+        self._load_counts()
+
+    def _load_counts(self):
+        # one indexed read per category
+        self._counts = {}
+        for category in Category:
+            max_slot = self._connection.execute("SELECT MAX(slot) FROM questions WHERE category = ?",
+                                                (category.name,)).fetchone()[0]
+            if max_slot is not None:
+                self._counts[category.name] = max_slot + 1
+
+    @property
+    def path(self):
+        return self._path
+
+    def __len__(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def n_questions(self, category: Category = None, difficulty: str = None):
+        """Returns the number of questions in the database
+
+        Parameters
+        ----------
+        category: Category
+            If given, only the questions of this category are counted
+        difficulty: str
+            If given, only the questions of this difficulty are counted
+
+        Returns
+        -------
+        int
+        """
+        with self._lock:
+            if difficulty is None:
+                if category is None:
+                    return sum(self._counts.values())
+                return self._counts.get(category.name, 0)
+            categories = [category] if category is not None else list(Category)
+            return sum(self._connection.execute("SELECT COUNT(*) FROM questions WHERE category = ? AND difficulty = ?",
+                                                (cat.name, difficulty)).fetchone()[0] for cat in categories)
+
+    def _free_slot(self, category: str, slot: int):
+        # the last question of the category takes the freed slot
+        last_slot = self._counts[category] - 1
+        if slot != last_slot:
+            self._connection.execute("UPDATE questions SET slot = ? WHERE category = ? AND slot = ?",
+                                     (slot, category, last_slot))
+        self._counts[category] = last_slot
+
+    def upsert(self, raw_questions: list):
+        """Adds questions to the database, or updates them if they are already in it, in one transaction. The questions
+        that are not multiple choice questions are skipped.
+
+        Parameters
+        ----------
+        raw_questions: list of dict
+            Questions in the format returned by the API (e.g. by RequestBuilder.get_raw_questions)
+
+        Returns
+        -------
+        int
+            Number of questions added
+        int
+            Number of questions updated
+        """
+        n_added, n_updated = 0, 0
+        now = time()
+        with self._lock:
+            try:
+                with self._connection:
+                    for raw_question in raw_questions:
+                        if raw_question.get('type') != RequestBuilder.QUESTION_TYPE:
+                            continue
+                        key = _signed(question_key(raw_question['question']))
+                        category = Category.map_from_formatted_str(raw_question['category']).name
+                        fields = (raw_question['question'], raw_question['correctAnswer'],
+                                  json.dumps(list(raw_question['incorrectAnswers'])), raw_question.get('difficulty'),
+                                  json.dumps(list(raw_question.get('tags', []))), raw_question.get('id'))
+                        row = self._connection.execute("SELECT category, slot, times_served FROM questions "
+                                                       "WHERE key = ?", (key,)).fetchone()
+                        if row is not None and row[0] == category:
+                            self._connection.execute("UPDATE questions SET question = ?, correct_answer = ?, "
+                                                     "incorrect_answers = ?, difficulty = ?, tags = ?, api_id = ? "
+                                                     "WHERE key = ?", fields + (key,))
+                            n_updated += 1
+                            continue
+                        times_served = 0
+                        if row is not None:  # the category of the question changed
+                            self._connection.execute("DELETE FROM questions WHERE key = ?", (key,))
+                            self._free_slot(row[0], row[1])
+                            times_served = row[2]
+                            n_updated += 1
+                        else:
+                            n_added += 1
+                        slot = self._counts.get(category, 0)
+                        self._connection.execute("INSERT INTO questions (key, category, slot, question, "
+                                                 "correct_answer, incorrect_answers, difficulty, tags, api_id, "
+                                                 "times_served, added_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                                 (key, category, slot) + fields + (times_served, now))
+                        self._counts[category] = slot + 1
+            except BaseException:
+                self._load_counts()  # the transaction was rolled back
+                raise
+        return n_added, n_updated
+
+    def remove(self, texts: list):
+        """Removes questions from the database, in one transaction
+
+        Parameters
+        ----------
+        texts: list of str
+            Texts of the questions
+
+        Returns
+        -------
+        int
+            Number of questions removed
+        """
+        n_removed = 0
+        with self._lock:
+            try:
+                with self._connection:
+                    for text in texts:
+                        key = _signed(question_key(text))
+                        row = self._connection.execute("SELECT category, slot FROM questions WHERE key = ?",
+                                                       (key,)).fetchone()
+                        if row is not None:
+                            self._connection.execute("DELETE FROM questions WHERE key = ?", (key,))
+                            self._free_slot(*row)
+                            n_removed += 1
+            except BaseException:
+                self._load_counts()
+                raise
+        return n_removed
+
+    def sample(self, categories: list = None, limit: int = 1):
+        """Draws distinct questions uniformly at random (with one indexed read per question) and counts them as served
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories the questions are drawn from. If empty or None, all the categories
+        limit: int
+            Maximum number of questions
+
+        Returns
+        -------
+        list of dict
+            Questions in the format returned by the API
+        """
+        with self._lock:
+            names = [category.name for category in categories] if categories else list(self._counts)
+            names = [name for name in dict.fromkeys(names) if self._counts.get(name)]
+            ends = []  # cumulative number of questions of the categories
+            for name in names:
+                ends.append((ends[-1] if ends else 0) + self._counts[name])
+            n_candidates = ends[-1] if ends else 0
+            keys, raw_questions = [], []
+            for i in random.sample(range(n_candidates), k=min(limit, n_candidates)):
+                j = bisect_right(ends, i)
+                slot = i - (ends[j - 1] if j else 0)
+                row = self._connection.execute(f"SELECT key, {_COLUMNS} FROM questions WHERE category = ? AND slot = ?",
+                                               (names[j], slot)).fetchone()
+                keys.append(row[0])
+                raw_questions.append(_to_raw_question(row[1:]))
+            with self._connection:
+                self._connection.executemany("UPDATE questions SET times_served = times_served + 1 WHERE key = ?",
+                                             [(key,) for key in keys])
+        return raw_questions
+
+    def least_served(self, category: Category, limit: int = 1):
+        """Returns the questions of a category that have been served the fewest times (read through the
+        (category, times served) index), without counting them as served
+
+        Returns
+        -------
+        list of dict
+            Questions in the format returned by the API
+        """
+        with self._lock:
+            rows = self._connection.execute(f"SELECT {_COLUMNS} FROM questions WHERE category = ? "
+                                            f"ORDER BY times_served LIMIT ?", (category.name, limit)).fetchall()
+        return [_to_raw_question(row) for row in rows]
+
+    def times_served(self, text: str):
+        """Returns the number of times a question was served (None if it is not in the database)"""
+        with self._lock:
+            row = self._connection.execute("SELECT times_served FROM questions WHERE key = ?",
+                                           (_signed(question_key(text)),)).fetchone()
+        return None if row is None else row[0]
+
+    def get_raw_questions(self, categories: list, limit: int):
+        """Same as sample, so that a database can be used as a question source"""
+        return self.sample(categories, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds and inspects question databases")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    download_parser = subparsers.add_parser('download', help="download questions from the Trivia API into a database")
+    download_parser.add_argument('database')
+    download_parser.add_argument('--n-questions', type=int, default=10000)
+    import_parser = subparsers.add_parser('import', help="add the questions of a JSON, JSON Lines or corpus file")
+    import_parser.add_argument('file')
+    import_parser.add_argument('database')
+    info_parser = subparsers.add_parser('info', help="show the number of questions per category of a database")
+    info_parser.add_argument('database')
+    args = parser.parse_args()
+
+    with QuestionDatabase(args.database) as database:
+        if args.command in ('download', 'import'):
+            if args.command == 'download':
+                raw_questions = download_raw_questions(args.n_questions)
+            elif args.file.endswith('.corpus'):
+                with Corpus(args.file) as corpus:
+                    raw_questions = list(corpus.iter_raw())
+            else:
+                raw_questions = read_raw_questions(args.file)
+            n_added, n_updated = database.upsert(raw_questions)
+            print(f"{n_added} questions added to {args.database}, {n_updated} updated")
+        print(f"{len(database)} questions")
+        for category in Category:
+            if database.n_questions(category):
+                print(f"- {category.formatted_str}: {database.n_questions(category)}")
+
+
+if __name__ == '__main__':
+    main()
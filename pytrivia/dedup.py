@@ -0,0 +1,163 @@
+"""Contains the question deduplication index, which keeps repeated questions (the Trivia API often sends the same
+question again) out of the question pools and keeps a player from being asked the same question twice in a game
+
+Questions are identified by a 64-bit hash of their normalized text (case, accents, punctuation and spacing are
+ignored), so that the index holds small integers rather than texts or Question objects.
+"""
+
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+
+
+_NON_WORD_CHARACTERS = re.compile(r'[^\w\s]')
+
+
+def normalize_question_text(text: str):
+    """Returns the text of a question without case, accents, punctuation and repeated spaces"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    without_accents = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(_NON_WORD_CHARACTERS.sub('', without_accents).split())
+
+
+def question_key(text: str):
+    """Returns the 64-bit key identifying a question
+
+    Parameters
+    ----------
+    text: str
+        Question in string form
+
+    Returns
+    -------
+    int
+        Hash of the normalized text of the question
+    """
+    digest = hashlib.blake2b(normalize_question_text(text).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class BloomFilter:
+    """Compact set of question keys with no false negatives and a bounded rate of false positives. It can be used
+    instead of a set to remember the questions seen in very long games (e.g. played by bots) in constant memory."""
+
+    CAPACITY = 10000  # number of keys the false positive rate is guaranteed for
+    ERROR_RATE = 0.001  # false positive rate at capacity
+
+    def __init__(self, capacity: int = CAPACITY, error_rate: float = ERROR_RATE):
+        """Initializes a BloomFilter object
+
+        Parameters
+        ----------
+        capacity: int
+            Number of keys the false positive rate is guaranteed for
+        error_rate: float
+            Probability that a key that was never added is reported as present, once capacity keys have been added
+        """
+        self._n_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._n_hashes = max(1, round(self._n_bits / capacity * math.log(2)))
+        self._bits = bytearray((self._n_bits + 7) // 8)
+        self._n_keys = 0
+
+    def __len__(self):
+        return self._n_keys
+
+    def _positions(self, key: int):
+        # double hashing: the two halves of the 64-bit key give all the positions
+        h1, h2 = key & 0xffffffff, (key >> 32) | 1
+        return [(h1 + i * h2) % self._n_bits for i in range(self._n_hashes)]
+
+    def add(self, key: int):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self._n_keys += 1
+
+    def __contains__(self, key: int):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class CorpusIndex:
+    """Remembers the keys of all the questions fetched so far, per category, to reject the ones fetched again before
+    they are converted to Question objects. Once a batch only contains known questions, the corpus of the category is
+    considered exhausted and a new cycle starts: its keys are forgotten, so that the pools are never starved."""
+
+    def __init__(self):
+        self._keys = {}  # category string -> set of question keys
+        self._lock = threading.Lock()
+        self._n_accepted = 0
+        self._n_rejected = 0
+        self._n_cycles = 0
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(keys) for keys in self._keys.values())
+
+    @property
+    def stats(self):
+        """
+
+        Returns
+        -------
+        dict
+            Number of questions accepted, of duplicates rejected and of exhausted categories
+        """
+        with self._lock:
+            return {'n_accepted': self._n_accepted, 'n_rejected': self._n_rejected, 'n_cycles': self._n_cycles}
+
+    def filter_new(self, raw_questions: list):
+        """Returns the raw questions that are not known yet (nor repeated in the batch) and remembers them
+
+        Parameters
+        ----------
+        raw_questions: list of dict
+            Questions in the format returned by the API
+
+        Returns
+        -------
+        list of dict
+        """
+        with self._lock:
+            new_questions = self._filter_new(raw_questions)
+            if raw_questions and not new_questions:  # exhausted categories
+                for category in {raw_question['category'] for raw_question in raw_questions}:
+                    self._keys.pop(category, None)
+                    self._n_cycles += 1
+                new_questions = self._filter_new(raw_questions)
+            self._n_accepted += len(new_questions)
+            self._n_rejected += len(raw_questions) - len(new_questions)
+        return new_questions
+
+    def add(self, raw_question: dict):
+        """Remembers a raw question, e.g. one of a response parsed incrementally. Unlike filter_new, a known question
+        never starts a new cycle: it is up to the caller to call filter_new with the rejected questions if they were
+        all known.
+
+        Parameters
+        ----------
+        raw_question: dict
+            Question in the format returned by the API
+
+        Returns
+        -------
+        bool
+            Whether the question was not known yet
+        """
+        with self._lock:
+            is_new = bool(self._filter_new([raw_question]))
+            if is_new:
+                self._n_accepted += 1
+            else:
+                self._n_rejected += 1
+        return is_new
+
+    def _filter_new(self, raw_questions: list):
+        new_questions = []
+        for raw_question in raw_questions:
+            keys = self._keys.setdefault(raw_question['category'], set())
+            key = question_key(raw_question['question'])
+            if key not in keys:
+                keys.add(key)
+                new_questions.append(raw_question)
+        return new_questions
@@ -0,0 +1,60 @@
+"""Contains the events exchanged between a game and its front end (console, server, bots...)
+
+A game emits a Prompt whenever the player has to make a choice and answers each response with a Feedback (once a
+question has been answered) or with the next Prompt. No input or output is done by the game itself.
+"""
+
+from enum import Enum
+from typing import NamedTuple
+
+from pytrivia.base import Category
+
+
+class RoundType(Enum):
+    """Enumerates the types of rounds"""
+
+    Regular = 'regular'
+    Bonus = 'bonus'
+    Category = 'category'
+
+
+class PromptKind(Enum):
+    """Enumerates the choices a player can be asked to make"""
+
+    ChooseQuestion = 'choose_question'  # choose the question to answer amongst a few (bonus rounds)
+    ChooseCategory = 'choose_category'  # choose the category of the question (category rounds)
+    Answer = 'answer'  # answer the question
+
+
+class Prompt(NamedTuple):
+    """Emitted whenever the player has to make a choice"""
+
+    kind: PromptKind
+    round_type: RoundType
+    round_number: int
+    score: int  # score at the start of the round
+    success_streak: int  # success streak at the start of the round
+    options: dict  # key to be sent back -> text of the option
+    text: str = None  # question to be answered (Answer prompts only)
+    category: Category = None  # category of the question to be answered (Answer prompts only)
+
+
+class Feedback(NamedTuple):
+    """Emitted once the player has answered a question"""
+
+    round_type: RoundType
+    round_number: int
+    is_correct: bool
+    points: int  # points added to (or deducted from, if negative) the score
+    correct_key: str
+    correct_answer: str
+    score: int  # score at the end of the round
+    success_streak: int  # success streak at the end of the round
+
+
+class GameOver(NamedTuple):
+    """Summary of a game that is over"""
+
+    high_score: int
+    n_rounds: int
+    longest_success_streak: int
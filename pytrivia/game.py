@@ -1,24 +1,36 @@
 from typing import Callable, Type
 from abc import ABC, abstractmethod
+from collections import deque
 from datetime import datetime
+from time import perf_counter
 
-from pytrivia.utils import print_title,\
-    blank_separator,\
-    alphabetic_range,\
-    create_folder_if_missing, \
-    create_file_if_missing, \
-    read_json_file_to_dict, \
-    write_dict_to_json_file
+from pytrivia.utils import create_folder_if_missing, write_dict_to_json_file
 from pytrivia.base import Category,\
     request_random_question,\
     request_3_questions,\
-    request_question_in_category
+    request_question_in_category,\
+    request_from_trivia_api
+from pytrivia.cache import QuestionCache
+from pytrivia.console import play_game, play_round, show_game_over, show_home_screen
+from pytrivia.events import Feedback, GameOver, Prompt, PromptKind, RoundType
+from pytrivia.pool import QuestionPool
+from pytrivia.leaderboard import Leaderboard
+from pytrivia.metrics import QUESTION_WAIT, REGISTRY, ROUND_DURATION
+from pytrivia.scores import HighScoreStore
 
 
 class Round(ABC):
-    """Abstract parent class for Round objects"""
+    """Abstract parent class for Round objects. A round is a state machine: prompt returns what the player has to
+    choose next and respond takes the player's choice, until the question has been answered. No input or output is
+    done by the round itself (see play for the console front end)."""
 
-    def __init__(self, number: int, initial_score: int, initial_success_streak: int):
+    ROUND_TYPE = None
+    N_ANSWERS = 4  # number of possible answers shown for a question
+    POS_POINTS = 1  # points added for a good answer
+    NEG_POINTS = 1  # points deducted for a bad answer
+
+    def __init__(self, number: int, initial_score: int, initial_success_streak: int,
+                 question_pool: QuestionPool = None, seen_questions=None):
         """Initializes an object of the Round class
 
         Parameters
@@ -29,13 +41,24 @@ class Round(ABC):
             Score at the start of the round
         initial_success_streak: int
             Success streak at the start of the round
+        question_pool: QuestionPool
+            Pool the questions are taken from. If None, the questions are requested directly from the API
+        seen_questions: set or BloomFilter
+            Keys of the questions already asked in the game, which the pool skips. The question of the round is added
+            to it
         """
         self._number = number
         self._initial_score = initial_score
         self._initial_success_streak = initial_success_streak
-        self._question = self._set_question()
+        self._question_pool = question_pool
+        self._seen_questions = seen_questions
+        self._question = None
+        self._answers = None  # letter -> Answer
+        self._correct_key = None
         self._final_score = None
         self._final_success_streak = None
+        self._started_at = perf_counter() if REGISTRY.enabled else None
+        self._prepare()
 
     @property
     def number(self):
@@ -92,35 +115,140 @@ class Round(ABC):
         """
         return self._final_success_streak
 
-    @abstractmethod
-    def _set_question(self):
-        pass
+    @property
+    def question(self):
+        """
+
+        Returns
+        -------
+        Question
+            The question of the round (None as long as the player has not chosen it)
+        """
+        return self._question
+
+    @property
+    def correct_key(self):
+        """
+
+        Returns
+        -------
+        str
+            Key of the correct answer to the question of the round (None as long as the player has not chosen it)
+        """
+        return self._correct_key
+
+    @property
+    def is_finished(self):
+        """
+
+        Returns
+        -------
+        bool
+            Whether the question of the round has been answered
+        """
+        return self._final_score is not None
 
     @abstractmethod
-    def play(self):
+    def _prepare(self):
+        """Gets the question of the round, or what the player chooses it from"""
         pass
 
-    def _get_numeric_user_input(self, text, possible_answers):
-        inpt = input(text)
-        if inpt.isdigit() and int(inpt) in possible_answers:
-            return int(inpt)
+    def _wait_for_questions(self, get_questions: Callable, *args):
+        """Returns get_questions(*args), which takes questions from the pool or requests them from the API, and times
+        the wait if the metrics are enabled"""
+        if not REGISTRY.enabled:
+            return get_questions(*args)
+        start = perf_counter()
+        questions = get_questions(*args)
+        QUESTION_WAIT.observe(perf_counter() - start, round_type=self.ROUND_TYPE.value)
+        return questions
+
+    def _set_question(self, question):
+        self._question = question
+        if self._seen_questions is not None:
+            self._seen_questions.add(question.key)
+        self._answers, self._correct_key = question.get_lettered_answers(n_max=self.N_ANSWERS)
+
+    def _choice_prompt(self):
+        raise NotImplementedError(f"{type(self).__name__} does not let the player choose the question")
+
+    def _choose(self, key: str):
+        raise NotImplementedError(f"{type(self).__name__} does not let the player choose the question")
+
+    def _score(self, is_correct: bool):
+        if is_correct:
+            self._final_score = self.initial_score + self.POS_POINTS
+            self._final_success_streak = self.initial_success_streak + 1
         else:
-            print("Invalid input!")
-            return self._get_numeric_user_input(text, possible_answers)
+            self._final_score = self.initial_score - self.NEG_POINTS
+            self._final_success_streak = 0
 
-    def _get_string_user_input(self, text, possible_answers):
-        inpt = input(text)
-        if inpt in possible_answers:
-            return inpt
-        else:
-            print("Invalid input!")
-            return self._get_string_user_input(text, possible_answers)
+    def prompt(self):
+        """Returns what the player has to choose next
+
+        Returns
+        -------
+        Prompt
+        """
+        if self._question is None:
+            return self._choice_prompt()
+        return Prompt(kind=PromptKind.Answer,
+                      round_type=self.ROUND_TYPE,
+                      round_number=self.number,
+                      score=self.initial_score,
+                      success_streak=self.initial_success_streak,
+                      options={key: ans.text for key, ans in self._answers.items()},
+                      text=self._question.text,
+                      category=self._question.category)
+
+    def respond(self, key: str):
+        """Takes the player's response to the current prompt
+
+        Parameters
+        ----------
+        key: str
+            Key of the option chosen by the player
+
+        Returns
+        -------
+        Feedback
+            The outcome of the answer, or None if the player chose the question (and still has to answer it)
+        """
+        if self.is_finished:
+            raise RuntimeError("The round is already finished")
+        if self._question is None:
+            self._choose(key)
+            return None
+        if key not in self._answers:
+            raise ValueError(f"Invalid answer: {key!r}")
+        is_correct = key == self._correct_key
+        self._score(is_correct)
+        if self._started_at is not None and REGISTRY.enabled:
+            ROUND_DURATION.observe(perf_counter() - self._started_at, round_type=self.ROUND_TYPE.value)
+        return Feedback(round_type=self.ROUND_TYPE,
+                        round_number=self.number,
+                        is_correct=is_correct,
+                        points=self.final_score - self.initial_score,
+                        correct_key=self._correct_key,
+                        correct_answer=self._answers[self._correct_key].text,
+                        score=self.final_score,
+                        success_streak=self.final_success_streak)
+
+    def play(self):
+        """Plays the round in the console
+
+        Returns
+        -------
+        Feedback
+        """
+        return play_round(self)
 
 
 class RegularRound(Round):
     """Class for regular rounds where the user faces a question with 4 possible answers and points are added (deducted)
     for correct (incorrect) answers"""
 
+    ROUND_TYPE = RoundType.Regular
     POS_POINTS = 1  # points added for a good answer
     NEG_POINTS = 1  # points deducted for a bad answer
 
@@ -136,63 +264,22 @@ class RegularRound(Round):
         """
         super().__init__(*args, **kwargs)
 
-    def _set_question(self):
-        return request_random_question()
-
-    def play(self):
-        """Starts a round that requests a random question from the API and asks the user to input the index
-        corresponding to the correct answer to a certain question.
-
-        Returns
-        -------
-
-        """
-        # get question and answers
-        question = self._question
-        answers = question.get_randomly_ordered_answers(n_max=4)
-        category = question.category
-        initial_score = self.initial_score
-        success_streak = self.initial_success_streak
-        round_n = self.number
-        # structure answers in a dictionary
-        dict_answers = {k: v for k, v in zip(alphabetic_range(len(answers)), answers)}
-        # structure visual output
-        print_title(f"ROUND {round_n}")
-        blank_separator()
-        print(f"Current score: {initial_score}")
-        blank_separator()
-        print(f"Current success streak: {success_streak}")
-        blank_separator()
-        print(f"(Category: {category.formatted_str})")
-        blank_separator()
-        print(f"{question.text}")
-        blank_separator()
-        for key, ans in dict_answers.items():
-            print(f"{key}) {ans.text}")
-        blank_separator()
-        input_key = self._get_string_user_input("Answer: ", dict_answers.keys())
-        # check the input
-        tf = dict_answers[input_key].is_correct
-        if tf:
-            print(f"GOOD! +{self.POS_POINTS} points")
-            self._final_score = initial_score + self.POS_POINTS
-            self._final_success_streak = success_streak + 1
+    def _prepare(self):
+        if self._question_pool is not None:
+            self._set_question(self._wait_for_questions(self._question_pool.get_random_question,
+                                                        self._seen_questions))
         else:
-            print(f"WRONG! -{self.NEG_POINTS} points")
-            right_answer = question.correct_answer
-            right_key = [k for k in dict_answers.keys() if dict_answers[k] == right_answer][0]
-            print(f"The correct answer was: {right_key}) {right_answer.text}")
-            self._final_score = initial_score - self.NEG_POINTS
-            self._final_success_streak = 0
-        blank_separator()
+            self._set_question(self._wait_for_questions(request_random_question))
 
 
 class BonusRound(Round):
     """Class for bonus rounds where the user is allowed to choose which question to answer amongst 3 possibles and then
     faces a question with 4 possible answers and points are added for correct answers."""
 
+    ROUND_TYPE = RoundType.Bonus
     POS_POINTS = 2  # points added for a good answer
     NEG_POINTS = 0  # points deducted for a bad answer
+    N_QUESTIONS = 3  # number of questions the user chooses from
 
     def __init__(self, *args, **kwargs):
         """Instantiates an object of the class BonusRound
@@ -206,69 +293,51 @@ class BonusRound(Round):
         """
         super().__init__(*args, **kwargs)
 
-    def _set_question(self):
-        questions = request_3_questions()
-        print_title("BONUS ROUND")
-        blank_separator()
-        print("In a BONUS ROUND you can choose the question that you want to answer")
-        blank_separator()
-        for i in range(3):
-            print(f"{i + 1}) {questions[i].text}")
-        blank_separator()
-        input_idx = self._get_numeric_user_input("Choose the question that you want to answer: ", range(1, 4))
-        blank_separator()
-        return questions[input_idx - 1]
-
-    def play(self):
-        """Starts a round that requests 3 random questions from the API, asks the user to select which of the three
-        questions to answer and then gives the user 4 possible answers to the chosen question.
+    @property
+    def candidates(self):
+        """
 
         Returns
         -------
-
+        list of Question
+            The questions the user chooses from
         """
-        # get question and answers
-        question = self._question
-        answers = question.get_randomly_ordered_answers(n_max=4)
-        category = question.category
-        initial_score = self.initial_score
-        success_streak = self.initial_success_streak
-        # structure answers in a dictionary
-        dict_answers = {k: v for k, v in zip(alphabetic_range(len(answers)), answers)}
-        # structure visual output
-        print_title(f"BONUS ROUND")
-        blank_separator()
-        print(f"Current score: {initial_score}")
-        blank_separator()
-        print(f"Current success streak: {success_streak}")
-        blank_separator()
-        print(f"(Category: {category.formatted_str})")
-        blank_separator()
-        print(f"{question.text}")
-        blank_separator()
-        for key, ans in dict_answers.items():
-            print(f"{key}) {ans.text}")
-        blank_separator()
-        input_key = self._get_string_user_input("Answer: ", dict_answers.keys())
-        # check the input
-        tf = dict_answers[input_key].is_correct
-        if tf:
-            print(f"GOOD! +{self.POS_POINTS} points")
-            self._final_score = initial_score + self.POS_POINTS
+        return self._candidates
+
+    def _prepare(self):
+        if self._question_pool is not None:
+            self._candidates = self._wait_for_questions(self._question_pool.get_random_questions, self.N_QUESTIONS,
+                                                        self._seen_questions)
         else:
-            print(f"WRONG! Don't worry, there was no point deduction")
-            right_answer = question.correct_answer
-            right_key = [k for k in dict_answers.keys() if dict_answers[k] == right_answer][0]
-            print(f"The correct answer was: {right_key}) {right_answer.text}")
-            self._final_score = initial_score - self.NEG_POINTS
-        self._final_success_streak = success_streak  # bonus rounds do not count towards success streak count
-        blank_separator()
+            self._candidates = self._wait_for_questions(request_3_questions)
+
+    def _choice_prompt(self):
+        return Prompt(kind=PromptKind.ChooseQuestion,
+                      round_type=self.ROUND_TYPE,
+                      round_number=self.number,
+                      score=self.initial_score,
+                      success_streak=self.initial_success_streak,
+                      options={str(i + 1): question.text for i, question in enumerate(self._candidates)})
+
+    def _choose(self, key: str):
+        options = [str(i + 1) for i in range(len(self._candidates))]
+        if key not in options:
+            raise ValueError(f"Invalid question: {key!r}")
+        self._set_question(self._candidates[int(key) - 1])
+        if self._question_pool is not None:  # the questions that were not chosen go back to the pool
+            self._question_pool.put_back([candidate for candidate in self._candidates
+                                          if candidate is not self._question])
+
+    def _score(self, is_correct: bool):
+        self._final_score = self.initial_score + (self.POS_POINTS if is_correct else -self.NEG_POINTS)
+        self._final_success_streak = self.initial_success_streak  # bonus rounds do not count towards success streak count
 
 
 class CategoryRound(Round):
     """Class for category rounds where the user is allowed to choose the category for the next question and then
     faces a question with 4 possible answers and points are added for correct answers."""
 
+    ROUND_TYPE = RoundType.Category
     POS_POINTS = 1  # points added for a good answer
     NEG_POINTS = 1  # points deducted for a bad answer
 
@@ -284,81 +353,127 @@ class CategoryRound(Round):
         """
         super().__init__(*args, **kwargs)
 
-    def _set_question(self):
-        print_title(f"ROUND {self.number}")
-        blank_separator()
-        print("You can choose the category for the next question")
-        blank_separator()
-        cat_dict = Category.list_formatted_str()
-        for i in range(len(cat_dict)):
-            print(f"{i+1}) {cat_dict[i]}")
-        blank_separator()
-        input_idx = self._get_numeric_user_input("Choose the category: ", range(1, len(cat_dict)+1))
-        blank_separator()
-        chosen_cat = Category.map_from_formatted_str(cat_dict[input_idx-1])
-        question = request_question_in_category(chosen_cat)
-        return question
-
-    def play(self):
-        """Starts a round that lists all the possible categories and asks the user to choose 1. Then, it procedes the
-        same way as a normal round.
-
-        Returns
-        -------
-
-        """
-        # get question and answers
-        question = self._question
-        answers = question.get_randomly_ordered_answers(n_max=4)
-        category = question.category
-        initial_score = self.initial_score
-        success_streak = self.initial_success_streak
-        round_n = self.number
-        # structure answers in a dictionary
-        dict_answers = {k: v for k, v in zip(alphabetic_range(len(answers)), answers)}
-        # structure visual output
-        print_title(f"ROUND {round_n}")
-        blank_separator()
-        print(f"Current score: {initial_score}")
-        blank_separator()
-        print(f"Current success streak: {success_streak}")
-        blank_separator()
-        print(f"(Category: {category.formatted_str})")
-        blank_separator()
-        print(f"{question.text}")
-        blank_separator()
-        for key, ans in dict_answers.items():
-            print(f"{key}) {ans.text}")
-        blank_separator()
-        input_key = self._get_string_user_input("Answer: ", dict_answers.keys())
-        # check the input
-        tf = dict_answers[input_key].is_correct
-        if tf:
-            print(f"GOOD! +{self.POS_POINTS} points")
-            self._final_score = initial_score + self.POS_POINTS
-            self._final_success_streak = success_streak + 1
+    def _prepare(self):
+        self._categories = [Category.map_from_formatted_str(cat) for cat in Category.list_formatted_str()]
+        # the question of every category is taken from the pool (or requested in parallel) while the player chooses,
+        # so that the question of the chosen category is ready straight away
+        self._prefetched = None if self._question_pool is None else \
+            self._question_pool.prefetch_questions_in_categories(self._categories, self._seen_questions)
+
+    def _put_back_prefetched(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self._question_pool.put_back([future.result()])
+
+    def _choice_prompt(self):
+        return Prompt(kind=PromptKind.ChooseCategory,
+                      round_type=self.ROUND_TYPE,
+                      round_number=self.number,
+                      score=self.initial_score,
+                      success_streak=self.initial_success_streak,
+                      options={str(i + 1): cat.formatted_str for i, cat in enumerate(self._categories)})
+
+    def _choose(self, key: str):
+        options = [str(i + 1) for i in range(len(self._categories))]
+        if key not in options:
+            raise ValueError(f"Invalid category: {key!r}")
+        chosen_cat = self._categories[int(key) - 1]
+        if self._question_pool is not None:
+            chosen_future = self._prefetched.pop(chosen_cat, None)
+            for future in self._prefetched.values():  # the questions of the other categories go back to the pool
+                future.add_done_callback(self._put_back_prefetched)
+            self._prefetched = {}
+            if chosen_future is not None:
+                self._set_question(self._wait_for_questions(chosen_future.result))
+            else:
+                self._set_question(self._wait_for_questions(self._question_pool.get_question_in_category, chosen_cat,
+                                                            self._seen_questions))
         else:
-            print(f"WRONG! -{self.NEG_POINTS} points")
-            right_answer = question.correct_answer
-            right_key = [k for k in dict_answers.keys() if dict_answers[k] == right_answer][0]
-            print(f"The correct answer was: {right_key}) {right_answer.text}")
-            self._final_score = initial_score - self.NEG_POINTS
-            self._final_success_streak = 0
-        blank_separator()
+            self._set_question(self._wait_for_questions(request_question_in_category, chosen_cat))
 
 
 class Game:
-    """Game is comprised of a series of rounds and stops when points reach 0 or below."""
+    """Game is comprised of a series of rounds and stops when points reach 0 or below. It can be played in the console
+    (play) or driven programmatically, without any input or output: start it, then send the player's response to each
+    prompt (respond) until it is over."""
 
     START_SCORE = 1
     START_ROUND = 0
     START_SUCCESS_STREAK = 0
     BONUS_ROUND_SUCCESS_STREAK_THRES = 3
+    CATEGORY_ROUND_FREQUENCY = 5  # every 5th round is a category round
+    REGULAR_ROUND = RegularRound
+    BONUS_ROUND = BonusRound
+    CATEGORY_ROUND = CategoryRound
     CACHE_FOLDER = 'cache/'
+    QUESTION_CACHE_FOLDER = CACHE_FOLDER + 'questions/'
+    HIGH_SCORE_FILE = CACHE_FOLDER + 'cache.json'
+    LEADERBOARD_FILE = CACHE_FOLDER + 'leaderboard.db'
+    METRICS_FILE = CACHE_FOLDER + 'metrics.json'  # JSON snapshot of the metrics, written if they are enabled
 
-    def __init__(self):
-        """Initializes an instance of Game"""
-        self._rounds = []
+    def __init__(self, question_pool: QuestionPool = None, offline: bool = False, max_kept_rounds: int = None,
+                 high_score_store: HighScoreStore = None, leaderboard: Leaderboard = None, player: str = None,
+                 seen_questions=None):
+        """Initializes an instance of Game
+
+        Parameters
+        ----------
+        question_pool: QuestionPool
+            Pool the questions of all the rounds are taken from. It can be shared between games. If None, the game
+            creates its own pool, which is started when the game starts and stopped when it is over.
+        offline: bool
+            If True (and no question pool is given), all the questions are served from the question cache and the
+            Trivia API is never contacted
+        max_kept_rounds: int
+            If given, only the most recent rounds are kept in memory (the statistics of the game are kept up to date as
+            the rounds are played, so they do not need the older ones). Useful for very long games, e.g. played by bots
+        high_score_store: HighScoreStore
+            Store the score is saved to once the game is over (it can be shared between games). If None, the game uses
+            the high-score file of the cache folder
+        leaderboard: Leaderboard
+            If given, the game is recorded in it once it is over
+        player: str
+            Name of the player, for the leaderboard
+        seen_questions: set or BloomFilter
+            Keys of the questions asked in the game, so that none is asked twice. Defaults to an empty set (a
+            BloomFilter bounds the memory used by very long games)
+        """
+        self._rounds = deque(maxlen=max_kept_rounds)
+        self._n_rounds = 0  # non-bonus rounds
+        self._n_bonus_rounds = 0
+        self._current_round_number = self.START_ROUND
+        self._current_score = self.START_SCORE
+        self._current_success_streak = self.START_SUCCESS_STREAK
+        self._high_score = self.START_SCORE
+        self._longest_success_streak = self.START_SUCCESS_STREAK
+        self._owns_question_pool = question_pool is None
+        self._question_pool = self.create_question_pool(offline) if question_pool is None else question_pool
+        self._high_score_store = HighScoreStore(self.HIGH_SCORE_FILE) if high_score_store is None else high_score_store
+        self._leaderboard = leaderboard
+        self._player = player
+        self._seen_questions = set() if seen_questions is None else seen_questions
+
+    @classmethod
+    def create_question_pool(cls, offline: bool = False, source=None):
+        """Creates a question pool that fills (and is served from) the question cache of the game
+
+        Parameters
+        ----------
+        offline: bool
+            If True, the questions are only served from the question cache and the Trivia API is never contacted
+        source: QuestionSource
+            If given, the questions are taken from this source (see pytrivia.sources) instead of the Trivia API and the
+            question cache
+
+        Returns
+        -------
+        QuestionPool
+        """
+        # some questions are never asked (bonus round candidates, questions left in the pool): build answers lazily
+        if source is not None:
+            return QuestionPool(request_builder_factory=lambda: request_from_trivia_api(source=source, lazy=True))
+        question_cache = QuestionCache(cls.QUESTION_CACHE_FOLDER)
+        return QuestionPool(request_builder_factory=lambda: request_from_trivia_api(cache=question_cache,
+                                                                                    offline=offline, lazy=True))
 
     @property
     def high_score(self):
@@ -369,7 +484,7 @@ class Game:
         int
             The highest score reached at any point during the game
         """
-        return max([rnd.final_score for rnd in self._rounds] + [rnd.initial_score for rnd in self._rounds])
+        return self._high_score
 
     @property
     def n_rounds(self):
@@ -380,8 +495,18 @@ class Game:
         int
             The number of rounds played in the game
         """
-        non_bonus_rounds = [rnd for rnd in self._rounds if not isinstance(rnd, BonusRound)]
-        return len(non_bonus_rounds)
+        return self._n_rounds
+
+    @property
+    def n_bonus_rounds(self):
+        """
+
+        Returns
+        -------
+        int
+            The number of bonus rounds played in the game
+        """
+        return self._n_bonus_rounds
 
     @property
     def current_round_number(self):
@@ -392,11 +517,7 @@ class Game:
         int
             The current round number
         """
-        if len(self._rounds) > 0:
-            non_bonus_rounds = [rnd for rnd in self._rounds if not isinstance(rnd, BonusRound)]
-            return non_bonus_rounds[-1].number
-        else:
-            return self.START_ROUND
+        return self._current_round_number
 
     @property
     def current_score(self):
@@ -407,10 +528,7 @@ class Game:
         int
             The current score (end of previous round if round just started)
         """
-        if len(self._rounds) > 0:
-            return self._rounds[-1].final_score
-        else:
-            return self.START_SCORE
+        return self._current_score
 
     @property
     def current_success_streak(self):
@@ -421,10 +539,7 @@ class Game:
         int
             The current success streak (end of the previous round if round just started)
         """
-        if len(self._rounds) > 0:
-            return self._rounds[-1].final_success_streak
-        else:
-            return self.START_SUCCESS_STREAK
+        return self._current_success_streak
 
     @property
     def longest_success_streak(self):
@@ -435,134 +550,197 @@ class Game:
         int
             The longest success streak at any point during the game
         """
-        return max([rnd.final_success_streak for rnd in self._rounds] +
-                   [rnd.initial_success_streak for rnd in self._rounds])
+        return self._longest_success_streak
+
+    @property
+    def rounds(self):
+        """
+
+        Returns
+        -------
+        list of Round
+            The rounds of the game kept in memory (only the most recent ones if max_kept_rounds was given)
+        """
+        return list(self._rounds)
+
+    @property
+    def current_round(self):
+        """
+
+        Returns
+        -------
+        Round
+            The round being played (the last round played if it is finished and the next one has not been configured
+            by prompt or respond yet, or if the game is over), None if the game has not started
+        """
+        return self._rounds[-1] if self._rounds else None
+
+    @property
+    def next_round_type(self):
+        """
+
+        Returns
+        -------
+        RoundType
+            Type of the round configured after the current one, None if the current round is not finished or the game is
+            over
+        """
+        if self.current_round is None or not self.current_round.is_finished or self.is_over:
+            return None
+        return self._next_round_class().ROUND_TYPE
+
+    @property
+    def is_over(self):
+        """
+
+        Returns
+        -------
+        bool
+            Whether the game is over, i.e. the score reached 0 or below
+        """
+        return bool(self._rounds) and self._rounds[-1].is_finished and self.current_score <= 0
+
+    def _next_round_class(self):
+        last_round = self.current_round
+        if last_round is not None and not isinstance(last_round, BonusRound) \
+                and last_round.final_score > last_round.initial_score \
+                and last_round.final_success_streak >= self.BONUS_ROUND_SUCCESS_STREAK_THRES:
+            return self.BONUS_ROUND
+        if (self.current_round_number + 1) % self.CATEGORY_ROUND_FREQUENCY == 0:  # rounds 5, 10, 15, 20, ...
+            return self.CATEGORY_ROUND
+        return self.REGULAR_ROUND
 
     def _configure_next_round(self, round_class: Type[Round]):
         n_round = self.current_round_number + 1
         score = self.current_score
         success_streak = self.current_success_streak
-        next_round = round_class(n_round, score, success_streak)
+        next_round = round_class(n_round, score, success_streak, question_pool=self._question_pool,
+                                 seen_questions=self._seen_questions)
         self._rounds.append(next_round)
+        if isinstance(next_round, BonusRound):
+            self._n_bonus_rounds += 1
+        else:
+            self._n_rounds += 1
+            self._current_round_number = n_round
+
+    def _record_finished_round(self, finished_round: Round):
+        self._current_score = finished_round.final_score
+        self._current_success_streak = finished_round.final_success_streak
+        self._high_score = max(self._high_score, self._current_score)
+        self._longest_success_streak = max(self._longest_success_streak, self._current_success_streak)
+
+    def _configure_next_round_if_finished(self):
+        # not right after the answer in respond: if the question pool fails to provide the question of the next round,
+        # the game stays in the same state and the next call to prompt or respond tries again
+        if self.current_round.is_finished:
+            self._configure_next_round(self._next_round_class())
+
+    def start(self):
+        """Starts the game: configures its first round"""
+        if self._rounds:
+            raise RuntimeError("The game has already started")
+        self._configure_next_round(self._next_round_class())
+
+    def prompt(self):
+        """Returns what the player has to choose next in the current round
 
-    def _play_next_round(self):
-        next_round = self._rounds[-1]
-        next_round.play()
+        Returns
+        -------
+        Prompt
 
-    def _show_game_over(self):
-        """Prints information about the score whenever the game ends."""
-        print_title("GAME OVER")
-        blank_separator()
-        print("Game summary:")
-        print(f"- High score: {self.high_score}")
-        print(f"- Number of rounds: {self.n_rounds}")
-        print(f"- Longest success streak: {self.longest_success_streak}")
-        blank_separator()
-        cached_dict = read_json_file_to_dict(self.CACHE_FOLDER + 'cache.json')
-        if cached_dict is None:
-            print("***Congratulations: you set a new high score!***")
-            print("***Congratulations: you set a new record for the number of rounds played!***")
-            print("***Congratulations: you set a new record for longest success streak!***")
-        else:
-            if self.high_score > cached_dict['score'] or cached_dict is None:
-                print("***Congratulations: you set a new high score!***")
-            if self.n_rounds > cached_dict['n_rounds'] or cached_dict is None:
-                print("***Congratulations: you set a new record for the number of rounds played!***")
-            if self.longest_success_streak > cached_dict['success_streak'] or cached_dict is None:
-                print("***Congratulations: you set a new record for longest success streak!***")
-        blank_separator()
-        if cached_dict is not None:
-            print("Historical high score summary:")
-            print(f"- High score: {cached_dict['score']}")
-            print(f"- Number of rounds: {cached_dict['n_rounds']}")
-            print(f"- Longest success streak: {cached_dict['success_streak']}")
-        else:
-            print("--No historical high score information--")
-        blank_separator()
+        Raises
+        ------
+        ConnectionError
+            If the question of the next round cannot be fetched (prompt can be called again to retry)
+        """
+        if self.is_over:
+            raise RuntimeError("The game is over")
+        self._configure_next_round_if_finished()
+        return self.current_round.prompt()
 
-    def _show_home_screen(self):
-        # Logo generated via: https://www.fancytextpro.com/BigTextGenerator/
-        message = """
+    def respond(self, key: str):
+        """Takes the player's response to the current prompt. Once a question has been answered, the next round is
+        configured by the next call to prompt or respond (unless the game is over).
 
-                        Welcome to
+        Parameters
+        ----------
+        key: str
+            Key of the option chosen by the player
 
-            ____       ______     _       _      
-           / __ \__  _/_  __/____(_)   __(_)___ _
-          / /_/ / / / // / / ___/ / | / / / __ `/
-         / ____/ /_/ // / / /  / /| |/ / / /_/ / 
-        /_/    \__, //_/ /_/  /_/ |___/_/\__,_/  
-              /____/         
+        Returns
+        -------
+        Feedback
+            The outcome of the answer, or None if the player chose the question of the round (and still has to answer it)
 
-                  Press Enter to continue                                           
-            """
-        _ = input(message)
-        blank_separator()
+        Raises
+        ------
+        ConnectionError
+            If the question of the next round cannot be fetched (respond can be called again to retry)
+        """
+        if self.is_over:
+            raise RuntimeError("The game is over")
+        self._configure_next_round_if_finished()
+        feedback = self.current_round.respond(key)
+        if feedback is not None:
+            self._record_finished_round(self.current_round)
+        return feedback
+
+    def summary(self):
+        """
+
+        Returns
+        -------
+        GameOver
+            Summary of the game
+        """
+        return GameOver(high_score=self.high_score,
+                        n_rounds=self.n_rounds,
+                        longest_success_streak=self.longest_success_streak)
+
+    def _show_game_over(self):
+        """Prints information about the score whenever the game ends."""
+        show_game_over(self.summary(), self._high_score_store.records)
 
     def _save_score(self):
-        cache_dict = read_json_file_to_dict(self.CACHE_FOLDER + 'cache.json')
-        game_score = self.high_score
-        game_n_rounds = self.n_rounds
-        game_success_streak = self.longest_success_streak
-        if not cache_dict:
-            cache_dict = {'score': game_score,
-                          'n_rounds': game_n_rounds,
-                          'success_streak': game_success_streak}
-        else:
-            if game_score > cache_dict['score']:
-                cache_dict['score'] = game_score  # overwrite
-            if game_n_rounds > cache_dict['n_rounds']:
-                cache_dict['n_rounds'] = game_n_rounds
-            if game_success_streak > cache_dict['success_streak']:
-                cache_dict['success_streak'] = game_success_streak
-        write_dict_to_json_file(cache_dict, self.CACHE_FOLDER + 'cache.json')
+        self._high_score_store.record(self.summary())
+        if self._leaderboard is not None:
+            self._leaderboard.record(self.summary(), self._player)
 
     def play(self):
-        """Starts a while loop that launches one round after the other and ends whenever the score reaches 0 or below.
+        """Plays the game in the console: launches one round after the other until the score reaches 0 or below, then
+        saves the score.
 
         Returns
         -------
 
         """
-        # Initialize parameters for the game
-        score = self.START_SCORE
-        round = self.START_ROUND
-        bonus_round = False
+        # start prefetching questions while the home screen is shown
+        self._question_pool.start()
         # home screen
-        self._show_home_screen()
+        show_home_screen()
         # create cache folder if missing
         create_folder_if_missing(self.CACHE_FOLDER)
         # loop during game
-        while score > 0:
-            if bonus_round:
-                self._configure_next_round(BonusRound)
-                self._play_next_round()
-                new_score = self._rounds[-1].final_score
-                bonus_round = False
-                score = new_score
-            elif (round+1) % 5 == 0:  # condition should be entered when round == 4, 9, 14, 19, ...
-                self._configure_next_round(CategoryRound)
-                self._play_next_round()
-                new_score = self._rounds[-1].final_score
-                new_success_streak = self._rounds[-1].final_success_streak
-                bonus_round = True if new_score > score and new_success_streak >= self.BONUS_ROUND_SUCCESS_STREAK_THRES else False
-                score = new_score
-                round += 1
-            else:
-                self._configure_next_round(RegularRound)
-                self._play_next_round()
-                new_score = self._rounds[-1].final_score
-                new_success_streak = self._rounds[-1].final_success_streak
-                bonus_round = True if new_score > score and new_success_streak >= self.BONUS_ROUND_SUCCESS_STREAK_THRES else False
-                score = new_score
-                round += 1
+        self.start()
+        play_game(self)
+        if self._owns_question_pool:
+            self._question_pool.stop()
         # game over
         self._show_game_over()
         # save the score
         self._save_score()
 
 
-def run_game_in_loop():
-    """Function allows to play multiple games in a loop as long as the user does not decide to quit the application"""
+def run_game_in_loop(offline: bool = False, source=None):
+    """Function allows to play multiple games in a loop as long as the user does not decide to quit the application
+
+    Parameters
+    ----------
+    offline: bool
+        If True, the games are played with the questions of the question cache only, without connecting to the API
+    source: QuestionSource
+        If given, the games are played with the questions of this source (see pytrivia.sources) instead of the API
+    """
 
     def _get_user_willingness_to_play():
         inpt = input("Press enter to start another game or enter 'q' to exit the application: ")
@@ -572,10 +750,19 @@ def run_game_in_loop():
             return True
 
     keep_playing = True
+    question_pool = Game.create_question_pool(offline, source)  # shared by all the games, so that its buffers are not refilled for each game
+    high_score_store = HighScoreStore(Game.HIGH_SCORE_FILE)  # shared by all the games, so that it is only read once
+    create_folder_if_missing(Game.CACHE_FOLDER)
+    leaderboard = Leaderboard(Game.LEADERBOARD_FILE)
 
     while keep_playing:
 
-        game = Game()
+        game = Game(question_pool=question_pool, high_score_store=high_score_store, leaderboard=leaderboard)
         game.play()
 
-        keep_playing = _get_user_willingness_to_play()
\ No newline at end of file
+        keep_playing = _get_user_willingness_to_play()
+
+    question_pool.stop()
+    leaderboard.close()
+    if REGISTRY.enabled:
+        write_dict_to_json_file(REGISTRY.snapshot(), Game.METRICS_FILE)
\ No newline at end of file
@@ -0,0 +1,211 @@
+"""Contains the leaderboard, which records every finished game (player, high score, number of rounds, longest success
+streak and time) in an SQLite database and answers top-K, rank and percentile queries
+
+Top-K queries are served by the indexes of the database. Ranks and percentiles are served by an in-memory index of the
+number of games per score, so they take a few microseconds even with millions of recorded games.
+"""
+
+import sqlite3
+import threading
+
+from bisect import bisect_left, bisect_right
+from time import time
+from typing import NamedTuple
+
+from pytrivia.events import GameOver
+
+
+class LeaderboardEntry(NamedTuple):
+    """A game recorded in the leaderboard"""
+
+    player: str
+    high_score: int
+    n_rounds: int
+    longest_success_streak: int
+    played_at: float  # timestamp of the end of the game
+
+
+class ScoreIndex:
+    """Counts the games per score in a Fenwick tree over the distinct scores, so that the number of games below a
+    score is found in O(log d) time (d being the number of distinct scores, which stays small even for millions of
+    games)."""
+
+    def __init__(self):
+        self._scores = []  # distinct scores, sorted
+        self._counts = []  # number of games per distinct score
+        self._tree = [0]  # Fenwick tree of the counts (1-based)
+        self._n = 0
+
+    def __len__(self):
+        return self._n
+
+    def _rebuild(self):
+        self._tree = [0] + list(self._counts)
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def add(self, score: int, count: int = 1):
+        i = bisect_left(self._scores, score)
+        if i < len(self._scores) and self._scores[i] == score:
+            self._counts[i] += count
+            i += 1
+            while i < len(self._tree):
+                self._tree[i] += count
+                i += i & -i
+        else:  # new distinct score, which is rare
+            self._scores.insert(i, score)
+            self._counts.insert(i, count)
+            self._rebuild()
+        self._n += count
+
+    def _n_first(self, i: int):
+        """Number of games with one of the first i distinct scores"""
+        n = 0
+        while i > 0:
+            n += self._tree[i]
+            i -= i & -i
+        return n
+
+    def n_below(self, score: int):
+        return self._n_first(bisect_left(self._scores, score))
+
+    def n_above(self, score: int):
+        return self._n - self._n_first(bisect_right(self._scores, score))
+
+
+class Leaderboard:
+    """Records the finished games in an SQLite database and ranks them by high score. In batch mode (e.g. for the game
+    server), the games are only written by flush, but they are taken into account by the queries as soon as they are
+    recorded."""
+
+    TOP_K = 10  # number of entries returned by default by top-K queries
+
+    def __init__(self, path: str, autoflush: bool = True):
+        """Initializes a Leaderboard object
+
+        Parameters
+        ----------
+        path: str
+            SQLite database the games are recorded in (':memory:' for a leaderboard that is not persisted)
+        autoflush: bool
+            If True, every game is written as soon as it is recorded. Otherwise they are only written by flush
+        """
+        self._autoflush = autoflush
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = []  # LeaderboardEntry recorded but not written yet
+        self._score_index = ScoreIndex()
+        with self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("""CREATE TABLE IF NOT EXISTS games (
+                                            id INTEGER PRIMARY KEY,
+                                            player TEXT,
+                                            high_score INTEGER NOT NULL,
+                                            n_rounds INTEGER NOT NULL,
+                                            longest_success_streak INTEGER NOT NULL,
+                                            played_at REAL NOT NULL)""")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS games_by_high_score "
+                                     "ON games (high_score DESC, played_at)")
+            self._connection.execute("CREATE INDEX IF NOT EXISTS games_by_player "
+                                     "ON games (player, high_score DESC, played_at)")
+        for score, count in self._connection.execute("SELECT high_score, COUNT(*) FROM games GROUP BY high_score"):
+            self._score_index.add(score, count)
+
+    def __len__(self):
+        return len(self._score_index)
+
+    def close(self):
+        self.flush()
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, summary: GameOver, player: str = None):
+        """Records a finished game
+
+        Parameters
+        ----------
+        summary: GameOver
+            Summary of the game
+        player: str
+            Name of the player (None if anonymous)
+
+        Returns
+        -------
+        LeaderboardEntry
+        """
+        entry = LeaderboardEntry(player=player,
+                                 high_score=summary.high_score,
+                                 n_rounds=summary.n_rounds,
+                                 longest_success_streak=summary.longest_success_streak,
+                                 played_at=time())
+        with self._lock:
+            self._pending.append(entry)
+            self._score_index.add(entry.high_score)
+        if self._autoflush:
+            self.flush()
+        return entry
+
+    def flush(self):
+        """Writes the games recorded since the last flush in one transaction"""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._connection:
+                self._connection.executemany("INSERT INTO games (player, high_score, n_rounds, longest_success_streak, "
+                                             "played_at) VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def top(self, k: int = TOP_K, player: str = None):
+        """Returns the best games (highest scores first, then earliest)
+
+        Parameters
+        ----------
+        k: int
+            Number of games returned
+        player: str
+            If given, only the games of this player are returned
+
+        Returns
+        -------
+        list of LeaderboardEntry
+        """
+        query = "SELECT player, high_score, n_rounds, longest_success_streak, played_at FROM games"
+        if player is not None:
+            query += " WHERE player = ?"
+        query += " ORDER BY high_score DESC, played_at LIMIT ?"
+        with self._lock:
+            rows = self._connection.execute(query, (player, k) if player is not None else (k,)).fetchall()
+            pending = [entry for entry in self._pending if player is None or entry.player == player]
+        entries = [LeaderboardEntry(*row) for row in rows] + pending
+        entries.sort(key=lambda entry: (-entry.high_score, entry.played_at))
+        return entries[:k]
+
+    def rank(self, score: int):
+        """Returns the rank a game with a certain high score has (1 for the best games, equal scores share a rank)"""
+        with self._lock:
+            return self._score_index.n_above(score) + 1
+
+    def percentile(self, score: int):
+        """Returns the percentage of the recorded games that a game with a certain high score did better than (games
+        with an equal score count for half)
+
+        Returns
+        -------
+        float
+            Percentile rank between 0 and 100 (None if no game has been recorded)
+        """
+        with self._lock:
+            n = len(self._score_index)
+            if n == 0:
+                return None
+            n_below = self._score_index.n_below(score)
+            n_equal = n - n_below - self._score_index.n_above(score)
+        return 100 * (n_below + n_equal / 2) / n
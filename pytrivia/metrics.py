@@ -0,0 +1,281 @@
+"""Contains the instrumentation of the hot paths: counters and latency histograms of the requests to the Trivia API,
+the question cache, the questions fetched and the rounds played
+
+The metrics are disabled by default, in which case the instrumented code only checks REGISTRY.enabled (no clock is read
+and nothing is recorded). They are enabled by REGISTRY.enable() or by setting the PYTRIVIA_METRICS environment
+variable to 1, and exported in the Prometheus text format (to_prometheus) or as a JSON snapshot (snapshot).
+"""
+
+import math
+import os
+import threading
+
+from bisect import bisect_left
+
+
+class Counter:
+    """Monotonically increasing count, per combination of label values"""
+
+    TYPE = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        """Initializes a Counter object
+
+        Parameters
+        ----------
+        name: str
+            Name of the metric in the Prometheus format
+        documentation: str
+            Help text of the metric
+        label_names: tuple of str
+            Names of the labels the metric is broken down by
+        """
+        self._name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def documentation(self):
+        return self._documentation
+
+    def _label_values(self, labels: dict):
+        try:
+            if len(labels) == len(self._label_names):
+                return tuple([str(labels[name]) for name in self._label_names])
+        except KeyError:
+            pass
+        raise ValueError(f"{self._name} takes the labels {self._label_names}, not {tuple(labels)}")
+
+    def inc(self, amount: float = 1, **labels):
+        label_values = self._label_values(labels)
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, **labels):
+        """Returns the count for some label values (0 if nothing was counted for them)"""
+        label_values = self._label_values(labels)
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """Returns the labels and count of each combination of label values counted so far
+
+        Returns
+        -------
+        list of (dict, float)
+        """
+        with self._lock:
+            return [(dict(zip(self._label_names, label_values)), value)
+                    for label_values, value in sorted(self._values.items())]
+
+
+class Histogram(Counter):
+    """Distribution of observed values (typically durations in seconds) in cumulative buckets, per combination of label
+    values"""
+
+    TYPE = 'histogram'
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # upper bounds
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = BUCKETS):
+        """Initializes a Histogram object
+
+        Parameters
+        ----------
+        name: str
+            Name of the metric in the Prometheus format
+        documentation: str
+            Help text of the metric
+        label_names: tuple of str
+            Names of the labels the metric is broken down by
+        buckets: tuple of float
+            Increasing upper bounds of the buckets (a last bucket without upper bound is added)
+        """
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        label_values = self._label_values(labels)
+        i = bisect_left(self._buckets, value)  # first bucket whose upper bound is >= value
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * len(self._buckets), 0, 0.0]  # bucket counts, count, sum
+            state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    def inc(self, amount: float = 1, **labels):
+        raise TypeError("Histograms are updated with observe")
+
+    def value(self, **labels):
+        """Returns the number and sum of the observations for some label values
+
+        Returns
+        -------
+        (int, float)
+        """
+        label_values = self._label_values(labels)
+        with self._lock:
+            _, count, total = self._values.get(label_values, (None, 0, 0.0))
+            return count, total
+
+    def samples(self):
+        """Returns the labels and distribution of each combination of label values observed so far
+
+        Returns
+        -------
+        list of (dict, dict)
+            The distributions hold the cumulative counts per bucket upper bound ('buckets'), the number ('count') and
+            the sum ('sum') of the observations
+        """
+        with self._lock:
+            samples = []
+            for label_values, (bucket_counts, count, total) in sorted(self._values.items()):
+                cumulative_counts, cumulative_count = [], 0
+                for bucket_count in bucket_counts:
+                    cumulative_count += bucket_count
+                    cumulative_counts.append(cumulative_count)
+                samples.append((dict(zip(self._label_names, label_values)),
+                                {'buckets': dict(zip(self._buckets, cumulative_counts)), 'count': count,
+                                 'sum': total}))
+            return samples
+
+
+def _format_labels(labels: dict):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _format_bound(bound: float):
+    return '+Inf' if bound == math.inf else repr(float(bound))
+
+
+class MetricsRegistry:
+    """Holds the metrics of the process and exports them"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled  # read by the instrumented code before it reads the clock or records anything
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _register(self, metric: Counter):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"A metric is already registered as {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: tuple = ()):
+        """Creates and registers a Counter"""
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = Histogram.BUCKETS):
+        """Creates and registers a Histogram"""
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def reset(self):
+        """Forgets everything recorded so far"""
+        for metric in self.metrics():
+            metric.reset()
+
+    def to_prometheus(self):
+        """Returns the metrics in the Prometheus text exposition format
+
+        Returns
+        -------
+        str
+        """
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.TYPE}")
+            for labels, value in metric.samples():
+                if metric.TYPE == Histogram.TYPE:
+                    for bound, count in value['buckets'].items():
+                        bucket_labels = dict(labels, le=_format_bound(bound))
+                        lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {count}")
+                    lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+                    lines.append(f"{metric.name}_sum{_format_labels(labels)} {value['sum']!r}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(labels)} {value!r}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Returns the metrics as a dictionary that can be serialized to JSON
+
+        Returns
+        -------
+        dict
+            Name of each metric -> type, documentation and samples (labels and value). The buckets of the histograms
+            are keyed by their upper bound formatted as in the Prometheus format
+        """
+        snapshot = {}
+        for metric in self.metrics():
+            samples = []
+            for labels, value in metric.samples():
+                if metric.TYPE == Histogram.TYPE:
+                    value = dict(value, buckets={_format_bound(bound): count
+                                                 for bound, count in value['buckets'].items()})
+                samples.append({'labels': labels, 'value': value})
+            snapshot[metric.name] = {'type': metric.TYPE, 'documentation': metric.documentation, 'samples': samples}
+        return snapshot
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get('PYTRIVIA_METRICS') == '1')
+
+API_REQUEST_DURATION = REGISTRY.histogram(
+    'pytrivia_api_request_duration_seconds', "Duration of the attempts to request questions from the Trivia API",
+    ('outcome',))  # outcome: success or failure
+API_RETRIES = REGISTRY.counter(
+    'pytrivia_api_retries_total', "Attempts to request questions from the Trivia API that were retries")
+API_FAILURES = REGISTRY.counter(
+    'pytrivia_api_failures_total', "Requests to the Trivia API given up on (after their retries)",
+    ('reason',))  # reason: attempts (all of them failed), deadline or circuit_open
+CACHE_REQUESTS = REGISTRY.counter(
+    'pytrivia_cache_requests_total', "Requests for questions of a RequestBuilder using the question cache",
+    ('result',))  # result: hit (served from the cache), miss (sent to the API) or stale (API down, served from the cache)
+QUESTIONS_FETCHED = REGISTRY.counter(
+    'pytrivia_questions_fetched_total', "Valid questions received from the Trivia API (or a question source)",
+    ('category',))
+ROUND_DURATION = REGISTRY.histogram(
+    'pytrivia_round_duration_seconds', "Duration of the rounds, from their start to the answer", ('round_type',))
+QUESTION_WAIT = REGISTRY.histogram(
+    'pytrivia_question_wait_seconds', "Time rounds waited for their questions (from the pool or the Trivia API)",
+    ('round_type',))
+INPUT_WAIT = REGISTRY.histogram(
+    'pytrivia_input_wait_seconds', "Time the console waited for the player's input")
+
+
+def cache_hit_ratio():
+    """Returns the share of the requests for questions that were served from the fresh questions of the cache
+
+    Returns
+    -------
+    float
+        None if no request used the cache
+    """
+    n_hits = CACHE_REQUESTS.value(result='hit')
+    n_requests = n_hits + CACHE_REQUESTS.value(result='miss') + CACHE_REQUESTS.value(result='stale')
+    return n_hits / n_requests if n_requests else None
@@ -0,0 +1,211 @@
+"""Contains the vectorized Monte Carlo estimator of game outcomes, which steps millions of games forward together as
+NumPy arrays instead of playing them one by one with Game objects (see pytrivia.simulation)
+
+The state of each game is reduced to what the rules depend on: score, success streak, round number and whether the
+next round is a bonus round. A round is answered correctly with a probability that only depends on its type, given the
+per-category probabilities of the player and the share of each category in the corpus:
+- regular rounds: the category of the question is drawn at random from the corpus
+- category rounds: the player chooses the category they know best
+- bonus rounds: the player chooses, amongst questions drawn at random, the one of the category they know best
+
+NumPy is an optional dependency, only needed by this module.
+
+Run from the root of the repository:
+
+    python -m pytrivia.montecarlo [--n-games 1000000] [--p-correct 0.5] [--corpus questions.json] [--validate 20000]
+"""
+
+import argparse
+import json
+
+from collections import Counter
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from pytrivia.base import Category
+from pytrivia.game import Game, BonusRound
+from pytrivia.simulation import GameRules, ProbabilisticPlayer, SimulationResult, load_raw_questions, simulate
+
+
+def category_weights(raw_questions: list):
+    """Returns the share of each category in a corpus of questions
+
+    Parameters
+    ----------
+    raw_questions: list of dict
+        Corpus of questions, in the format returned by the API
+
+    Returns
+    -------
+    dict
+        Category -> share of the questions of the corpus in this category
+    """
+    counts = Counter(Category.map_from_formatted_str(raw_question['category']) for raw_question in raw_questions)
+    return {category: count / len(raw_questions) for category, count in counts.items()}
+
+
+def round_probabilities(player: ProbabilisticPlayer, weights: dict = None, n_bonus_questions: int = BonusRound.N_QUESTIONS):
+    """Returns the probability of answering correctly in each type of round
+
+    Parameters
+    ----------
+    player: ProbabilisticPlayer
+        The bot playing the games
+    weights: dict
+        Category -> share of the questions in this category. Defaults to all the categories (but Unknown) equally
+    n_bonus_questions: int
+        Number of questions the player chooses from in bonus rounds
+
+    Returns
+    -------
+    tuple of float
+        Probabilities of answering correctly in regular, category and bonus rounds
+    """
+    if weights is None:
+        weights = {Category.map_from_formatted_str(cat): 1 for cat in Category.list_formatted_str()}
+    total = sum(weights.values())
+    weights = {category: weight / total for category, weight in weights.items() if weight > 0}
+    p_regular = sum(weight * player.p_correct(category) for category, weight in weights.items())
+
+    # the category chosen by the player is only asked if the corpus has questions in it (otherwise any is)
+    choices = [Category.map_from_formatted_str(cat) for cat in Category.list_formatted_str()]
+    best_category = max(choices, key=player.p_correct)
+    p_category = player.p_correct(best_category) if best_category in weights else p_regular
+
+    # expected best probability amongst n draws: P(max <= p) is the n-th power of P(draw <= p)
+    p_bonus, cumulated_weight, previous_cdf = 0, 0, 0
+    for p in sorted(set(player.p_correct(category) for category in weights)):
+        cumulated_weight += sum(weight for category, weight in weights.items() if player.p_correct(category) == p)
+        cdf = min(cumulated_weight, 1) ** n_bonus_questions
+        p_bonus += p * (cdf - previous_cdf)
+        previous_cdf = cdf
+    return p_regular, p_category, p_bonus
+
+
+def _counter(values):
+    unique_values, counts = np.unique(values, return_counts=True)
+    return Counter(dict(zip(unique_values.tolist(), counts.tolist())))
+
+
+def simulate_vectorized(n_games: int, player: ProbabilisticPlayer, rules: GameRules = GameRules(),
+                        weights: dict = None, max_rounds: int = 1000, seed: int = None):
+    """Estimates the distributions of the outcomes of many games played by a bot, all stepped forward together
+
+    Parameters
+    ----------
+    n_games: int
+        Number of games
+    player: ProbabilisticPlayer
+        The bot playing the games
+    rules: GameRules
+        The rules of the game
+    weights: dict
+        Category -> share of the questions in this category (see category_weights)
+    max_rounds: int
+        Games are stopped after this number of rounds (otherwise a very good bot might never lose)
+    seed: int
+        Seed of the random generator (for reproducible simulations)
+
+    Returns
+    -------
+    SimulationResult
+    """
+    if np is None:
+        raise ImportError("The vectorized simulation requires NumPy (pip install numpy)")
+    rng = np.random.default_rng(seed)
+    p_regular, p_category, p_bonus = round_probabilities(player, weights)
+    regular_points, category_points, bonus_points = \
+        rules.regular_round_points, rules.category_round_points, rules.bonus_round_points
+
+    # state of the games still being played
+    score = np.full(n_games, rules.start_score, dtype=np.int64)
+    streak = np.zeros(n_games, dtype=np.int64)
+    round_number = np.zeros(n_games, dtype=np.int64)  # number of non-bonus rounds played
+    is_bonus_next = np.zeros(n_games, dtype=bool)
+    high_score = score.copy()
+    longest_streak = streak.copy()
+    n_bonus_rounds = np.zeros(n_games, dtype=np.int64)
+    ids = np.arange(n_games)  # index of each game still being played in the final arrays
+
+    final_round_number = np.empty(n_games, dtype=np.int64)
+    final_high_score = np.empty(n_games, dtype=np.int64)
+    final_longest_streak = np.empty(n_games, dtype=np.int64)
+    final_n_bonus_rounds = np.empty(n_games, dtype=np.int64)
+    is_truncated = np.zeros(n_games, dtype=bool)
+
+    while ids.size:
+        is_bonus = is_bonus_next
+        is_category = ~is_bonus & ((round_number + 1) % rules.category_round_frequency == 0)
+        p = np.where(is_bonus, p_bonus, np.where(is_category, p_category, p_regular))
+        is_correct = rng.random(ids.size) < p
+
+        pos_points = np.where(is_bonus, bonus_points[0], np.where(is_category, category_points[0], regular_points[0]))
+        neg_points = np.where(is_bonus, bonus_points[1], np.where(is_category, category_points[1], regular_points[1]))
+        points = np.where(is_correct, pos_points, -neg_points)
+        score += points
+        streak = np.where(is_bonus, streak, np.where(is_correct, streak + 1, 0))  # bonus rounds keep the streak
+        round_number += ~is_bonus
+        n_bonus_rounds += is_bonus
+        np.maximum(high_score, score, out=high_score)
+        np.maximum(longest_streak, streak, out=longest_streak)
+        is_bonus_next = ~is_bonus & (points > 0) & (streak >= rules.bonus_round_success_streak_thres)
+
+        # a game stops when the score reaches 0 (or after max_rounds rounds, at the end of a non-bonus round)
+        is_stopped = (score <= 0) | ((round_number >= max_rounds) & ~is_bonus_next)
+        if is_stopped.any():
+            stopped_ids = ids[is_stopped]
+            final_round_number[stopped_ids] = round_number[is_stopped]
+            final_high_score[stopped_ids] = high_score[is_stopped]
+            final_longest_streak[stopped_ids] = longest_streak[is_stopped]
+            final_n_bonus_rounds[stopped_ids] = n_bonus_rounds[is_stopped]
+            is_truncated[stopped_ids] = score[is_stopped] > 0
+            is_running = ~is_stopped
+            ids, score, streak, round_number, is_bonus_next, high_score, longest_streak, n_bonus_rounds = \
+                (array[is_running] for array in (ids, score, streak, round_number, is_bonus_next, high_score,
+                                                 longest_streak, n_bonus_rounds))
+
+    result = SimulationResult()
+    result.n_games = n_games
+    result.n_truncated = int(np.count_nonzero(is_truncated))
+    result.game_lengths = _counter(final_round_number)
+    result.high_scores = _counter(final_high_score)
+    result.longest_success_streaks = _counter(final_longest_streak)
+    result.n_bonus_rounds = _counter(final_n_bonus_rounds)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimates the distributions of game outcomes with NumPy")
+    parser.add_argument('--n-games', type=int, default=1000000)
+    parser.add_argument('--p-correct', type=float, default=0.5, help="probability of answering correctly")
+    parser.add_argument('--corpus', help="corpus file, or JSON (Lines) file of raw questions (defaults to the question cache)")
+    parser.add_argument('--bonus-thres', type=int, default=Game.BONUS_ROUND_SUCCESS_STREAK_THRES)
+    parser.add_argument('--category-frequency', type=int, default=Game.CATEGORY_ROUND_FREQUENCY)
+    parser.add_argument('--max-rounds', type=int, default=1000)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--validate', type=int, default=0, metavar='N',
+                        help="also play N games with the object-based engine and compare the summaries")
+    args = parser.parse_args()
+
+    raw_questions = load_raw_questions(args.corpus)
+    rules = GameRules(bonus_round_success_streak_thres=args.bonus_thres,
+                      category_round_frequency=args.category_frequency)
+    player = ProbabilisticPlayer(args.p_correct)
+
+    start = perf_counter()
+    result = simulate_vectorized(args.n_games, player, rules, category_weights(raw_questions),
+                                 max_rounds=args.max_rounds, seed=args.seed)
+    output = dict(result.to_dict(), elapsed=perf_counter() - start)
+    if args.validate:
+        start = perf_counter()
+        reference = simulate(raw_questions, args.validate, player, rules, max_rounds=args.max_rounds, seed=args.seed)
+        output['validation'] = dict(reference.summary(), elapsed=perf_counter() - start)
+    print(json.dumps(output, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,423 @@
+"""Contains the question pool used to prefetch questions from the Trivia API in the background"""
+
+import random
+import threading
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic
+from typing import Callable
+
+from pytrivia.base import Category, RequestBuilder, request_from_trivia_api
+from pytrivia.dedup import CorpusIndex
+
+
+def _completed_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class QuestionPool:
+    """Keeps a buffer of questions per Category that is topped up in the background with large batches, so that
+    rounds can take their questions from memory instead of waiting for a request to the Trivia API. The questions
+    fetched again are dropped before they reach the buffers, and the questions a game has already seen can be skipped
+    when taking questions from the pool."""
+
+    LOW_WATERMARK = 3  # buffers with fewer questions than this are topped up
+    HIGH_WATERMARK = 10  # buffers are topped up to this number of questions
+    BATCH_SIZE = RequestBuilder.MAX_LIMIT  # maximum number of questions requested at once
+    REFILL_RETRY_DELAY = 5  # seconds to wait before refilling again after a failed request
+    EMPTY_CATEGORY_RETRY_DELAY = 60  # seconds during which a category for which no question was returned is skipped
+
+    def __init__(self, low_watermark: int = LOW_WATERMARK, high_watermark: int = HIGH_WATERMARK,
+                 batch_size: int = BATCH_SIZE, request_builder_factory: Callable[[], RequestBuilder] = None,
+                 corpus_index: CorpusIndex = None):
+        """Initializes a QuestionPool object
+
+        Parameters
+        ----------
+        low_watermark: int
+            A category buffer is topped up as soon as it holds fewer questions than this
+        high_watermark: int
+            Number of questions a category buffer is topped up to
+        batch_size: int
+            Maximum number of questions requested from the API at once
+        request_builder_factory: callable
+            Returns a new RequestBuilder for each request. Defaults to request_from_trivia_api
+        corpus_index: CorpusIndex
+            Index used to drop the questions fetched again. If None, the pool creates its own
+        """
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("The low watermark must be between 0 and the high watermark")
+        self._low_watermark = low_watermark
+        self._high_watermark = high_watermark
+        self._batch_size = batch_size
+        self._request_builder_factory = request_builder_factory or request_from_trivia_api
+        self._corpus_index = CorpusIndex() if corpus_index is None else corpus_index
+        self._categories = [c for c in Category if c != Category.Unknown]
+        self._buffers = {cat: deque() for cat in self._categories}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._executor = None  # fetches the questions of empty buffers in parallel (see prefetch_questions_in_categories)
+        self._skipped_until = {}  # Category -> time until which it is skipped, e.g. a local source has no question in it
+
+    @property
+    def low_watermark(self):
+        """
+
+        Returns
+        -------
+        int
+            A category buffer is topped up as soon as it holds fewer questions than this
+        """
+        return self._low_watermark
+
+    @property
+    def high_watermark(self):
+        """
+
+        Returns
+        -------
+        int
+            Number of questions a category buffer is topped up to
+        """
+        return self._high_watermark
+
+    @property
+    def is_running(self):
+        """
+
+        Returns
+        -------
+        bool
+            Whether the background refill thread is running
+        """
+        return self._running
+
+    @property
+    def corpus_index(self):
+        """
+
+        Returns
+        -------
+        CorpusIndex
+            Index of the questions fetched by the pool
+        """
+        return self._corpus_index
+
+    def n_buffered(self, category: Category = None):
+        """Returns the number of questions currently held in memory
+
+        Parameters
+        ----------
+        category: Category
+            If given, only the questions of this category are counted
+
+        Returns
+        -------
+        int
+        """
+        with self._condition:
+            if category is not None:
+                return len(self._buffers[category])
+            return sum(len(buffer) for buffer in self._buffers.values())
+
+    def start(self):
+        """Starts the background thread that keeps the category buffers topped up. Does nothing if it is already
+        running."""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._refill_loop, name='QuestionPool', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background thread and the executor of prefetch_questions_in_categories (even if the thread was not
+        started). Questions already in the buffers are kept."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+            thread = self._thread
+            self._thread = None
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False)  # the pending fetches still complete
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @staticmethod
+    def _pop_unseen(buffer: deque, exclude):
+        """Takes the first question of a buffer whose key is not in exclude (None if there is none)"""
+        if exclude is None:
+            return buffer.popleft() if buffer else None
+        for i, question in enumerate(buffer):
+            if question.key not in exclude:
+                del buffer[i]
+                return question
+        return None
+
+    def get_question_in_category(self, category: Category, exclude=None):
+        """Takes a question of a certain category from the pool. If the category buffer is empty, the question is
+        requested synchronously (and the rest of the batch is kept in the buffer). If no question of the category can
+        be found (e.g. a local source has none), a question of a random category is returned instead.
+
+        Parameters
+        ----------
+        category: Category
+            The category of the question
+        exclude: set or BloomFilter
+            Keys of the questions to skip, e.g. the ones already seen in a game (they are only returned if the buffer
+            holds no other question: the refill thread fetches new ones once they have been taken)
+
+        Returns
+        -------
+        Question
+        """
+        with self._condition:
+            buffer = self._buffers[category]
+            question = self._pop_unseen(buffer, exclude)
+            if question is None and buffer:
+                question = buffer.popleft()  # only seen questions are buffered
+            self._condition.notify_all()  # wake up the refill thread
+        if question is None:
+            question = self._fetch_question_in_category(category, exclude)
+        return question
+
+    def prefetch_questions_in_categories(self, categories: list, exclude=None):
+        """Takes a question of each category from the pool without waiting: the questions of the categories whose buffer
+        is empty are requested in parallel, in the background.
+
+        Parameters
+        ----------
+        categories: list of Category
+            The categories of the questions
+        exclude: set or BloomFilter
+            Keys of the questions to skip (see get_question_in_category)
+
+        Returns
+        -------
+        dict
+            Category -> Future of its Question (the categories missing from it have to be taken with
+            get_question_in_category). The questions that are not used should be returned with put_back
+        """
+        futures = {}
+        missing = []
+        with self._condition:
+            for category in categories:
+                buffer = self._buffers[category]
+                question = self._pop_unseen(buffer, exclude)
+                if question is None and buffer:
+                    question = buffer.popleft()  # only seen questions are buffered (see get_question_in_category)
+                if question is None:
+                    missing.append(category)
+                else:
+                    futures[category] = _completed_future(question)
+            self._condition.notify_all()
+            if missing and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=len(self._categories),
+                                                    thread_name_prefix='QuestionPool')
+            executor = self._executor
+        for category in missing:
+            futures[category] = executor.submit(self._fetch_question_in_category, category, exclude)
+        return futures
+
+    def put_back(self, questions: list):
+        """Returns questions taken from the pool that were not asked (e.g. the questions of the categories a player did
+        not choose): they are the next ones taken from their category buffers. The questions of the buffers that have
+        been topped up to the high watermark in the meantime are dropped.
+
+        Parameters
+        ----------
+        questions: list of Question
+        """
+        with self._condition:
+            for question in questions:
+                buffer = self._buffers.get(question.category)
+                if buffer is not None and len(buffer) < self._high_watermark:
+                    buffer.appendleft(question)
+
+    def get_random_question(self, exclude=None):
+        """Takes a question of a random category from the pool. If all the buffers are empty, the question is
+        requested synchronously.
+
+        Parameters
+        ----------
+        exclude: set or BloomFilter
+            Keys of the questions to skip (see get_question_in_category)
+
+        Returns
+        -------
+        Question
+        """
+        with self._condition:
+            # weighting by the buffer sizes is equivalent to picking uniformly amongst all the buffered questions
+            categories = list(self._categories)
+            sizes = [len(self._buffers[cat]) for cat in categories]
+            weights = list(sizes)
+            while sum(weights) > 0:
+                i = random.choices(range(len(categories)), weights=weights)[0]
+                question = self._pop_unseen(self._buffers[categories[i]], exclude)
+                if question is not None:
+                    self._condition.notify_all()
+                    return question
+                weights[i] = 0  # only seen questions in this category
+            if sum(sizes) > 0:  # only seen questions are buffered: one of them is taken rather than fetching more
+                i = random.choices(range(len(categories)), weights=sizes)[0]
+                self._condition.notify_all()
+                return self._buffers[categories[i]].popleft()
+        question = self._fetch_synchronously(None, exclude)  # questions of any category
+        if question is None:
+            raise ConnectionError("Haven't been able to get a question from the API")
+        return question
+
+    def get_random_questions(self, n: int, exclude=None):
+        """Takes n questions of random categories from the pool
+
+        Parameters
+        ----------
+        n: int
+            Number of questions
+        exclude: set or BloomFilter
+            Keys of the questions to skip (see get_question_in_category)
+
+        Returns
+        -------
+        list of Question
+        """
+        return [self.get_random_question(exclude) for _ in range(n)]
+
+    def _fetch(self, category: Category, n: int):
+        builder = self._request_builder_factory()
+        return builder.categories([] if category is None else [category]).limit(min(n, self._batch_size)) \
+            .deduplicate(self._corpus_index).get_questions()
+
+    def _skip(self, category: Category):
+        """Skips a category for which no question was returned for a while (called with the lock held)"""
+        self._skipped_until[category] = monotonic() + self.EMPTY_CATEGORY_RETRY_DELAY
+
+    def _is_skipped(self, category: Category):
+        return monotonic() < self._skipped_until.get(category, 0)
+
+    def _fetch_synchronously(self, category: Category, exclude=None):
+        """Requests a question of a category (of any category if None) and keeps the rest of the batch in the buffers.
+        Returns None if no question was returned"""
+        questions = self._fetch(category, self._high_watermark + 1)
+        if not questions:
+            if category is not None:
+                with self._condition:
+                    self._skip(category)
+            return None
+        unseen = [i for i, question in enumerate(questions) if exclude is None or question.key not in exclude]
+        question = questions.pop(unseen[0] if unseen else 0)
+        with self._condition:
+            self._top_up(questions)
+        return question
+
+    def _fetch_question_in_category(self, category: Category, exclude=None):
+        with self._condition:
+            is_skipped = self._is_skipped(category)
+        question = None if is_skipped else self._fetch_synchronously(category, exclude)
+        if question is None:  # no question in this category: like StaticQuestionPool, any category will do
+            question = self.get_random_question(exclude)
+        return question
+
+    def _top_up(self, questions: list):
+        """Adds questions to their category buffers, up to the high watermark (the surplus is dropped)"""
+        for question in questions:
+            buffer = self._buffers.get(question.category)
+            if buffer is not None and len(buffer) < self._high_watermark:
+                buffer.append(question)
+
+    def _categories_to_refill(self):
+        return [cat for cat in self._categories
+                if len(self._buffers[cat]) < self._low_watermark and not self._is_skipped(cat)]
+
+    def _refill_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: not self._running or self._categories_to_refill())
+                if not self._running:
+                    return
+                missing = {cat: self._high_watermark - len(self._buffers[cat]) for cat in self._categories_to_refill()}
+            for category, n in missing.items():
+                try:
+                    questions = self._fetch(category, n)
+                except Exception:  # the API is unreachable: keep the buffers as they are and try again later
+                    with self._condition:
+                        self._condition.wait_for(lambda: not self._running, timeout=self.REFILL_RETRY_DELAY)
+                    break
+                with self._condition:
+                    if questions:
+                        self._top_up(questions)
+                    else:  # e.g. a local source has no question in this category: refill the other ones
+                        self._skip(category)
+
+
+class StaticQuestionPool:
+    """Serves questions drawn at random (with replacement) from a fixed local corpus, without any request to the
+    Trivia API. It has the same interface as QuestionPool, so that games can be played on the corpus only."""
+
+    MAX_DRAWS = 10  # number of draws after which a question that should be excluded is returned anyway
+
+    def __init__(self, questions: list):
+        """Initializes a StaticQuestionPool object
+
+        Parameters
+        ----------
+        questions: list of Question
+            The corpus the questions are drawn from
+        """
+        if not questions:
+            raise ValueError("The corpus of a static question pool cannot be empty")
+        self._questions = list(questions)
+        self._questions_by_category = {}
+        for question in self._questions:
+            self._questions_by_category.setdefault(question.category, []).append(question)
+
+    @property
+    def is_running(self):
+        return False
+
+    def n_buffered(self, category: Category = None):
+        """Returns the number of questions of the corpus (of a certain category if given)"""
+        if category is not None:
+            return len(self._questions_by_category.get(category, []))
+        return len(self._questions)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def _draw(self, questions: list, exclude):
+        question = random.choice(questions)
+        if exclude is not None:
+            for _ in range(self.MAX_DRAWS - 1):
+                if question.key not in exclude:
+                    break
+                question = random.choice(questions)
+        return question
+
+    def get_question_in_category(self, category: Category, exclude=None):
+        """Draws a question of a certain category (of any category if the corpus has none in this one), trying to avoid
+        the ones whose key is in exclude"""
+        return self._draw(self._questions_by_category.get(category) or self._questions, exclude)
+
+    def prefetch_questions_in_categories(self, categories: list, exclude=None):
+        """Prefetches nothing (see QuestionPool.prefetch_questions_in_categories): the questions are drawn when they are
+        needed, which does not take any time"""
+        return {}
+
+    def put_back(self, questions: list):
+        pass  # the questions are drawn with replacement
+
+    def get_random_question(self, exclude=None):
+        return self._draw(self._questions, exclude)
+
+    def get_random_questions(self, n: int, exclude=None):
+        return [self._draw(self._questions, exclude) for _ in range(n)]
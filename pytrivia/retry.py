@@ -0,0 +1,184 @@
+"""Contains the retry policies and the circuit breaker used when the Trivia API is unresponsive"""
+
+import random
+import threading
+
+from time import monotonic
+from urllib.parse import urlsplit
+
+
+class RetryPolicy:
+    """Retries failed requests with an exponential backoff (with full jitter), within a deadline per request.
+    Subclasses can override backoff to implement other strategies."""
+
+    MAX_ATTEMPTS = 5  # attempts per request, including the first one
+    BASE_DELAY = 0.25  # seconds of backoff before the first retry (before jitter)
+    MAX_DELAY = 4  # maximum seconds of backoff between two attempts
+    MULTIPLIER = 2  # growth factor of the backoff after each attempt
+    DEADLINE = 10  # seconds a request may take, including all its retries
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY,
+                 multiplier: float = MULTIPLIER, jitter: bool = True, deadline: float = DEADLINE):
+        """Initializes a RetryPolicy object
+
+        Parameters
+        ----------
+        max_attempts: int
+            Number of attempts per request, including the first one
+        base_delay: float
+            Seconds of backoff before the first retry
+        max_delay: float
+            Maximum seconds of backoff between two attempts
+        multiplier: float
+            Growth factor of the backoff after each attempt
+        jitter: bool
+            Whether to wait a random time between 0 and the backoff (avoids synchronized retries from many clients)
+        deadline: float
+            Seconds a request may take, including all its retries
+        """
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._multiplier = multiplier
+        self._jitter = jitter
+        self._deadline = deadline
+
+    @property
+    def max_attempts(self):
+        """
+
+        Returns
+        -------
+        int
+            Number of attempts per request, including the first one
+        """
+        return self._max_attempts
+
+    @property
+    def deadline(self):
+        """
+
+        Returns
+        -------
+        float
+            Seconds a request may take, including all its retries
+        """
+        return self._deadline
+
+    def backoff(self, attempt: int):
+        """Returns the number of seconds to wait after a failed attempt
+
+        Parameters
+        ----------
+        attempt: int
+            Number of the failed attempt (0 for the first one)
+
+        Returns
+        -------
+        float
+        """
+        delay = min(self._max_delay, self._base_delay * self._multiplier ** attempt)
+        return random.uniform(0, delay) if self._jitter else delay
+
+
+class NoRetryPolicy(RetryPolicy):
+    """Sends each request only once"""
+
+    def __init__(self, deadline: float = RetryPolicy.DEADLINE):
+        super().__init__(max_attempts=1, deadline=deadline)
+
+
+class CircuitBreaker:
+    """Stops sending requests to the API after a number of consecutive failures, so that callers fail over straight away
+    instead of waiting for timeouts. After a cool-down period, a single trial request is let through: the breaker closes
+    again if it succeeds and stays open otherwise."""
+
+    CLOSED = 'closed'  # requests are sent
+    OPEN = 'open'  # requests fail straight away
+    HALF_OPEN = 'half-open'  # a single trial request is in flight
+
+    FAILURE_THRESHOLD = 5  # consecutive failures after which the breaker opens
+    RESET_TIMEOUT = 30  # seconds after which a trial request is let through
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        """Initializes a CircuitBreaker object
+
+        Parameters
+        ----------
+        failure_threshold: int
+            Number of consecutive failures after which the breaker opens
+        reset_timeout: float
+            Seconds after which a trial request is let through an open breaker
+        """
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._n_failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """
+
+        Returns
+        -------
+        str
+            CircuitBreaker.CLOSED, CircuitBreaker.OPEN or CircuitBreaker.HALF_OPEN
+        """
+        return self._state
+
+    def allow_request(self):
+        """Returns whether a request may be sent (if the breaker is open and its cool-down period is over, the request
+        becomes the trial request)
+
+        Returns
+        -------
+        bool
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and monotonic() - self._opened_at >= self._reset_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._n_failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._n_failures += 1
+            if self._state == self.HALF_OPEN or self._n_failures >= self._failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = monotonic()
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_default_circuit_breakers = {}  # host (and port) -> breaker shared by the requests to it that do not specify a breaker
+_default_circuit_breakers_lock = threading.Lock()
+
+
+def get_default_circuit_breaker(url: str):
+    """Returns the breaker shared by all the requests to the host of a URL that do not specify a breaker, so that a
+    host that is down does not stop the requests to the other ones
+
+    Parameters
+    ----------
+    url: str
+        URL the requests are sent to
+
+    Returns
+    -------
+    CircuitBreaker
+    """
+    host = urlsplit(url).netloc
+    with _default_circuit_breakers_lock:
+        breaker = _default_circuit_breakers.get(host)
+        if breaker is None:
+            breaker = _default_circuit_breakers[host] = CircuitBreaker()
+        return breaker
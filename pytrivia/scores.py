@@ -0,0 +1,131 @@
+"""Contains the high-score store, which keeps the historical records of the games (highest score, number of rounds and
+longest success streak) in a JSON file
+
+The file is read once, written atomically and locked while it is updated, so that several games (in one or several
+processes) can record their scores without losing or corrupting any record.
+"""
+
+import os
+import threading
+
+from pytrivia.events import GameOver
+from pytrivia.utils import create_folder_if_missing, locked_file, read_json_file_to_dict, write_dict_to_json_file
+
+
+RECORD_FIELDS = ('score', 'n_rounds', 'success_streak')
+
+
+def merge_records(records: dict, other: dict):
+    """Merges two sets of records, keeping the best value of each field
+
+    Parameters
+    ----------
+    records: dict
+        Records ('score', 'n_rounds' and 'success_streak'), None if there are none
+    other: dict
+        Records to merge, None if there are none
+
+    Returns
+    -------
+    dict
+        Merged records (None if there are none)
+    """
+    if not records:
+        return dict(other) if other else None
+    if not other:
+        return dict(records)
+    return {field: max(records[field], other[field]) for field in RECORD_FIELDS}
+
+
+def summary_to_records(summary: GameOver):
+    return {'score': summary.high_score,
+            'n_rounds': summary.n_rounds,
+            'success_streak': summary.longest_success_streak}
+
+
+class HighScoreStore:
+    """Keeps the historical records in a JSON file. The file is only read the first time the records are needed (and
+    again if another game or process changed it); the records of the games are merged into it immediately or, in batch
+    mode, whenever flush is called."""
+
+    def __init__(self, path: str, autoflush: bool = True):
+        """Initializes a HighScoreStore object
+
+        Parameters
+        ----------
+        path: str
+            JSON file the records are kept in
+        autoflush: bool
+            If True, the records of a game are written as soon as it is recorded. Otherwise (batch mode, e.g. for the
+            game server) they are only written by flush
+        """
+        self._path = path
+        self._autoflush = autoflush
+        self._records = None
+        self._loaded = False
+        self._file_signature = None  # (modification time, size) of the file when it was last read or written
+        self._pending = None  # records not written yet
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def _signature(self):
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._file_signature = self._signature()
+        self._records = read_json_file_to_dict(self._path)
+        self._loaded = True
+
+    @property
+    def records(self):
+        """
+
+        Returns
+        -------
+        dict
+            The historical records ('score', 'n_rounds' and 'success_streak'), including the games that have been
+            recorded but not written yet. None if there are none
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return merge_records(self._records, self._pending)
+
+    def record(self, summary: GameOver):
+        """Records the summary of a game that is over
+
+        Returns
+        -------
+        dict
+            The records before the game was recorded (None if there were none)
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            previous_records = merge_records(self._records, self._pending)
+            self._pending = merge_records(self._pending, summary_to_records(summary))
+        if self._autoflush:
+            self.flush()
+        return previous_records
+
+    def flush(self):
+        """Merges the pending records into the file, while holding a lock on it. The file is only read again if it was
+        changed since it was last read or written."""
+        with self._lock:
+            if self._pending is None:
+                return
+            create_folder_if_missing(os.path.dirname(self._path) or '.')
+            with locked_file(self._path):
+                if not self._loaded or self._signature() != self._file_signature:
+                    self._load()
+                self._records = merge_records(self._records, self._pending)
+                write_dict_to_json_file(self._records, self._path)
+                self._file_signature = self._signature()
+            self._pending = None
@@ -0,0 +1,442 @@
+"""Contains the game server, which hosts many games at once behind a local HTTP front end
+
+All the games share one question pool (and, through it, one HTTP session to the Trivia API). Sessions that have been
+idle for too long are evicted. The scores of the games that are over are written to the high-score file and to the leaderboard in batches.
+
+Run from the root of the repository:
+
+    python -m pytrivia.server [--host 127.0.0.1] [--port 8000] [--offline] [--metrics]
+
+Endpoints (all the bodies are JSON, except the metrics in the Prometheus format):
+    POST   /sessions                      starts a game, returns its session_id and first prompt
+    GET    /sessions/<session_id>         returns the current prompt (or the summary of a game that is over)
+    POST   /sessions/<session_id>/answer  takes {"key": ...}, returns the feedback (if any) and the next prompt
+    DELETE /sessions/<session_id>         ends the session
+    GET    /leaderboard[?k=10&player=...]  returns the best games (of a player if given)
+    GET    /leaderboard/rank?score=...    returns the rank and percentile of a score
+    GET    /stats                         returns the statistics of the server and of each session
+    GET    /metrics[?format=json]         returns the metrics (see pytrivia.metrics) in the Prometheus text format or
+                                          as JSON. They are only recorded if the server is run with --metrics
+"""
+
+import argparse
+import json
+import threading
+import uuid
+
+from collections import deque
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import monotonic, perf_counter
+from urllib.parse import parse_qs
+
+from pytrivia.base import Category
+from pytrivia.game import Game
+from pytrivia.leaderboard import Leaderboard
+from pytrivia.metrics import REGISTRY, cache_hit_ratio
+from pytrivia.pool import QuestionPool
+from pytrivia.scores import HighScoreStore
+from pytrivia.utils import create_folder_if_missing
+
+
+def event_to_dict(event):
+    """Converts an event (Prompt, Feedback or GameOver) to a dictionary that can be serialized to JSON"""
+    if event is None:
+        return None
+    converted = {}
+    for field, value in event._asdict().items():
+        if isinstance(value, Category):
+            value = value.formatted_str
+        elif isinstance(value, Enum):
+            value = value.value
+        converted[field] = value
+    return converted
+
+
+def _percentile(sorted_values: list, percentile: float):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(percentile / 100 * len(sorted_values)))]
+
+
+class GameSession:
+    """A game hosted by the server, together with its activity and latency statistics"""
+
+    MAX_LATENCY_SAMPLES = 1000  # number of most recent response latencies kept
+
+    def __init__(self, session_id: str, game: Game, player: str = None):
+        """Initializes a GameSession object
+
+        Parameters
+        ----------
+        session_id: str
+            Identifier of the session
+        game: Game
+            The game played in the session (already started)
+        player: str
+            Name of the player (None if anonymous)
+        """
+        self._session_id = session_id
+        self._game = game
+        self._player = player
+        self._last_active = monotonic()
+        self._latencies = deque(maxlen=self.MAX_LATENCY_SAMPLES)
+        self._n_responses = 0
+        self.lock = threading.Lock()  # responses of a session are processed one at a time
+
+    @property
+    def session_id(self):
+        return self._session_id
+
+    @property
+    def game(self):
+        return self._game
+
+    @property
+    def player(self):
+        return self._player
+
+    @property
+    def idle_time(self):
+        """
+
+        Returns
+        -------
+        float
+            Seconds since the last request of the session
+        """
+        return monotonic() - self._last_active
+
+    def touch(self):
+        self._last_active = monotonic()
+
+    def record_latency(self, latency: float):
+        self._n_responses += 1
+        self._latencies.append(latency)
+
+    @property
+    def stats(self):
+        """
+
+        Returns
+        -------
+        dict
+            Number of responses processed and latencies (in ms) of the most recent ones
+        """
+        latencies = sorted(self._latencies)
+        return {'n_responses': self._n_responses,
+                'is_over': self._game.is_over,
+                'idle_time': self.idle_time,
+                'mean_latency_ms': 1000 * sum(latencies) / len(latencies) if latencies else None,
+                'p50_latency_ms': 1000 * _percentile(latencies, 50) if latencies else None,
+                'p99_latency_ms': 1000 * _percentile(latencies, 99) if latencies else None}
+
+
+class GameServer:
+    """Hosts many games at once, keyed by session ID, that take their questions from a shared question pool"""
+
+    IDLE_TIMEOUT = 15 * 60  # seconds after which an idle session is evicted
+    EVICTION_INTERVAL = 60  # seconds between two evictions of idle sessions (and writes of the high scores)
+
+    def __init__(self, question_pool: QuestionPool = None, idle_timeout: float = IDLE_TIMEOUT,
+                 eviction_interval: float = EVICTION_INTERVAL, high_score_store: HighScoreStore = None,
+                 leaderboard: Leaderboard = None):
+        """Initializes a GameServer object
+
+        Parameters
+        ----------
+        question_pool: QuestionPool
+            Pool shared by all the games. If None, a pool filling the question cache of the game is created
+        idle_timeout: float
+            Seconds after which an idle session is evicted
+        eviction_interval: float
+            Seconds between two evictions of idle sessions. The scores recorded in the meantime are written at the same
+            time
+        high_score_store: HighScoreStore
+            Store the scores of the games are recorded in. If None, the high-score file of the game is written in batches
+        leaderboard: Leaderboard
+            Leaderboard the games are recorded in. If None, the leaderboard of the game is written in batches
+        """
+        self._question_pool = Game.create_question_pool() if question_pool is None else question_pool
+        self._idle_timeout = idle_timeout
+        self._eviction_interval = eviction_interval
+        self._high_score_store = HighScoreStore(Game.HIGH_SCORE_FILE, autoflush=False) \
+            if high_score_store is None else high_score_store
+        if leaderboard is None:
+            create_folder_if_missing(Game.CACHE_FOLDER)
+            leaderboard = Leaderboard(Game.LEADERBOARD_FILE, autoflush=False)
+        self._leaderboard = leaderboard
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._eviction_thread = None
+        self._n_games_started = 0
+        self._n_games_over = 0
+        self._n_evicted = 0
+
+    @property
+    def n_sessions(self):
+        return len(self._sessions)
+
+    @property
+    def leaderboard(self):
+        return self._leaderboard
+
+    def start(self):
+        """Starts filling the question pool, evicting idle sessions and writing the high scores in the background"""
+        self._question_pool.start()
+        self._stopped.clear()
+        self._eviction_thread = threading.Thread(target=self._eviction_loop, name='GameServerEviction', daemon=True)
+        self._eviction_thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._eviction_thread is not None:
+            self._eviction_thread.join()
+            self._eviction_thread = None
+        self._question_pool.stop()
+        self._high_score_store.flush()
+        self._leaderboard.flush()
+
+    def _eviction_loop(self):
+        while not self._stopped.wait(self._eviction_interval):
+            self.evict_idle_sessions()
+            self._high_score_store.flush()
+            self._leaderboard.flush()
+
+    def evict_idle_sessions(self):
+        """Ends the sessions that have been idle for longer than the idle timeout
+
+        Returns
+        -------
+        int
+            Number of sessions evicted
+        """
+        with self._lock:
+            idle_ids = [sid for sid, session in self._sessions.items() if session.idle_time > self._idle_timeout]
+            for session_id in idle_ids:
+                del self._sessions[session_id]
+            self._n_evicted += len(idle_ids)
+        return len(idle_ids)
+
+    def _get_session(self, session_id: str):
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            raise KeyError(session_id)
+        session.touch()
+        return session
+
+    def _state(self, session: GameSession):
+        game = session.game
+        if game.is_over:
+            return {'session_id': session.session_id, 'game_over': event_to_dict(game.summary())}
+        return {'session_id': session.session_id, 'prompt': event_to_dict(game.prompt())}
+
+    def create_session(self, player: str = None):
+        """Starts a new game
+
+        Parameters
+        ----------
+        player: str
+            Name of the player, for the leaderboard (None if anonymous)
+
+        Returns
+        -------
+        dict
+            The session ID and the first prompt of the game
+        """
+        game = Game(question_pool=self._question_pool)
+        game.start()
+        session = GameSession(uuid.uuid4().hex, game, player)
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._n_games_started += 1
+        return self._state(session)
+
+    def get_state(self, session_id: str):
+        """Returns the current prompt of a game (or its summary if it is over)
+
+        Raises
+        ------
+        KeyError
+            If there is no such session (e.g. it was evicted)
+        """
+        session = self._get_session(session_id)
+        with session.lock:
+            return self._state(session)
+
+    def respond(self, session_id: str, key: str):
+        """Sends the player's response to the current prompt of a game
+
+        Returns
+        -------
+        dict
+            The feedback (None if the player chose the question) and the next prompt (or the summary of the game, or an
+            error if the question of the next round cannot be fetched: get_state then retries)
+
+        Raises
+        ------
+        KeyError
+            If there is no such session (e.g. it was evicted)
+        ValueError
+            If the key is not one of the options of the prompt
+        """
+        session = self._get_session(session_id)
+        with session.lock:
+            start = perf_counter()
+            feedback = session.game.respond(key)
+            session.record_latency(perf_counter() - start)
+            if session.game.is_over and feedback is not None:
+                self._high_score_store.record(session.game.summary())
+                self._leaderboard.record(session.game.summary(), session.player)
+                with self._lock:
+                    self._n_games_over += 1
+            try:
+                state = self._state(session)
+            except ConnectionError as e:
+                # the answer has been taken: the next prompt is fetched again by get_state, not by sending it again
+                state = {'session_id': session.session_id, 'error': str(e)}
+            return dict(state, feedback=event_to_dict(feedback))
+
+    def close_session(self, session_id: str):
+        with self._lock:
+            del self._sessions[session_id]
+
+    @property
+    def stats(self):
+        """
+
+        Returns
+        -------
+        dict
+            Counters of the server and statistics of each session
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            counters = {'n_sessions': len(sessions),
+                        'n_games_started': self._n_games_started,
+                        'n_games_over': self._n_games_over,
+                        'n_evicted': self._n_evicted,
+                        'n_buffered_questions': self._question_pool.n_buffered(),
+                        'records': self._high_score_store.records}
+        return dict(counters, sessions={session.session_id: session.stats for session in sessions})
+
+
+class _GameRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status: int, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str, content_type: str):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _handle(self, method: str):
+        game_server = self.server.game_server
+        path, _, query_string = self.path.partition('?')
+        parts = [part for part in path.split('/') if part]
+        query = {key: values[0] for key, values in parse_qs(query_string).items()}
+        try:
+            if method == 'GET' and parts == ['stats']:
+                self._send_json(200, game_server.stats)
+            elif method == 'GET' and parts == ['metrics']:
+                if query.get('format') == 'json':
+                    self._send_json(200, {'metrics': REGISTRY.snapshot(), 'cache_hit_ratio': cache_hit_ratio()})
+                else:
+                    self._send_text(200, REGISTRY.to_prometheus(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif method == 'GET' and parts == ['leaderboard']:
+                entries = game_server.leaderboard.top(int(query.get('k', Leaderboard.TOP_K)), query.get('player'))
+                self._send_json(200, [entry._asdict() for entry in entries])
+            elif method == 'GET' and parts == ['leaderboard', 'rank']:
+                score = int(query.get('score', ''))
+                self._send_json(200, {'score': score,
+                                      'rank': game_server.leaderboard.rank(score),
+                                      'percentile': game_server.leaderboard.percentile(score)})
+            elif method == 'POST' and parts == ['sessions']:
+                self._send_json(201, game_server.create_session(self._read_json().get('player')))
+            elif method == 'GET' and len(parts) == 2 and parts[0] == 'sessions':
+                self._send_json(200, game_server.get_state(parts[1]))
+            elif method == 'POST' and len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'answer':
+                self._send_json(200, game_server.respond(parts[1], str(self._read_json().get('key'))))
+            elif method == 'DELETE' and len(parts) == 2 and parts[0] == 'sessions':
+                game_server.close_session(parts[1])
+                self._send_json(200, {'session_id': parts[1]})
+            else:
+                self._send_json(404, {'error': 'Not found'})
+        except KeyError:
+            self._send_json(404, {'error': 'Unknown session'})
+        except (ValueError, RuntimeError) as e:  # invalid key, game over...
+            self._send_json(400, {'error': str(e)})
+        except ConnectionError as e:
+            self._send_json(503, {'error': str(e)})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GameHTTPServer(ThreadingHTTPServer):
+    """HTTP front end of a GameServer"""
+
+    daemon_threads = True
+
+    def __init__(self, game_server: GameServer, host: str = '127.0.0.1', port: int = 8000):
+        super().__init__((host, port), _GameRequestHandler)
+        self.game_server = game_server
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves PyTrivia games over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--offline', action='store_true', help="only use the questions of the question cache")
+    parser.add_argument('--metrics', action='store_true', help="record the metrics served on /metrics")
+    args = parser.parse_args()
+
+    if args.metrics:
+        REGISTRY.enable()
+
+    game_server = GameServer(question_pool=Game.create_question_pool(args.offline))
+    game_server.start()
+    http_server = GameHTTPServer(game_server, args.host, args.port)
+    print(f"Serving PyTrivia on {http_server.url}")
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        game_server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Contains the HTTP session shared by all the requests sent to the Trivia API"""
+
+import threading
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+
+class HttpSession:
+    """Wraps a requests.Session that keeps a pool of keep-alive connections, so that consecutive requests to the same
+    host reuse an open TCP (and TLS) connection instead of opening a new one each time."""
+
+    CONNECT_TIMEOUT = 3.05  # seconds to establish a connection
+    READ_TIMEOUT = 10  # seconds to wait for the server to send data
+    POOL_CONNECTIONS = 4  # number of hosts whose connection pools are kept
+    POOL_MAXSIZE = 10  # number of keep-alive connections kept per host
+    HEADERS = {'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'}
+
+    def __init__(self, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE):
+        """Initializes an HttpSession object
+
+        Parameters
+        ----------
+        connect_timeout: float
+            Number of seconds to wait for a connection to be established
+        read_timeout: float
+            Number of seconds to wait for the server to send data
+        pool_connections: int
+            Number of hosts whose connection pools are kept
+        pool_maxsize: int
+            Number of keep-alive connections kept per host (should be at least the number of threads sending requests)
+        """
+        self._timeout = (connect_timeout, read_timeout)
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._session = requests.Session()
+        self._session.mount('https://', self._adapter)
+        self._session.mount('http://', self._adapter)
+        self._session.headers.update(self.HEADERS)
+
+    @property
+    def timeout(self):
+        """
+
+        Returns
+        -------
+        tuple of float
+            Connect and read timeouts, in seconds
+        """
+        return self._timeout
+
+    @property
+    def stats(self):
+        """Connection-reuse statistics of the hosts currently in the pool
+
+        Returns
+        -------
+        dict
+            Number of requests sent ('n_requests'), of connections opened ('n_connections') and of requests sent over
+            an already open connection ('n_reused')
+        """
+        pools = self._adapter.poolmanager.pools
+        n_requests = 0
+        n_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                n_requests += pool.num_requests
+                n_connections += pool.num_connections
+        return {'n_requests': n_requests,
+                'n_connections': n_connections,
+                'n_reused': n_requests - n_connections}
+
+    def get(self, url: str, **kwargs):
+        """Sends a GET request over a pooled connection. The timeouts of the session are used unless a timeout is
+        passed explicitly. gzip-encoded responses are decompressed transparently.
+
+        Parameters
+        ----------
+        url: str
+            URL of the request
+        **kwargs
+            Keyword arguments passed on to requests.Session.get
+
+        Returns
+        -------
+        requests.Response
+        """
+        kwargs.setdefault('timeout', self._timeout)
+        return self._session.get(url, **kwargs)
+
+    def close(self):
+        """Closes all the pooled connections"""
+        self._session.close()
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session():
+    """Returns the HttpSession shared by all the requests that do not specify a session (created on first use)
+
+    Returns
+    -------
+    HttpSession
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = HttpSession()
+        return _default_session
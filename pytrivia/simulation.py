@@ -0,0 +1,309 @@
+"""Contains the simulation mode, which plays many games with bots instead of human players to tune the rules of the game
+
+Games are played headlessly (no input or output) on a local corpus of questions and spread over a process pool. Only
+aggregated distributions are returned.
+
+Run from the root of the repository:
+
+    python -m pytrivia.simulation [--n-games 100000] [--p-correct 0.7] [--corpus questions.json]
+"""
+
+import argparse
+import json
+import os
+import random
+
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.cache import QuestionCache
+from pytrivia.corpus import Corpus, read_raw_questions
+from pytrivia.events import PromptKind, RoundType
+from pytrivia.game import Game, RegularRound, BonusRound, CategoryRound
+from pytrivia.pool import StaticQuestionPool
+
+
+class GameRules(NamedTuple):
+    """The tunable rules of the game"""
+
+    start_score: int = Game.START_SCORE
+    bonus_round_success_streak_thres: int = Game.BONUS_ROUND_SUCCESS_STREAK_THRES
+    category_round_frequency: int = Game.CATEGORY_ROUND_FREQUENCY
+    regular_round_points: tuple = (RegularRound.POS_POINTS, RegularRound.NEG_POINTS)
+    bonus_round_points: tuple = (BonusRound.POS_POINTS, BonusRound.NEG_POINTS)
+    category_round_points: tuple = (CategoryRound.POS_POINTS, CategoryRound.NEG_POINTS)
+
+    def game_class(self):
+        """Returns a subclass of Game (and of its rounds) that applies the rules"""
+        def round_class(base, points):
+            return type(base.__name__, (base,), {'POS_POINTS': points[0], 'NEG_POINTS': points[1]})
+
+        return type('Game', (Game,), {
+            'START_SCORE': self.start_score,
+            'BONUS_ROUND_SUCCESS_STREAK_THRES': self.bonus_round_success_streak_thres,
+            'CATEGORY_ROUND_FREQUENCY': self.category_round_frequency,
+            'REGULAR_ROUND': round_class(RegularRound, self.regular_round_points),
+            'BONUS_ROUND': round_class(BonusRound, self.bonus_round_points),
+            'CATEGORY_ROUND': round_class(CategoryRound, self.category_round_points),
+        })
+
+
+class Player(ABC):
+    """Bot that plays in place of a human. Subclasses decide how it responds to each prompt."""
+
+    @abstractmethod
+    def respond(self, prompt, rnd):
+        """Returns the key of the option chosen by the player
+
+        Parameters
+        ----------
+        prompt: Prompt
+            The prompt to respond to
+        rnd: Round
+            The round being played (bots may look at the correct answer to simulate a level of knowledge)
+
+        Returns
+        -------
+        str
+        """
+        pass
+
+    @staticmethod
+    def _answer(prompt, rnd, is_correct: bool):
+        if is_correct:
+            return rnd.correct_key
+        return random.choice([key for key in prompt.options if key != rnd.correct_key])
+
+
+class ProbabilisticPlayer(Player):
+    """Answers correctly with a certain probability (per category), chooses the category it knows best in category
+    rounds and the question of the category it knows best in bonus rounds."""
+
+    def __init__(self, p_correct=0.5):
+        """Initializes a ProbabilisticPlayer object
+
+        Parameters
+        ----------
+        p_correct: float or dict
+            Probability of answering correctly, either the same for all the categories or per Category (the categories
+            missing from the dictionary default to 0.5)
+        """
+        if isinstance(p_correct, dict):
+            self._p_correct = {cat: p_correct.get(cat, 0.5) for cat in Category}
+        else:
+            self._p_correct = {cat: p_correct for cat in Category}
+
+    def p_correct(self, category: Category):
+        return self._p_correct[category]
+
+    def respond(self, prompt, rnd):
+        if prompt.kind == PromptKind.Answer:
+            return self._answer(prompt, rnd, random.random() < self._p_correct[prompt.category])
+        if prompt.kind == PromptKind.ChooseCategory:
+            return max(prompt.options,
+                       key=lambda k: self._p_correct[Category.map_from_formatted_str(prompt.options[k])])
+        return max(prompt.options, key=lambda k: self._p_correct[rnd.candidates[int(k) - 1].category])
+
+
+class ScriptedPlayer(Player):
+    """Answers correctly or wrongly following a script (repeated once exhausted) and always chooses the first option."""
+
+    def __init__(self, script: list):
+        """Initializes a ScriptedPlayer object
+
+        Parameters
+        ----------
+        script: list of bool
+            Whether each successive answer is correct
+        """
+        if not script:
+            raise ValueError("The script of a player cannot be empty")
+        self._script = list(script)
+        self._n_answers = 0
+
+    def respond(self, prompt, rnd):
+        if prompt.kind != PromptKind.Answer:
+            return next(iter(prompt.options))
+        is_correct = self._script[self._n_answers % len(self._script)]
+        self._n_answers += 1
+        return self._answer(prompt, rnd, is_correct)
+
+
+def play_game(game, player: Player, max_rounds: int):
+    """Plays a game with a bot until it is over (or max_rounds rounds have been played, not counting the bonus rounds:
+    the bonus round earned in the last one is played too)
+
+    Returns
+    -------
+    bool
+        Whether the game is over (False if it was stopped after max_rounds rounds)
+    """
+    game.start()
+    while not game.is_over:
+        feedback = game.respond(player.respond(game.prompt(), game.current_round))
+        if feedback is not None and game.n_rounds >= max_rounds and game.next_round_type != RoundType.Bonus:
+            break
+    return game.is_over
+
+
+class SimulationResult:
+    """Aggregated distributions of a batch of simulated games"""
+
+    def __init__(self):
+        self.n_games = 0
+        self.n_truncated = 0  # games stopped after the maximum number of rounds
+        self.game_lengths = Counter()  # number of rounds -> number of games
+        self.high_scores = Counter()
+        self.longest_success_streaks = Counter()
+        self.n_bonus_rounds = Counter()  # number of bonus rounds per game -> number of games
+
+    def add_game(self, game, is_over: bool):
+        self.n_games += 1
+        self.n_truncated += not is_over
+        self.game_lengths[game.n_rounds] += 1
+        self.high_scores[game.high_score] += 1
+        self.longest_success_streaks[game.longest_success_streak] += 1
+        self.n_bonus_rounds[game.n_bonus_rounds] += 1
+
+    def merge(self, other):
+        self.n_games += other.n_games
+        self.n_truncated += other.n_truncated
+        self.game_lengths.update(other.game_lengths)
+        self.high_scores.update(other.high_scores)
+        self.longest_success_streaks.update(other.longest_success_streaks)
+        self.n_bonus_rounds.update(other.n_bonus_rounds)
+        return self
+
+    @staticmethod
+    def _mean(distribution: Counter):
+        n = sum(distribution.values())
+        return sum(value * count for value, count in distribution.items()) / n if n else None
+
+    def summary(self):
+        """
+
+        Returns
+        -------
+        dict
+            Means of the distributions and number of games
+        """
+        return {'n_games': self.n_games,
+                'n_truncated': self.n_truncated,
+                'mean_game_length': self._mean(self.game_lengths),
+                'mean_high_score': self._mean(self.high_scores),
+                'mean_longest_success_streak': self._mean(self.longest_success_streaks),
+                'mean_n_bonus_rounds': self._mean(self.n_bonus_rounds)}
+
+    def to_dict(self):
+        """
+
+        Returns
+        -------
+        dict
+            Summary and full distributions, in a form that can be serialized to JSON
+        """
+        return dict(self.summary(),
+                    game_lengths=dict(sorted(self.game_lengths.items())),
+                    high_scores=dict(sorted(self.high_scores.items())),
+                    longest_success_streaks=dict(sorted(self.longest_success_streaks.items())),
+                    n_bonus_rounds=dict(sorted(self.n_bonus_rounds.items())))
+
+
+_worker_question_pool = None
+
+
+def load_raw_questions(path: str = None):
+    """Returns the questions of a corpus file (.corpus), of a JSON (Lines) file or, if no path is given, of the
+    question cache, in the format returned by the API"""
+    if path is None:
+        question_cache = QuestionCache(Game.QUESTION_CACHE_FOLDER)
+        return question_cache.sample(None, question_cache.n_questions(), fresh_only=False)
+    if path.endswith('.corpus'):
+        with Corpus(path) as corpus:
+            return list(corpus.iter_raw())
+    return read_raw_questions(path)
+
+
+def _init_worker(raw_questions: list):
+    global _worker_question_pool
+    _worker_question_pool = StaticQuestionPool(RequestBuilder._convert_raw_response(raw_questions))
+
+
+def _simulate_chunk(n_games: int, player: Player, rules: GameRules, max_rounds: int, seed: int):
+    random.seed(seed)
+    game_class = rules.game_class()
+    result = SimulationResult()
+    for _ in range(n_games):
+        game = game_class(question_pool=_worker_question_pool)
+        result.add_game(game, play_game(game, player, max_rounds))
+    return result
+
+
+def simulate(raw_questions: list, n_games: int, player: Player, rules: GameRules = GameRules(),
+             max_rounds: int = 1000, n_workers: int = None, chunk_size: int = 1000, seed: int = None):
+    """Plays many games with a bot on a local corpus of questions, spread over a process pool
+
+    Parameters
+    ----------
+    raw_questions: list of dict
+        Corpus of questions, in the format returned by the API
+    n_games: int
+        Number of games
+    player: Player
+        The bot playing the games
+    rules: GameRules
+        The rules of the game
+    max_rounds: int
+        Games are stopped after this number of rounds (otherwise a very good bot might never lose)
+    n_workers: int
+        Number of processes. Defaults to the number of CPUs; 1 plays all the games in the current process
+    chunk_size: int
+        Number of games played by a process at once
+    seed: int
+        Seed of the random generators (for reproducible simulations)
+
+    Returns
+    -------
+    SimulationResult
+    """
+    n_workers = n_workers or os.cpu_count()
+    seeds = random.Random(seed)
+    chunks = [min(chunk_size, n_games - start) for start in range(0, n_games, chunk_size)]
+    args = [(n, player, rules, max_rounds, seeds.getrandbits(64)) for n in chunks]
+    result = SimulationResult()
+    if n_workers == 1:
+        _init_worker(raw_questions)
+        for chunk_args in args:
+            result.merge(_simulate_chunk(*chunk_args))
+        return result
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(raw_questions,)) as executor:
+        for chunk_result in executor.map(_simulate_chunk, *zip(*args)):
+            result.merge(chunk_result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays many games with a bot to measure the effect of the rules")
+    parser.add_argument('--n-games', type=int, default=100000)
+    parser.add_argument('--p-correct', type=float, default=0.7, help="probability of answering correctly")
+    parser.add_argument('--corpus', help="corpus file, or JSON (Lines) file of raw questions (defaults to the question cache)")
+    parser.add_argument('--bonus-thres', type=int, default=Game.BONUS_ROUND_SUCCESS_STREAK_THRES)
+    parser.add_argument('--category-frequency', type=int, default=Game.CATEGORY_ROUND_FREQUENCY)
+    parser.add_argument('--max-rounds', type=int, default=1000)
+    parser.add_argument('--n-workers', type=int)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    raw_questions = load_raw_questions(args.corpus)
+    rules = GameRules(bonus_round_success_streak_thres=args.bonus_thres,
+                      category_round_frequency=args.category_frequency)
+    result = simulate(raw_questions, args.n_games, ProbabilisticPlayer(args.p_correct), rules,
+                      max_rounds=args.max_rounds, n_workers=args.n_workers, seed=args.seed)
+    print(json.dumps(result.to_dict(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""Contains the question sources, which serve questions in the format returned by the Trivia API from the API itself or
+from local stand-ins (a file, a SQLite database or a list in memory), so that the API can be kept off the hot path
+
+A source is passed to RequestBuilder (source=...), and through it to the request_* helpers and to the question pools:
+the questions it returns are validated, deduplicated, cached and converted exactly like the responses of the API.
+"""
+
+import random
+import sqlite3
+import threading
+
+from abc import ABC, abstractmethod
+from time import perf_counter
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.corpus import Corpus, read_raw_questions
+from pytrivia.database import QuestionDatabase
+from pytrivia.dedup import question_key
+
+
+class QuestionSource(ABC):
+    """Abstract parent class of the question sources"""
+
+    @property
+    def name(self):
+        """
+
+        Returns
+        -------
+        str
+            Name of the source, e.g. in the latencies of a CompositeSource
+        """
+        return type(self).__name__
+
+    @abstractmethod
+    def get_raw_questions(self, categories: list, limit: int):
+        """Returns up to limit questions drawn at random
+
+        Parameters
+        ----------
+        categories: list of Category
+            Categories the questions are drawn from. If empty or None, all the categories
+        limit: int
+            Maximum number of questions
+
+        Returns
+        -------
+        list of dict
+            Questions in the format returned by the API
+
+        Raises
+        ------
+        ConnectionError
+            If the source cannot be reached
+        """
+        pass
+
+
+class RemoteSource(QuestionSource):
+    """Requests the questions from the Trivia API (or from any server implementing it)"""
+
+    def __init__(self, base_url: str = RequestBuilder.BASE_URL, **kwargs):
+        """Initializes a RemoteSource object
+
+        Parameters
+        ----------
+        base_url: str
+            URL of the questions endpoint of the API
+        **kwargs
+            Passed on to RequestBuilder (session, retry_policy, circuit_breaker)
+        """
+        self._base_url = base_url
+        self._kwargs = kwargs
+
+    @property
+    def name(self):
+        return f"{type(self).__name__}({self._base_url})"
+
+    def get_raw_questions(self, categories: list, limit: int):
+        # the builder the source is used by counts the questions fetched
+        return RequestBuilder(base_url=self._base_url, **self._kwargs).categories(list(categories or [])) \
+            .limit(limit).get_raw_questions(record=False)
+
+
+class MemorySource(QuestionSource):
+    """Serves questions from a list held in memory"""
+
+    def __init__(self, raw_questions: list):
+        """Initializes a MemorySource object
+
+        Parameters
+        ----------
+        raw_questions: list of dict
+            Questions in the format returned by the API
+        """
+        self._raw_questions = list(raw_questions)
+        self._by_category = {}
+        for raw_question in self._raw_questions:
+            category = Category.map_from_formatted_str(raw_question['category'])
+            self._by_category.setdefault(category, []).append(raw_question)
+
+    def __len__(self):
+        return len(self._raw_questions)
+
+    def get_raw_questions(self, categories: list, limit: int):
+        if not categories:
+            candidates = self._raw_questions
+        elif len(categories) == 1:
+            candidates = self._by_category.get(categories[0], [])
+        else:
+            candidates = [raw_question for category in set(categories)
+                          for raw_question in self._by_category.get(category, [])]
+        return random.sample(candidates, k=min(limit, len(candidates)))
+
+
+class FileSource(QuestionSource):
+    """Serves questions from a JSON file (a list of questions), a JSON Lines file (one question per line) or a corpus file
+    (see pytrivia.corpus). The file is read the first time questions are requested."""
+
+    def __init__(self, path: str):
+        """Initializes a FileSource object
+
+        Parameters
+        ----------
+        path: str
+            JSON, JSON Lines (.jsonl) or corpus (.corpus) file
+        """
+        self._path = path
+        self._memory_source = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self):
+        return f"{type(self).__name__}({self._path})"
+
+    def _load(self):
+        with self._lock:
+            if self._memory_source is None:
+                try:
+                    if self._path.endswith('.corpus'):
+                        with Corpus(self._path) as corpus:
+                            raw_questions = list(corpus.iter_raw())
+                    else:
+                        raw_questions = read_raw_questions(self._path)
+                except (OSError, ValueError) as e:
+                    raise ConnectionError(f"Cannot read the questions of {self._path}") from e
+                self._memory_source = MemorySource(raw_questions)
+            return self._memory_source
+
+    def get_raw_questions(self, categories: list, limit: int):
+        return self._load().get_raw_questions(categories, limit)
+
+
+class SQLiteSource(QuestionSource):
+    """Serves questions from a question database (see pytrivia.database), which can be filled with add (e.g. with the
+    questions received from the API). The questions are drawn with indexed reads, whatever the size of the database."""
+
+    def __init__(self, path: str):
+        """Initializes a SQLiteSource object (the database is created if it does not exist)
+
+        Parameters
+        ----------
+        path: str
+            SQLite database file
+        """
+        self._database = QuestionDatabase(path)
+
+    @property
+    def name(self):
+        return f"{type(self).__name__}({self._database.path})"
+
+    @property
+    def database(self):
+        """
+
+        Returns
+        -------
+        QuestionDatabase
+            The database the questions are drawn from
+        """
+        return self._database
+
+    def close(self):
+        self._database.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._database)
+
+    def add(self, raw_questions: list):
+        """Adds questions (in the format returned by the API) to the database, in one transaction. The questions
+        already in it (see pytrivia.dedup) are updated."""
+        self._database.upsert(raw_questions)
+
+    def get_raw_questions(self, categories: list, limit: int):
+        try:
+            return self._database.sample(categories, limit)
+        except sqlite3.Error as e:
+            raise ConnectionError(f"Cannot read the questions of {self._database.path}") from e
+
+
+class CompositeSource(QuestionSource):
+    """Tries several sources in the order of their latency (estimated from the previous requests, the sources that have
+    not served any request yet being tried first) and merges their questions until the limit is reached. A source that
+    fails is skipped, and counted as very slow so that it is tried last from then on."""
+
+    SMOOTHING = 0.2  # weight of the last request in the latency estimate of a source
+    FAILURE_LATENCY = 10  # seconds counted as the latency of a failed request
+
+    def __init__(self, sources: list):
+        """Initializes a CompositeSource object
+
+        Parameters
+        ----------
+        sources: list of QuestionSource
+            Sources the questions are taken from
+        """
+        if not sources:
+            raise ValueError("A composite source needs at least one source")
+        self._sources = list(sources)
+        self._latencies = {}  # source -> estimated latency in seconds
+        self._lock = threading.Lock()
+
+    @property
+    def latencies(self):
+        """
+
+        Returns
+        -------
+        dict
+            Name of each source -> estimated latency in seconds (None if it has not served any request yet)
+        """
+        with self._lock:
+            return {source.name: self._latencies.get(source) for source in self._sources}
+
+    def _record_latency(self, source: QuestionSource, latency: float):
+        with self._lock:
+            estimate = self._latencies.get(source)
+            self._latencies[source] = latency if estimate is None else \
+                (1 - self.SMOOTHING) * estimate + self.SMOOTHING * latency
+
+    def _sources_by_latency(self):
+        with self._lock:
+            return sorted(self._sources, key=lambda source: self._latencies.get(source, 0))
+
+    def get_raw_questions(self, categories: list, limit: int):
+        raw_questions = []
+        keys = set()
+        n_failures = 0
+        for source in self._sources_by_latency():
+            start = perf_counter()
+            try:
+                batch = source.get_raw_questions(categories, limit - len(raw_questions))
+            except ConnectionError:
+                self._record_latency(source, self.FAILURE_LATENCY)
+                n_failures += 1
+                continue
+            self._record_latency(source, perf_counter() - start)
+            for raw_question in batch:
+                key = question_key(raw_question['question'])
+                if key not in keys:
+                    keys.add(key)
+                    raw_questions.append(raw_question)
+            if len(raw_questions) >= limit:
+                break
+        if not raw_questions and n_failures == len(self._sources):
+            raise ConnectionError("None of the question sources can be reached")
+        return raw_questions[:limit]
+
+
+def open_source(path: str):
+    """Returns the source serving the questions of a local file: a SQLiteSource for a SQLite database (.db, .sqlite),
+    a FileSource otherwise"""
+    if path.endswith(('.db', '.sqlite')):
+        return SQLiteSource(path)
+    return FileSource(path)
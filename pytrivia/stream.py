@@ -0,0 +1,80 @@
+"""Contains an incremental parser for the JSON arrays returned by the Trivia API"""
+
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARACTERS = '0123456789+-.eE'
+
+
+def iter_json_array(chunks, encoding: str = 'utf-8'):
+    """Parses a JSON array incrementally and yields its items one at a time, so that only the item being parsed (and
+    not the whole array) is held in memory
+
+    Parameters
+    ----------
+    chunks: iterable of bytes
+        Successive chunks of the JSON document (e.g. requests.Response.iter_content)
+    encoding: str
+        Encoding of the document
+
+    Yields
+    ------
+    object
+        The items of the array, decoded
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    exhausted = False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer = buffer[pos:] + text_decoder.decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return not exhausted
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not read_more():
+                return
+
+    def expect(characters):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] not in characters:
+            found = buffer[pos] if pos < len(buffer) else 'end of document'
+            raise ValueError(f"Invalid JSON array: expected one of {characters!r}, found {found!r}")
+        pos += 1
+        return buffer[pos - 1]
+
+    expect('[')
+    skip_whitespace()
+    if buffer[pos:pos + 1] == ']':
+        return
+    while True:
+        skip_whitespace()
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if read_more():
+                continue
+            raise
+        if isinstance(item, (int, float)) and not exhausted and \
+                (end == len(buffer) or buffer[end] in _NUMBER_CHARACTERS):
+            read_more()  # the number may continue in the next chunk: parse it again with more data
+            continue
+        pos = end
+        yield item
+        if expect(',]') == ']':
+            return
@@ -1,6 +1,15 @@
 """Contains useful functions"""
 import os
 import json
+import tempfile
+
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 
 def alphabetic_range(length: int):
@@ -59,6 +68,35 @@ def read_json_file_to_dict(path_to_file):
 
 
 def write_dict_to_json_file(dict, path_to_file):
-    create_file_if_missing(path_to_file)
-    with open(path_to_file, 'w') as f:
-        json.dump(dict, f)
+    """Writes to a temporary file that then replaces the file in one step, so that the file is never left partially
+    written (e.g. if the program crashes mid-write) and readers see either the old or the new content"""
+    folder = os.path.dirname(os.path.abspath(path_to_file))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.' + os.path.basename(path_to_file), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path_to_file)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def locked_file(path_to_file):
+    """Holds an exclusive lock on a file (through a '.lock' file next to it) that is shared between processes"""
+    with open(path_to_file + '.lock', 'a+') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
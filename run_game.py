@@ -1,11 +1,19 @@
+import sys
+
 from pytrivia.game import Game, run_game_in_loop
+from pytrivia.sources import open_source
 
 
 if __name__ == "__main__":
 
+    # play without connecting to the Trivia API (only questions from the question cache are used)
+    offline = '--offline' in sys.argv[1:]
+    # play with the questions of a local file (JSON, JSON Lines, corpus or SQLite database) instead of the Trivia API
+    source = open_source(sys.argv[sys.argv.index('--source') + 1]) if '--source' in sys.argv[1:] else None
+
     # play a single game
-    # game = Game()
+    # game = Game(offline=offline)
     # game.play()
 
     # play games in loop, as long as user does not exit
-    run_game_in_loop()
\ No newline at end of file
+    run_game_in_loop(offline=offline, source=source)
@@ -0,0 +1,42 @@
+"""Tests of the asynchronous request builder against the stub API"""
+
+import asyncio
+
+import pytest
+
+from benchmarks.stub_server import StubTriviaServer
+from pytrivia.async_client import AsyncRequestBuilder, ConcurrencyLimiter, async_request_from_trivia_api
+from pytrivia.base import Category
+from pytrivia.dedup import CorpusIndex
+
+
+@pytest.fixture(scope='module')
+def url():
+    with StubTriviaServer() as server:
+        yield server.url
+
+
+def test_get_questions(url):
+    builder = async_request_from_trivia_api(base_url=url).categories(Category.Music).limit(5)
+    assert isinstance(builder, AsyncRequestBuilder)
+    questions = asyncio.run(builder.get_questions())
+    assert questions and all(question.category == Category.Music for question in questions)
+    assert asyncio.run(builder.get_raw_questions())
+
+
+def test_get_questions_by_category(url):
+    limiter = ConcurrencyLimiter(max_concurrency=2)
+    corpus_index = CorpusIndex()
+    builder = AsyncRequestBuilder(base_url=url, limiter=limiter).categories([Category.Music, Category.History]) \
+        .limit(3).deduplicate(corpus_index)
+    questions = asyncio.run(builder.get_questions_by_category())
+    assert list(questions) == [Category.Music, Category.History]
+    assert all(question.category == category for category in questions for question in questions[category])
+    assert len(corpus_index) == sum(len(category_questions) for category_questions in questions.values())
+    assert limiter.in_flight == 0
+
+
+def test_only_awaitable_requests(url):
+    assert not hasattr(AsyncRequestBuilder(base_url=url), 'iter_questions')
+    with pytest.raises(ValueError):
+        AsyncRequestBuilder(offline=True)
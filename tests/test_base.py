@@ -0,0 +1,76 @@
+"""Tests of the request builder against a server whose responses cannot be parsed"""
+
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.stub_server import StubTriviaServer, load_fixture_questions
+from pytrivia.base import RequestBuilder
+from pytrivia.cache import QuestionCache
+from pytrivia.retry import CircuitBreaker, RetryPolicy
+
+
+class _ErrorPageHandler(BaseHTTPRequestHandler):
+    """Answers every request with an HTML page and a 200 status, like a misconfigured proxy"""
+
+    def do_GET(self):
+        self.server.n_requests += 1
+        body = b'<html><body>Service unavailable</body></html>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def error_page_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ErrorPageHandler)
+    server.daemon_threads = True
+    server.n_requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_builder(server, cache=None):
+    url = f"http://127.0.0.1:{server.server_address[1]}/questions"
+    return RequestBuilder(base_url=url, cache=cache, retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01),
+                          circuit_breaker=CircuitBreaker(failure_threshold=3)).limit(3)
+
+
+@pytest.fixture
+def stale_cache(tmp_path):
+    # fewer questions than needed to serve requests while the API is up
+    cache = QuestionCache(str(tmp_path / 'questions'))
+    cache.add(load_fixture_questions()[:5])
+    return cache
+
+
+@pytest.mark.parametrize('method', ['get_questions', 'iter_questions'])
+def test_unparsable_response_is_a_failed_attempt(error_page_server, method):
+    builder = make_builder(error_page_server)
+    with pytest.raises(ConnectionError):
+        list(getattr(builder, method)())
+    assert error_page_server.n_requests == 3
+    assert builder._circuit_breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.parametrize('method', ['get_questions', 'iter_questions'])
+def test_unparsable_response_falls_back_to_the_cache(error_page_server, stale_cache, method):
+    questions = list(getattr(make_builder(error_page_server, stale_cache), method)())
+    assert len(questions) == 3
+    cached_texts = {raw_question['question'] for raw_question in load_fixture_questions()[:5]}
+    assert {question.text for question in questions} <= cached_texts
+
+
+def test_iter_questions():
+    with StubTriviaServer() as server:
+        questions = list(RequestBuilder(base_url=server.url).limit(20).iter_questions(chunk_size=64))
+    assert questions and all(question.correct_answer is not None for question in questions)
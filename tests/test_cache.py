@@ -0,0 +1,40 @@
+"""Tests of the on-disk question cache"""
+
+import hashlib
+import os
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.cache import QuestionCache
+from pytrivia.utils import read_json_file_to_dict, write_dict_to_json_file
+
+
+def make_raw_question(text: str, category: Category = Category.Music):
+    return {'category': category.formatted_str,
+            'correctAnswer': f"{text} right",
+            'incorrectAnswers': [f"{text} wrong {i}" for i in range(3)],
+            'question': text,
+            'tags': [],
+            'type': RequestBuilder.QUESTION_TYPE}
+
+
+def test_variants_of_a_question_share_an_entry(tmp_path):
+    cache = QuestionCache(str(tmp_path))
+    cache.add([make_raw_question("Who composed Boléro?"), make_raw_question("who composed  Bolero")])
+    assert cache.n_questions() == 1
+    assert cache.sample([Category.Music], limit=5) == [make_raw_question("who composed  Bolero")]
+    assert len(read_json_file_to_dict(os.path.join(str(tmp_path), 'Music.json'))) == 1
+
+
+def test_files_keyed_by_sha1_are_rekeyed(tmp_path):
+    raw_questions = [make_raw_question("Who composed Boléro?"), make_raw_question("who composed  Bolero"),
+                     make_raw_question("Who wrote Carmen?")]
+    entries = {}
+    for cached_at, raw_question in enumerate(raw_questions):
+        sha1 = hashlib.sha1(raw_question['question'].encode('utf-8')).hexdigest()
+        entries[sha1] = {'question': raw_question, 'cached_at': cached_at}
+    write_dict_to_json_file(entries, os.path.join(str(tmp_path), 'Music.json'))
+    cache = QuestionCache(str(tmp_path), ttl=float('inf'))
+    assert cache.n_questions() == 2
+    cache.add([make_raw_question("Who composed Bolero?")])
+    assert sorted(raw_question['question'] for raw_question in cache.sample(None, limit=5)) == \
+        ["Who composed Bolero?", "Who wrote Carmen?"]
@@ -0,0 +1,101 @@
+"""Tests of the question database and of the dense numbering of the questions of each category"""
+
+import random
+
+import pytest
+
+from pytrivia.base import Category, RequestBuilder
+from pytrivia.database import QuestionDatabase
+
+
+def make_raw_question(text: str, category: Category = Category.Music):
+    return {'category': category.formatted_str,
+            'correctAnswer': f"{text} right",
+            'incorrectAnswers': [f"{text} wrong {i}" for i in range(3)],
+            'question': text,
+            'tags': [],
+            'type': RequestBuilder.QUESTION_TYPE}
+
+
+def slots(database: QuestionDatabase, category: Category):
+    rows = database._connection.execute("SELECT slot FROM questions WHERE category = ? ORDER BY slot",
+                                        (category.name,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def texts(raw_questions: list):
+    return sorted(raw_question['question'] for raw_question in raw_questions)
+
+
+@pytest.fixture
+def database():
+    with QuestionDatabase(':memory:') as database:
+        database.upsert([make_raw_question(f"Music {i}?") for i in range(5)] +
+                        [make_raw_question(f"History {i}?", Category.History) for i in range(3)])
+        yield database
+
+
+def test_upsert(database):
+    assert database.n_questions() == 8
+    assert database.n_questions(Category.Music) == 5
+    assert slots(database, Category.Music) == [0, 1, 2, 3, 4]
+    not_multiple_choice = dict(make_raw_question("True or false?"), type='boolean')
+    assert database.upsert([make_raw_question("Music 1?"), make_raw_question("Music 5?"), not_multiple_choice]) == \
+        (1, 1)
+    assert slots(database, Category.Music) == [0, 1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('removed', [[0], [2], [4], [1, 3], [4, 0], [0, 1, 2, 3, 4]])
+def test_remove_keeps_slots_dense(database, removed):
+    assert database.remove([f"Music {i}?" for i in removed] + ["Unknown question?"]) == len(removed)
+    n_left = 5 - len(removed)
+    assert database.n_questions(Category.Music) == n_left
+    assert slots(database, Category.Music) == list(range(n_left))
+    assert texts(database.sample([Category.Music], limit=10)) == [f"Music {i}?" for i in range(5) if i not in removed]
+    assert slots(database, Category.History) == [0, 1, 2]
+
+
+def test_category_change_keeps_slots_dense(database):
+    database.sample([Category.Music], limit=5)
+    assert database.upsert([make_raw_question("Music 1?", Category.History)]) == (0, 1)
+    assert slots(database, Category.Music) == [0, 1, 2, 3]
+    assert slots(database, Category.History) == [0, 1, 2, 3]
+    assert texts(database.sample([Category.Music], limit=10)) == ["Music 0?", "Music 2?", "Music 3?", "Music 4?"]
+    assert "Music 1?" in texts(database.sample([Category.History], limit=10))
+    assert database.times_served("Music 1?") == 2  # the times served are kept
+
+
+def test_slots_after_many_changes():
+    rng = random.Random(0)
+    categories = [Category.Music, Category.History, Category.Science]
+    with QuestionDatabase(':memory:') as database:
+        for _ in range(300):
+            text = f"Question {rng.randrange(40)}?"
+            if rng.random() < 0.3:
+                database.remove([text])
+            else:
+                database.upsert([make_raw_question(text, rng.choice(categories))])
+        for category in categories:
+            assert slots(database, category) == list(range(database.n_questions(category)))
+        assert len(texts(database.sample(limit=100))) == len(database)
+
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / 'questions.db')
+    with QuestionDatabase(path) as database:
+        database.upsert([make_raw_question(f"Music {i}?") for i in range(4)])
+        database.remove(["Music 0?"])
+    with QuestionDatabase(path) as database:
+        assert database.n_questions(Category.Music) == 3
+        database.upsert([make_raw_question("Music 4?")])
+        assert slots(database, Category.Music) == [0, 1, 2, 3]
+        assert texts(database.sample([Category.Music], limit=10)) == ["Music 1?", "Music 2?", "Music 3?", "Music 4?"]
+
+
+def test_sample(database):
+    sample = database.sample([Category.History, Category.History], limit=10)
+    assert texts(sample) == ["History 0?", "History 1?", "History 2?"]
+    assert sample[0]['type'] == RequestBuilder.QUESTION_TYPE
+    assert database.sample([Category.Science], limit=3) == []
+    assert database.times_served("History 0?") == 1
+    assert database.times_served("Unknown question?") is None
@@ -0,0 +1,277 @@
+"""Tests of the round and game state machines and of their console front end"""
+
+import pytest
+
+from pytrivia.base import Answer, Category, Question
+from pytrivia.console import play_round
+from pytrivia.events import GameOver, PromptKind, RoundType
+from pytrivia.game import BonusRound, CategoryRound, Game, RegularRound
+from pytrivia.pool import StaticQuestionPool
+from pytrivia.scores import HighScoreStore
+
+
+def make_question(text: str, category: Category = Category.Music):
+    answers = [Answer(f"{text} wrong {i}", False) for i in range(3)] + [Answer(f"{text} right", True)]
+    return Question(text, category, answers)
+
+
+@pytest.fixture
+def pool():
+    categories = [c for c in Category if c != Category.Unknown]
+    return StaticQuestionPool([make_question(f"{category.name} question {i}?", category)
+                               for category in categories for i in range(5)])
+
+
+class FlakyQuestionPool:
+    """Question pool that fails to provide the next n_failures questions"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self.n_failures = 0
+
+    def get_random_question(self, exclude=None):
+        if self.n_failures:
+            self.n_failures -= 1
+            raise ConnectionError("The question pool is unavailable")
+        return self._pool.get_random_question(exclude)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+
+def wrong_key(rnd):
+    return next(key for key in rnd.prompt().options if key != rnd.correct_key)
+
+
+def play(game, answers: list):
+    """Answers the questions of a started game correctly or wrongly according to answers, choosing the first option of
+    the bonus and category rounds, and returns the types of the rounds played"""
+    round_types = []
+    for is_correct in answers:
+        prompt = game.prompt()  # configures the next round once the previous one is finished
+        rnd = game.current_round
+        if prompt.kind != PromptKind.Answer:
+            assert game.respond('1') is None
+        round_types.append(rnd.ROUND_TYPE)
+        game.respond(rnd.correct_key if is_correct else wrong_key(rnd))
+    return round_types
+
+
+class TestRounds:
+
+    def test_regular_round_scoring(self, pool):
+        rnd = RegularRound(1, 3, 2, question_pool=pool)
+        prompt = rnd.prompt()
+        assert prompt.kind == PromptKind.Answer
+        assert prompt.round_type == RoundType.Regular
+        assert (prompt.round_number, prompt.score, prompt.success_streak) == (1, 3, 2)
+        assert list(prompt.options) == ['a', 'b', 'c', 'd']
+        assert prompt.options[rnd.correct_key] == f"{rnd.question.text} right"
+        feedback = rnd.respond(rnd.correct_key)
+        assert feedback.is_correct and feedback.points == 1
+        assert (rnd.final_score, rnd.final_success_streak) == (4, 3)
+        assert rnd.is_finished
+
+    def test_regular_round_wrong_answer(self, pool):
+        rnd = RegularRound(1, 3, 2, question_pool=pool)
+        feedback = rnd.respond(wrong_key(rnd))
+        assert not feedback.is_correct and feedback.points == -1
+        assert feedback.correct_key == rnd.correct_key
+        assert (rnd.final_score, rnd.final_success_streak) == (2, 0)
+
+    def test_invalid_responses(self, pool):
+        rnd = RegularRound(1, 1, 0, question_pool=pool)
+        with pytest.raises(ValueError):
+            rnd.respond('e')
+        rnd.respond(rnd.correct_key)
+        with pytest.raises(RuntimeError):
+            rnd.respond(rnd.correct_key)
+
+    def test_bonus_round(self, pool):
+        rnd = BonusRound(3, 4, 3, question_pool=pool)
+        prompt = rnd.prompt()
+        assert prompt.kind == PromptKind.ChooseQuestion
+        assert prompt.options == {str(i + 1): question.text for i, question in enumerate(rnd.candidates)}
+        with pytest.raises(ValueError):
+            rnd.respond('4')
+        assert rnd.respond('2') is None
+        assert rnd.question is rnd.candidates[1]
+        assert rnd.prompt().kind == PromptKind.Answer
+        feedback = rnd.respond(rnd.correct_key)
+        assert feedback.points == 2
+        assert (rnd.final_score, rnd.final_success_streak) == (6, 3)  # the success streak is kept
+
+    def test_bonus_round_wrong_answer(self, pool):
+        rnd = BonusRound(3, 4, 3, question_pool=pool)
+        rnd.respond('1')
+        feedback = rnd.respond(wrong_key(rnd))
+        assert feedback.points == 0
+        assert (rnd.final_score, rnd.final_success_streak) == (4, 3)
+
+    def test_category_round(self, pool):
+        rnd = CategoryRound(5, 2, 0, question_pool=pool)
+        prompt = rnd.prompt()
+        assert prompt.kind == PromptKind.ChooseCategory
+        assert list(prompt.options.values()) == Category.list_formatted_str()
+        key = next(key for key, text in prompt.options.items() if text == Category.History.formatted_str)
+        assert rnd.respond(key) is None
+        assert rnd.question.category == Category.History
+        feedback = rnd.respond(wrong_key(rnd))
+        assert feedback.points == -1
+        assert (rnd.final_score, rnd.final_success_streak) == (1, 0)
+
+
+class TestGame:
+
+    @pytest.fixture
+    def game(self, pool, tmp_path):
+        game = Game(question_pool=pool, high_score_store=HighScoreStore(str(tmp_path / 'cache.json')))
+        game.start()
+        return game
+
+    def test_round_schedule(self, game):
+        # a bonus round follows every successful non-bonus round once the success streak reaches 3, every 5th round is
+        # a category round
+        R, B, C = RoundType.Regular, RoundType.Bonus, RoundType.Category
+        assert play(game, [True] * 11) == [R, R, R, B, R, B, C, B, R, B, R]
+        assert [rnd.number for rnd in game.rounds[:7]] == [1, 2, 3, 4, 4, 5, 5]  # bonus rounds share the next number
+        assert (game.n_rounds, game.n_bonus_rounds) == (7, 4)  # the bonus round after round 7 is not configured yet
+        assert game.next_round_type == RoundType.Bonus
+        assert game.prompt().round_type == RoundType.Bonus
+        assert game.n_bonus_rounds == 5
+
+    def test_no_bonus_round_after_a_wrong_answer(self, game):
+        R, C = RoundType.Regular, RoundType.Category
+        assert play(game, [True, True, False, True, True, True]) == [R, R, R, R, C, R]
+        assert game.next_round_type == RoundType.Bonus
+
+    def test_scoring(self, game):
+        play(game, [True, True, True, False, False, True])  # 1 -> 2 -> 3 -> 4 -> (bonus) 4 -> 3 -> 4
+        assert game.current_score == 4
+        assert game.current_success_streak == 1
+        assert game.high_score == 4
+        assert game.longest_success_streak == 3
+        assert not game.is_over
+
+    def test_game_over(self, game):
+        play(game, [True, False, False])
+        assert game.is_over
+        assert game.summary() == GameOver(high_score=2, n_rounds=3, longest_success_streak=1)
+        with pytest.raises(RuntimeError):
+            game.prompt()
+        with pytest.raises(RuntimeError):
+            game.respond('a')
+
+    def test_next_round_retried_after_a_connection_error(self, pool, tmp_path):
+        flaky_pool = FlakyQuestionPool(pool)
+        game = Game(question_pool=flaky_pool, high_score_store=HighScoreStore(str(tmp_path / 'cache.json')))
+        game.start()
+        rnd = game.current_round
+        assert game.respond(rnd.correct_key).is_correct
+        flaky_pool.n_failures = 2
+        with pytest.raises(ConnectionError):
+            game.prompt()
+        with pytest.raises(ConnectionError):
+            game.respond('a')
+        assert game.current_round is rnd and game.n_rounds == 1 and game.current_score == Game.START_SCORE + 1
+        assert game.prompt().round_number == 2
+        assert game.current_round is not rnd and game.n_rounds == 2
+
+    def test_start_twice(self, game):
+        with pytest.raises(RuntimeError):
+            game.start()
+
+
+# Console output of the game as printed before the game engine was decoupled from the console
+
+BLANK = "\n\n"  # blank_separator prints a newline
+
+
+def title(text: str):
+    return "#" * 55 + "\n" + " " * int((55 - len(text)) / 2) + text.upper() + "\n" + "#" * 55 + "\n"
+
+
+def question_block(rnd, number: str):
+    prompt = rnd.prompt()
+    return (title(number) + BLANK + f"Current score: {prompt.score}\n" + BLANK +
+            f"Current success streak: {prompt.success_streak}\n" + BLANK +
+            f"(Category: {prompt.category.formatted_str})\n" + BLANK + f"{prompt.text}\n" + BLANK +
+            "".join(f"{key}) {text}\n" for key, text in prompt.options.items()) + BLANK)
+
+
+def wrong_answer_block(rnd, points: str):
+    correct_answer = rnd.prompt().options[rnd.correct_key]
+    return f"WRONG! {points}\nThe correct answer was: {rnd.correct_key}) {correct_answer}\n" + BLANK
+
+
+class FakeInput:
+    """Replaces input: returns the responses (or calls them to get the response) and records the texts shown"""
+
+    def __init__(self, responses: list):
+        self._responses = list(responses)
+        self.texts = []
+
+    def __call__(self, text=''):
+        self.texts.append(text)
+        response = self._responses.pop(0)
+        return response() if callable(response) else response
+
+
+class TestConsole:
+
+    def test_regular_round(self, pool, monkeypatch, capsys):
+        rnd = RegularRound(1, 1, 0, question_pool=pool)
+        fake_input = FakeInput(['z', lambda: rnd.correct_key])
+        monkeypatch.setattr('builtins.input', fake_input)
+        play_round(rnd)
+        assert capsys.readouterr().out == question_block(rnd, "ROUND 1") + "Invalid input!\n" + \
+            "GOOD! +1 points\n" + BLANK
+        assert fake_input.texts == ["Answer: ", "Answer: "]
+
+    def test_regular_round_wrong_answer(self, pool, monkeypatch, capsys):
+        rnd = RegularRound(2, 3, 1, question_pool=pool)
+        monkeypatch.setattr('builtins.input', FakeInput([lambda: wrong_key(rnd)]))
+        play_round(rnd)
+        assert capsys.readouterr().out == question_block(rnd, "ROUND 2") + wrong_answer_block(rnd, "-1 points")
+
+    def test_bonus_round(self, pool, monkeypatch, capsys):
+        rnd = BonusRound(3, 4, 3, question_pool=pool)
+        fake_input = FakeInput(['3', lambda: wrong_key(rnd)])
+        monkeypatch.setattr('builtins.input', fake_input)
+        candidates = rnd.candidates
+        play_round(rnd)
+        choice = (title("BONUS ROUND") + BLANK + "In a BONUS ROUND you can choose the question that you want to answer\n"
+                  + BLANK + "".join(f"{i + 1}) {question.text}\n" for i, question in enumerate(candidates)) + BLANK
+                  + BLANK)
+        assert capsys.readouterr().out == choice + question_block(rnd, "BONUS ROUND") + \
+            wrong_answer_block(rnd, "Don't worry, there was no point deduction")
+        assert fake_input.texts == ["Choose the question that you want to answer: ", "Answer: "]
+
+    def test_category_round(self, pool, monkeypatch, capsys):
+        rnd = CategoryRound(5, 2, 0, question_pool=pool)
+        fake_input = FakeInput(['0', '2', lambda: rnd.correct_key])
+        monkeypatch.setattr('builtins.input', fake_input)
+        play_round(rnd)
+        categories = Category.list_formatted_str()
+        choice = (title("ROUND 5") + BLANK + "You can choose the category for the next question\n" + BLANK +
+                  "".join(f"{i + 1}) {category}\n" for i, category in enumerate(categories)) + BLANK)
+        assert capsys.readouterr().out == choice + "Invalid input!\n" + BLANK + question_block(rnd, "ROUND 5") + \
+            "GOOD! +1 points\n" + BLANK
+        assert rnd.question.category.formatted_str == categories[1]
+        assert fake_input.texts == ["Choose the category: ", "Choose the category: ", "Answer: "]
+
+    def test_game_over(self, pool, tmp_path, monkeypatch, capsys):
+        monkeypatch.chdir(tmp_path)
+        game = Game(question_pool=pool, high_score_store=HighScoreStore(str(tmp_path / 'cache.json')))
+        monkeypatch.setattr('builtins.input', FakeInput(['', lambda: wrong_key(game.current_round)]))
+        game.play()
+        out = capsys.readouterr().out
+        assert out.endswith(
+            wrong_answer_block(game.current_round, "-1 points") + title("GAME OVER") + BLANK + "Game summary:\n" +
+            "- High score: 1\n- Number of rounds: 1\n- Longest success streak: 0\n" + BLANK +
+            "***Congratulations: you set a new high score!***\n" +
+            "***Congratulations: you set a new record for the number of rounds played!***\n" +
+            "***Congratulations: you set a new record for longest success streak!***\n" + BLANK +
+            "--No historical high score information--\n" + BLANK)
+        assert HighScoreStore(str(tmp_path / 'cache.json')).records == {'score': 1, 'n_rounds': 1,
+                                                                         'success_streak': 0}
@@ -0,0 +1,91 @@
+"""Tests of the leaderboard and of its index of scores"""
+
+import random
+
+import pytest
+
+from pytrivia.events import GameOver
+from pytrivia.leaderboard import Leaderboard, ScoreIndex
+
+
+def game_over(high_score: int):
+    return GameOver(high_score=high_score, n_rounds=high_score, longest_success_streak=0)
+
+
+class TestScoreIndex:
+
+    def test_empty(self):
+        index = ScoreIndex()
+        assert len(index) == 0
+        assert index.n_below(5) == 0
+        assert index.n_above(5) == 0
+
+    def test_counts(self):
+        index = ScoreIndex()
+        for score in [5, 3, 3, 1, 8, 3]:
+            index.add(score)
+        assert len(index) == 6
+        assert [index.n_below(score) for score in [0, 1, 2, 3, 4, 5, 8, 9]] == [0, 0, 1, 1, 4, 4, 5, 6]
+        assert [index.n_above(score) for score in [0, 1, 2, 3, 4, 5, 8, 9]] == [6, 5, 5, 2, 2, 1, 0, 0]
+
+    def test_add_count(self):
+        index = ScoreIndex()
+        index.add(4, 10)
+        index.add(2, 5)
+        index.add(4, 2)
+        assert len(index) == 17
+        assert index.n_below(4) == 5
+        assert index.n_above(2) == 12
+
+    def test_random_scores(self):
+        # compared with counting the scores, as new distinct scores are inserted between the existing ones
+        rng = random.Random(0)
+        index = ScoreIndex()
+        scores = []
+        for _ in range(2000):
+            score = rng.randint(-5, 60)
+            scores.append(score)
+            index.add(score)
+            if len(scores) % 97 == 0:
+                for threshold in range(-7, 63):
+                    assert index.n_below(threshold) == sum(s < threshold for s in scores)
+                    assert index.n_above(threshold) == sum(s > threshold for s in scores)
+
+
+class TestLeaderboard:
+
+    @pytest.fixture
+    def leaderboard(self):
+        with Leaderboard(':memory:') as leaderboard:
+            for score in [5, 3, 3, 1]:
+                leaderboard.record(game_over(score))
+            yield leaderboard
+
+    def test_rank(self, leaderboard):
+        assert [leaderboard.rank(score) for score in [10, 5, 4, 3, 2, 1, 0]] == [1, 1, 2, 2, 4, 4, 5]
+
+    def test_percentile(self, leaderboard):
+        assert leaderboard.percentile(5) == 100 * (3 + 1 / 2) / 4
+        assert leaderboard.percentile(3) == 50
+        assert leaderboard.percentile(1) == 100 * (1 / 2) / 4
+        assert leaderboard.percentile(0) == 0
+        assert leaderboard.percentile(10) == 100
+
+    def test_percentile_without_games(self):
+        with Leaderboard(':memory:') as leaderboard:
+            assert leaderboard.percentile(3) is None
+            assert leaderboard.rank(3) == 1
+
+    def test_batch_mode(self, tmp_path):
+        # the games recorded but not written yet are ranked, and the index is rebuilt from the database
+        path = str(tmp_path / 'leaderboard.db')
+        with Leaderboard(path, autoflush=False) as leaderboard:
+            for score in [2, 7, 7]:
+                leaderboard.record(game_over(score), player='bot')
+            assert leaderboard.rank(7) == 1
+            assert leaderboard.rank(2) == 3
+            assert [entry.high_score for entry in leaderboard.top(2)] == [7, 7]
+        with Leaderboard(path) as leaderboard:
+            assert len(leaderboard) == 3
+            assert leaderboard.rank(2) == 3
+            assert leaderboard.percentile(7) == 100 * (1 + 2 / 2) / 3
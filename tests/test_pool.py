@@ -0,0 +1,73 @@
+"""Tests of the question pool on a source that only has questions in some categories"""
+
+import time
+
+import pytest
+
+from pytrivia.base import Category, RequestBuilder, request_from_trivia_api
+from pytrivia.game import Game
+from pytrivia.pool import QuestionPool
+from pytrivia.scores import HighScoreStore
+from pytrivia.simulation import ProbabilisticPlayer, play_game
+from pytrivia.sources import MemorySource
+
+
+CATEGORIES = [Category.Music, Category.History, Category.Science]
+
+
+def make_raw_question(text: str, category: Category):
+    return {'category': category.formatted_str,
+            'correctAnswer': f"{text} right",
+            'incorrectAnswers': [f"{text} wrong {i}" for i in range(3)],
+            'question': text,
+            'tags': [],
+            'type': RequestBuilder.QUESTION_TYPE}
+
+
+@pytest.fixture
+def pool():
+    source = MemorySource([make_raw_question(f"{category.name} {i}?", category)
+                           for category in CATEGORIES for i in range(50)])
+    pool = QuestionPool(request_builder_factory=lambda: request_from_trivia_api(source=source))
+    yield pool
+    pool.stop()
+
+
+def wait_for(predicate, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_random_questions(pool):
+    assert {pool.get_random_question().category for _ in range(30)} <= set(CATEGORIES)
+
+
+def test_question_in_a_category_without_questions(pool):
+    assert pool.get_question_in_category(Category.Music).category == Category.Music
+    assert pool.get_question_in_category(Category.FoodAndDrink).category in CATEGORIES
+    assert pool.get_question_in_category(Category.FoodAndDrink).category in CATEGORIES  # skipped from then on
+
+
+def test_prefetch_in_categories_without_questions(pool):
+    futures = pool.prefetch_questions_in_categories(list(Category)[:-1])  # all the categories but Unknown
+    questions = {category: future.result(timeout=5) for category, future in futures.items()}
+    assert questions[Category.History].category == Category.History
+    assert questions[Category.Geography].category in CATEGORIES
+
+
+def test_refill_skips_categories_without_questions(pool):
+    pool.start()
+    assert wait_for(lambda: all(pool.n_buffered(category) == pool.high_watermark for category in CATEGORIES))
+    assert pool.n_buffered() == len(CATEGORIES) * pool.high_watermark
+    assert pool.get_random_question().category in CATEGORIES
+
+
+def test_game(pool, tmp_path):
+    pool.start()
+    game = Game(question_pool=pool, high_score_store=HighScoreStore(str(tmp_path / 'cache.json')))
+    play_game(game, ProbabilisticPlayer(0.9), max_rounds=30)
+    assert game.n_rounds >= 1
@@ -0,0 +1,66 @@
+"""Tests of the question sources"""
+
+import socket
+
+import pytest
+
+from benchmarks.stub_server import StubTriviaServer
+from pytrivia.base import RequestBuilder
+from pytrivia.metrics import QUESTIONS_FETCHED, REGISTRY
+from pytrivia.retry import CircuitBreaker, RetryPolicy, get_default_circuit_breaker
+from pytrivia.sources import CompositeSource, RemoteSource
+
+
+@pytest.fixture(scope='module')
+def live_url():
+    with StubTriviaServer() as server:
+        yield server.url
+
+
+@pytest.fixture
+def dead_url():
+    # a port nothing listens on: the connections are refused
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/questions"
+
+
+FAST_RETRY_POLICY = RetryPolicy(max_attempts=2, base_delay=0.01, deadline=2)
+
+
+def test_default_circuit_breakers_are_per_host(live_url, dead_url):
+    assert get_default_circuit_breaker(dead_url) is get_default_circuit_breaker(dead_url.replace('/questions', '/'))
+    assert get_default_circuit_breaker(dead_url) is not get_default_circuit_breaker(live_url)
+
+
+def test_composite_source_fails_over_to_a_live_source(live_url, dead_url):
+    dead_source = RemoteSource(dead_url, retry_policy=FAST_RETRY_POLICY)
+    source = CompositeSource([dead_source, RemoteSource(live_url)])
+    for _ in range(2 * CircuitBreaker.FAILURE_THRESHOLD):
+        assert source.get_raw_questions(None, 5)
+    # the breaker of the dead host is open, which does not stop the requests to the other hosts
+    assert get_default_circuit_breaker(dead_url).state == CircuitBreaker.OPEN
+    with pytest.raises(ConnectionError):
+        dead_source.get_raw_questions(None, 5)
+    assert RequestBuilder(base_url=live_url).limit(5).get_questions()
+
+
+def test_composite_source_without_live_source(dead_url):
+    source = CompositeSource([RemoteSource(dead_url, retry_policy=FAST_RETRY_POLICY)])
+    with pytest.raises(ConnectionError):
+        source.get_raw_questions(None, 5)
+
+
+@pytest.fixture
+def metrics():
+    REGISTRY.reset()
+    REGISTRY.enable()
+    yield REGISTRY
+    REGISTRY.disable()
+    REGISTRY.reset()
+
+
+def test_questions_of_a_remote_source_are_counted_once(live_url, metrics):
+    raw_questions = RequestBuilder(source=RemoteSource(live_url)).limit(5).get_raw_questions()
+    assert sum(value for _, value in QUESTIONS_FETCHED.samples()) == len(raw_questions)
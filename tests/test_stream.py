@@ -0,0 +1,73 @@
+"""Tests of the incremental parser of JSON arrays"""
+
+import json
+
+import pytest
+
+from pytrivia.stream import iter_json_array
+
+
+ITEMS = [{'question': "Who painted 'Guernica'?", 'correctAnswer': 'Pablo Picasso', 'incorrectAnswers': ['Dalí']},
+         12345, -6.5e-3, 'café', True, None, [], [1, [2, {'a': 'b'}]], {}]
+DOCUMENT = json.dumps(ITEMS, ensure_ascii=False).encode('utf-8')
+
+
+def split(document: bytes, size: int):
+    return [document[i:i + size] for i in range(0, len(document), size)]
+
+
+def test_single_chunk():
+    assert list(iter_json_array([DOCUMENT])) == ITEMS
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64])
+def test_chunk_sizes(size):
+    assert list(iter_json_array(split(DOCUMENT, size))) == ITEMS
+
+
+def test_every_chunk_boundary():
+    # including the boundaries inside strings, numbers, keywords and multi-byte characters
+    for i in range(len(DOCUMENT) + 1):
+        assert list(iter_json_array([DOCUMENT[:i], DOCUMENT[i:]])) == ITEMS
+
+
+def test_numbers_split_across_chunks():
+    assert list(iter_json_array([b'[12', b'34', b'5, 6.', b'5e', b'3, -', b'7]'])) == [12345, 6.5e3, -7]
+    assert list(iter_json_array([b'[1', b'2', b'3', b']'])) == [123]
+
+
+def test_empty_chunks_and_whitespace():
+    assert list(iter_json_array([b'', b' \n[', b'', b' 1 ', b'', b',\t2', b' ] ', b''])) == [1, 2]
+
+
+@pytest.mark.parametrize('document', [b'[]', b'  [ \n ]  '])
+def test_empty_array(document):
+    assert list(iter_json_array(split(document, 1))) == []
+
+
+def test_items_are_yielded_before_the_end_of_the_document():
+    chunks = iter([b'[{"a": 1}, ', b'{"b": 2}'])
+    items = iter_json_array(chunks)
+    assert next(items) == {'a': 1}
+    assert next(items) == {'b': 2}
+
+
+@pytest.mark.parametrize('document', [b'', b'[', b'[1, 2', b'[1,', b'[{"a": 1}, {"b"', b'["unterminated'])
+def test_truncated_document(document):
+    for size in (1, len(document) or 1):
+        with pytest.raises(ValueError):
+            list(iter_json_array(split(document, size)))
+
+
+@pytest.mark.parametrize('document', [b'{"a": 1}', b'1', b'[1 2]', b'[1,, 2]', b'[1; 2]', b'[tru]', b'[{"a" 1}]'])
+def test_invalid_document(document):
+    with pytest.raises(ValueError):
+        list(iter_json_array([document]))
+
+
+def test_valid_items_before_an_error():
+    items = iter_json_array([b'[1, 2, oops]'])
+    assert next(items) == 1
+    assert next(items) == 2
+    with pytest.raises(ValueError):
+        next(items)